@@ -0,0 +1,503 @@
+# Remote control of installations. In agent mode, the program serves a small
+# HTTP/JSON API for the workloads on this machine, their install states, and a
+# queue of installation runs. A controller can then fan a suite out to many
+# agents at once, and report their combined progress and results.
+#
+# Agent API:
+#	GET  /workloads				the workloads, with their install states
+#	GET  /suites				the suites, and the default suite
+#	GET  /runs					all runs (queued, running, and finished)
+#	GET  /runs/<id>				one run, including the state of each of its jobs
+#	POST /runs					queue a run; the body is {"suite": name} or {"only": [names]}
+#	POST /runs/<id>/cancel		cancel a queued or running run
+#	GET  /metrics				installation metrics, in Prometheus' text format
+
+
+import os
+import re
+import json
+import time
+import queue
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+from Runner import ProcessRunner, runPlan
+from Journal import RunJournal
+from PayloadCache import PayloadCache
+from RunArchive import RunArchive
+from Resources import ResourceAdmission
+from Probes import ProbeEngine, ProbeResultCache
+from Estimates import InstallTimeEstimator
+from Scheduler import InstallScheduler, resolvePlan
+from Workloads import ManifestError, loadManifest, InstallStateCache, WorkloadRegistry
+
+
+defaultAgentPort = 8765
+
+
+class AgentRun:
+
+	""" One requested installation, from the time it's queued until it finishes. """
+
+	__slots__ = ( 'id', 'request', 'state', 'jobs', 'runner', 'cancelRequested', 'error', 'queuedTime', 'startTime', 'endTime' )
+
+	def __init__( self, runId, request ):
+		self.id = runId
+		self.request = request # The body of the request; {"suite": name} or {"only": [names]}
+		self.state = 'queued' # One of queued/running/succeeded/failed/cancelled
+		self.jobs = []
+		self.runner = None
+		self.cancelRequested = False
+		self.error = None
+		self.queuedTime = time.time()
+		self.startTime = None
+		self.endTime = None
+
+	@property
+	def finished( self ):
+		return self.state not in ( 'queued', 'running' )
+
+	def toDict( self ):
+		return {
+			'id': self.id,
+			'request': self.request,
+			'state': self.state,
+			'error': self.error,
+			'queuedTime': self.queuedTime,
+			'startTime': self.startTime,
+			'endTime': self.endTime,
+			'jobs': [ {'name': job.name, 'state': job.state, 'returnCode': job.returnCode, 'duration': job.duration} for job in self.jobs ]
+		}
+
+
+class InstallAgent:
+
+	""" Holds this machine's workloads, and installs queued runs one at a time in a
+		background thread. Methods may be called from any thread. The agent's logs, run
+		archive, journal, install history, and caches are kept in 'stateFolder'. """
+
+	def __init__( self, settings, stateFolder, manifest ):
+		self.settings = settings
+		self.stateFolder = stateFolder
+		self.lock = threading.Lock() # Guards the runs
+		self.registryLock = threading.Lock() # Guards the registry (changed by the worker thread)
+		self.runs = {} # Key = run ID, value = AgentRun, in the order queued
+		self.queue = queue.Queue()
+		self.nextRunId = 1
+
+		probeCachePath = os.path.join( stateFolder, settings.cacheFolder, 'installProbes.cache' ) if settings.cacheFolder else None
+		self.installStates = InstallStateCache( ProbeResultCache(probeCachePath, settings.probeCacheTTL) )
+		self.probeEngine = ProbeEngine( self.installStates, metrics=settings.metrics )
+		self.registry = WorkloadRegistry( manifest, self.installStates )
+		if settings.installHistoryFile:
+			self.estimator = InstallTimeEstimator( os.path.join(stateFolder, settings.installHistoryFile) )
+			self.registry.applyEstimates( self.estimator )
+		else:
+			self.estimator = None
+		self.registry.checkInstalls( self.probeEngine )
+		self.installStates.save()
+
+		self.worker = threading.Thread( target=self._work, daemon=True )
+		self.worker.start()
+
+	def workloads( self ):
+		with self.registryLock:
+			return [ {
+				'name': record.name,
+				'installTime': record.installTime,
+				'installed': record.installed,
+				'checking': record.checking,
+				'after': record.after,
+				'requires': record.requires,
+				'mutexGroups': record.mutexGroups,
+				'toolTip': record.toolTip
+			} for record in self.registry ]
+
+	def suites( self ):
+		with self.registryLock:
+			suites = { name: [self.registry.records[recordId].name for recordId in sorted(members)] for name, members in self.registry.suites.items() }
+			return { 'suites': suites, 'defaultSuite': self.registry.defaultSuite }
+
+	def submit( self, request ):
+
+		""" Validates and queues a run request, and returns the new AgentRun. Raises
+			ValueError if the request is invalid. """
+
+		if not isinstance( request, dict ):
+			raise ValueError( 'The request should be a JSON object.' )
+		elif 'only' in request:
+			names = request['only']
+			if not isinstance( names, list ) or not names or not all( isinstance(name, str) for name in names ):
+				raise ValueError( '"only" should be a list of workload names.' )
+			with self.registryLock:
+				unknownNames = [ name for name in names if name not in self.registry.byName ]
+			if unknownNames:
+				raise ValueError( 'Unknown workload(s): ' + ', '.join(unknownNames) )
+		else:
+			with self.registryLock:
+				suiteName = request.setdefault( 'suite', self.registry.defaultSuite )
+				suiteNames = list( self.registry.suites )
+			if suiteName not in suiteNames:
+				raise ValueError( 'Unknown suite "{}"; available suites are: {}'.format(suiteName, ', '.join(suiteNames)) )
+
+		with self.lock:
+			run = AgentRun( self.nextRunId, request )
+			self.nextRunId += 1
+			self.runs[run.id] = run
+		self.queue.put( run )
+		return run
+
+	def getRun( self, runId ):
+		with self.lock:
+			return self.runs.get( runId )
+
+	def allRuns( self ):
+		with self.lock:
+			return list( self.runs.values() )
+
+	def cancel( self, run ):
+
+		""" Cancels a queued run, or stops a running one. """
+
+		with self.lock:
+			if run.state == 'queued':
+				run.state = 'cancelled'
+				run.endTime = time.time()
+			elif run.state == 'running':
+				run.cancelRequested = True
+				if run.runner:
+					run.runner.cancel()
+
+	def shutdown( self ):
+		for run in self.allRuns():
+			self.cancel( run )
+		self.probeEngine.shutdown()
+		self.settings.metrics.close()
+
+	def _work( self ):
+		while True:
+			run = self.queue.get()
+			with self.lock:
+				if run.state != 'queued':
+					continue # Cancelled while waiting
+				run.state = 'running'
+				run.startTime = time.time()
+
+			try:
+				state = self._install( run )
+				error = None
+			except Exception as err:
+				state = 'failed'
+				error = str( err )
+			with self.lock:
+				run.state = state
+				run.error = error
+				run.endTime = time.time()
+
+	def _install( self, run ):
+
+		""" Installs the workloads for a run (in the worker thread), and returns the
+			run's final state. """
+
+		registry = self.registry
+		settings = self.settings
+
+		# Select what to install
+		with self.registryLock:
+			if 'only' in run.request:
+				for record in registry:
+					registry.setSelected( record, record.name in run.request['only'] or record.installed )
+			else:
+				registry.applySuite( run.request['suite'] )
+
+			plan = resolvePlan( registry.selectedRecords(), registry.records, lambda record: record.installed )
+		admission = ResourceAdmission( settings.maxLoadPerCpu, settings.minFreeMemoryMB, settings.maxDiskBusy )
+		scheduler = InstallScheduler( plan, settings.maxParallelInstalls, settings.resourceLimits, admission )
+
+		logFolder = os.path.join( self.stateFolder, settings.logFolder ) if settings.logFolder else None
+		payloadCache = PayloadCache( os.path.join(self.stateFolder, settings.payloadCacheFolder) ) if settings.payloadCacheFolder else None
+		archive = RunArchive( os.path.join(self.stateFolder, settings.runArchiveFolder) ) if settings.runArchiveFolder else None
+		runner = ProcessRunner( prefixOutput=(settings.maxParallelInstalls > 1), debugMode=settings.debugMode,
+			logFolder=logFolder, maxLogBytes=settings.maxLogSize, logBackups=settings.logBackups, payloadCache=payloadCache,
+			warmRunners=settings.warmRunners, archive=archive, extractionThreads=settings.payloadExtractionThreads )
+		journal = RunJournal( os.path.join(self.stateFolder, settings.installJournalFile) ) if settings.installJournalFile else None
+
+		with self.lock:
+			run.jobs = scheduler.jobs
+			run.runner = runner
+			if run.cancelRequested:
+				runner.cancel() # Cancelled while the plan was being prepared
+		jobs = asyncio.run( runPlan(scheduler, runner, journal=journal, metrics=settings.metrics) )
+
+		# Update install states and time estimates (probing without holding the lock)
+		with self.registryLock:
+			probes = [ registry.setChecking(job.workload) for job in jobs if job.state != 'skipped' ]
+		results = [ (probe, self.installStates.check(probe, useCache=False)) for probe in probes ]
+		self.installStates.save()
+		if self.estimator:
+			self.estimator.recordJobs( jobs )
+			self.estimator.save()
+		with self.registryLock:
+			for probe, installed in results:
+				registry.setProbeResult( probe, installed )
+			if self.estimator:
+				registry.applyEstimates( self.estimator )
+
+		if runner.cancelled or run.cancelRequested:
+			return 'cancelled'
+		elif all( job.state == 'succeeded' for job in jobs ):
+			return 'succeeded'
+		else:
+			return 'failed'
+
+
+class AgentRequestHandler( BaseHTTPRequestHandler ):
+
+	""" Serves the agent API. The server's 'agent' attribute is the InstallAgent. """
+
+	def do_GET( self ):
+		agent = self.server.agent
+		parts = self.path.strip( '/' ).split( '/' )
+
+		if parts == [ 'workloads' ]:
+			self.sendJson( 200, agent.workloads() )
+		elif parts == [ 'suites' ]:
+			self.sendJson( 200, agent.suites() )
+		elif parts == [ 'runs' ]:
+			self.sendJson( 200, [run.toDict() for run in agent.allRuns()] )
+		elif len( parts ) == 2 and parts[0] == 'runs':
+			run = self.findRun( parts[1] )
+			if run:
+				self.sendJson( 200, run.toDict() )
+		elif parts == [ 'metrics' ]:
+			self.sendText( 200, agent.settings.metrics.render() )
+		else:
+			self.sendJson( 404, {'error': 'Unknown path: ' + self.path} )
+
+	def do_POST( self ):
+		agent = self.server.agent
+		parts = self.path.strip( '/' ).split( '/' )
+
+		if parts == [ 'runs' ]:
+			try:
+				length = int( self.headers.get('Content-Length', 0) )
+				request = json.loads( self.rfile.read(length) or b'{}' )
+				run = agent.submit( request )
+			except ValueError as err:
+				self.sendJson( 400, {'error': str(err)} )
+			else:
+				self.sendJson( 202, run.toDict() )
+		elif len( parts ) == 3 and parts[0] == 'runs' and parts[2] == 'cancel':
+			run = self.findRun( parts[1] )
+			if run:
+				agent.cancel( run )
+				self.sendJson( 200, run.toDict() )
+		else:
+			self.sendJson( 404, {'error': 'Unknown path: ' + self.path} )
+
+	def findRun( self, runId ):
+
+		""" Returns the run with the given ID, or sends a 404 response and returns None. """
+
+		run = self.server.agent.getRun( int(runId) ) if runId.isdigit() else None
+		if not run:
+			self.sendJson( 404, {'error': 'Unknown run: ' + runId} )
+		return run
+
+	def sendJson( self, status, data ):
+		self.sendBody( status, json.dumps(data).encode('utf-8'), 'application/json' )
+
+	def sendText( self, status, text ):
+		self.sendBody( status, text.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8' )
+
+	def sendBody( self, status, body, contentType ):
+		self.send_response( status )
+		self.send_header( 'Content-Type', contentType )
+		self.send_header( 'Content-Length', str(len(body)) )
+		self.end_headers()
+		self.wfile.write( body )
+
+	def log_message( self, format, *args ):
+		if self.server.agent.settings.debugMode:
+			super().log_message( format, *args )
+
+
+def parseAddress( address, defaultHost ):
+
+	""" Splits a 'host:port', 'host', or 'port' string into a ( host, port ) tuple. """
+
+	host, _, port = address.rpartition( ':' )
+	if not host and not port.isdigit():
+		host, port = port, ''
+	return ( host or defaultHost, int(port) if port else defaultAgentPort )
+
+
+def agentHomeFolder( settings, homeFolder ):
+
+	""" Returns the folder for an agent's state; the --agent-home folder, or one named
+		after the agent's address within the agentStateFolder. """
+
+	if settings.agentHome:
+		return os.path.join( homeFolder, settings.agentHome )
+	host, port = parseAddress( settings.agent, '127.0.0.1' )
+	folderName = re.sub( r'[<>:"/\\|?*]', '_', '{}_{}'.format(host, port) )
+	return os.path.join( homeFolder, settings.agentStateFolder, folderName )
+
+
+def runAgent( settings, homeFolder, stateFolder ):
+
+	""" Serves the agent API until interrupted (e.g. with Ctrl+C), and returns an exit code.
+		Workloads are loaded from the manifest in 'homeFolder', and everything the agent
+		writes goes in 'stateFolder' (so several agents may share one homeFolder). """
+
+	try:
+		os.makedirs( stateFolder, exist_ok=True )
+	except OSError as err:
+		print( 'Unable to create the agent\'s state folder; {}'.format(err) )
+		return 1
+
+	try:
+		cacheFolder = os.path.join( stateFolder, settings.cacheFolder ) if settings.cacheFolder else None
+		manifest = loadManifest( settings.manifestFile, homeFolder, cacheFolder )
+	except ManifestError as err:
+		print( err )
+		return 2
+	if not manifest.workloads:
+		print( 'No workload installers could be found.' )
+		return 2
+
+	agent = InstallAgent( settings, stateFolder, manifest )
+	server = ThreadingHTTPServer( parseAddress(settings.agent, '127.0.0.1'), AgentRequestHandler )
+	server.daemon_threads = True
+	server.agent = agent
+
+	print( 'Agent listening on http://{}:{}/ with {} workload(s); state is kept in "{}"'.format(*server.server_address[:2], len(agent.registry), stateFolder) )
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		agent.shutdown()
+
+	return 0
+
+
+class AgentClient:
+
+	""" Makes requests of one agent, for the controller. """
+
+	def __init__( self, address, timeout=10 ):
+		host, port = parseAddress( address, '127.0.0.1' )
+		self.name = '{}:{}'.format( host, port )
+		self.baseUrl = 'http://{}:{}'.format( host, port )
+		self.timeout = timeout
+
+	def request( self, path, body=None ):
+
+		""" Sends a request (a POST if there's a body) and returns the decoded response.
+			Raises OSError (including URLError/HTTPError) or ValueError on failure. """
+
+		data = json.dumps( body ).encode( 'utf-8' ) if body is not None else None
+		request = urllib.request.Request( self.baseUrl + path, data=data, headers={'Content-Type': 'application/json'} )
+		try:
+			with urllib.request.urlopen( request, timeout=self.timeout ) as response:
+				return json.loads( response.read() )
+		except urllib.error.HTTPError as err:
+			try:
+				message = json.loads( err.read() )['error']
+			except (ValueError, KeyError, TypeError):
+				message = str( err )
+			raise ValueError( message )
+
+
+def runController( settings, pollInterval=1.0, lostContactTimeout=60 ):
+
+	""" Starts the requested suite (or workloads) on each of the given agents at once,
+		prints their progress until they've all finished, and returns an exit code.
+		An agent that stops responding keeps being polled, and is only given up on
+		once it hasn't responded for 'lostContactTimeout' seconds. Exit codes:
+			0: every agent installed everything requested
+			3: one or more installations failed, or were cancelled
+			4: one or more agents couldn't be reached (or stopped responding), or rejected the request """
+
+	clients = [ AgentClient(address) for address in settings.controller ]
+	request = { 'only': settings.only } if settings.only else { 'suite': settings.suite } if settings.suite else {}
+	runs = {} # Key = client, value = the latest state of its run
+	problems = {} # Key = client, value = error message
+	failingSince = {} # Key = client, value = when it first failed to respond (since it last did)
+
+	with ThreadPoolExecutor( len(clients) ) as pool:
+
+		# Start the run on every agent
+		for client, result in zip( clients, pool.map(lambda client: _tryRequest(client, '/runs', request), clients) ):
+			if isinstance( result, Exception ):
+				problems[client] = str( result )
+				print( '[{}] Unable to start: {}'.format(client.name, result) )
+			else:
+				runs[client] = result
+				print( '[{}] Queued run {}'.format(client.name, result['id']) )
+
+		# Poll the agents until their runs have all finished
+		progress = {}
+		while any( run['state'] in ('queued', 'running') for run in runs.values() ):
+			time.sleep( pollInterval )
+			pending = [ client for client, run in runs.items() if run['state'] in ('queued', 'running') ]
+			paths = [ '/runs/{}'.format(runs[client]['id']) for client in pending ]
+			for client, result in zip( pending, pool.map(_tryRequest, pending, paths) ):
+				if isinstance( result, Exception ):
+					now = time.monotonic()
+					if client not in failingSince:
+						failingSince[client] = now
+						print( '[{}] No response (will keep trying): {}'.format(client.name, result) )
+					elif now - failingSince[client] >= lostContactTimeout:
+						problems[client] = str( result )
+						runs.pop( client )
+						print( '[{}] Lost contact: {}'.format(client.name, result) )
+					continue
+				elif failingSince.pop( client, None ) is not None:
+					print( '[{}] Responding again'.format(client.name) )
+
+				runs[client] = result
+				finished = sum( 1 for job in result['jobs'] if job['state'] not in ('pending', 'running') )
+				status = ( result['state'], finished, len(result['jobs']) )
+				if progress.get( client ) != status:
+					progress[client] = status
+					print( '[{}] {}; {} of {} workload(s) finished'.format(client.name, *status) )
+
+	# Summarize the results
+	print( '' )
+	for client in clients:
+		if client in problems:
+			print( '{:<24} unreachable ({})'.format(client.name, problems[client]) )
+			continue
+		run = runs[client]
+		failures = [ job['name'] for job in run['jobs'] if job['state'] != 'succeeded' ]
+		if run['error']:
+			print( '{:<24} {} ({})'.format(client.name, run['state'], run['error']) )
+		elif failures:
+			print( '{:<24} {}; not installed: {}'.format(client.name, run['state'], ', '.join(failures)) )
+		else:
+			print( '{:<24} {}; {} workload(s) installed'.format(client.name, run['state'], len(run['jobs'])) )
+
+	if problems:
+		return 4
+	elif any( run['state'] != 'succeeded' for run in runs.values() ):
+		return 3
+	else:
+		return 0
+
+
+def _tryRequest( client, path, body=None ):
+
+	""" Returns the response to a request, or the exception raised while making it. """
+
+	try:
+		return client.request( path, body )
+	except (OSError, ValueError) as err:
+		return err
@@ -0,0 +1,153 @@
+# Access to the GUI's image assets, either as individual files in the imgs folder
+# or from a single packed bundle file. When the program is run from a slow network
+# share, the bundle lets startup do one read (via a memory map) instead of one per
+# image. Build or update the bundle with 'AutoInstaller.py --pack-assets'. The bundle
+# records the size and modification time of each image it was built from, and isn't
+# used if any image in the imgs folder has changed since.
+
+
+import os
+import json
+import mmap
+import struct
+import tempfile
+
+
+bundleMagic = b'WIAB' # Workload Installer Asset Bundle
+bundleVersion = 2
+headerFormat = '<4sII' # Magic, version, index length; followed by the JSON index, then the data
+
+# The images used by the GUI (named by their filename, less the .png extension)
+guiImageNames = ( 'bg1', 'bg2', 'bg3', 'btn', 'checkMark', 'mask', 'optionBg', 'rbChecked', 'rbCheckedHovered', 'rbHovered', 'rbUnchecked' )
+
+
+def packAssets( folder, bundlePath, names=guiImageNames ):
+
+	""" Packs the given images (PNG files) from the given folder into one bundle file, and
+		returns the number of images packed. Raises OSError if any can't be read. """
+
+	index = {}
+	blobs = []
+	offset = 0
+	for name in names:
+		path = os.path.join( folder, name + '.png' )
+		with open( path, 'rb' ) as file:
+			data = file.read()
+			stat = os.fstat( file.fileno() )
+		index[name] = [ offset, len(data), '.png', stat.st_mtime_ns ] # Offset, size, extension, and source mtime
+		blobs.append( data )
+		offset += len( data )
+
+	indexData = json.dumps( index ).encode( 'utf-8' )
+	tempPath = '{}.{}.tmp'.format( bundlePath, os.getpid() )
+	with open( tempPath, 'wb' ) as file:
+		file.write( struct.pack(headerFormat, bundleMagic, bundleVersion, len(indexData)) )
+		file.write( indexData )
+		for data in blobs:
+			file.write( data )
+	os.replace( tempPath, bundlePath )
+
+	return len( index )
+
+
+class AssetBundle:
+
+	""" A packed asset bundle, memory-mapped so that only the parts used are read. """
+
+	def __init__( self, path ):
+		self.path = path
+
+		with open( path, 'rb' ) as file:
+			self.map = mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ )
+			self.stat = os.fstat( file.fileno() )
+
+		headerSize = struct.calcsize( headerFormat )
+		magic, version, indexLength = struct.unpack_from( headerFormat, self.map )
+		if magic != bundleMagic or version != bundleVersion:
+			raise ValueError( '"{}" is not a compatible asset bundle.'.format(path) )
+		self.index = json.loads( self.map[headerSize:headerSize+indexLength] )
+		self.dataStart = headerSize + indexLength
+
+		self.extractFolder = None
+
+	def read( self, name ):
+
+		""" Returns the data of the given image, as bytes. """
+
+		offset, size = self.index[name][:2]
+		start = self.dataStart + offset
+		return self.map[start:start+size]
+
+	def changedImage( self, folder ):
+
+		""" Returns the file name of the first image in the given folder that has changed
+			since the bundle was built from it (or None if none has, or the folder doesn't
+			exist, e.g. when only the bundle was deployed). """
+
+		for name, ( _, size, ext, mtime ) in self.index.items():
+			try:
+				stat = os.stat( os.path.join(folder, name + ext) )
+			except FileNotFoundError:
+				if not os.path.isdir( folder ):
+					return None
+				continue # The bundled copy is the only one
+			if ( stat.st_size, stat.st_mtime_ns ) != ( size, mtime ):
+				return name + ext
+		return None
+
+	def filePath( self, name ):
+
+		""" Returns the path to a local copy of the given image, for uses that need a
+			file (such as style sheets). Copies are kept in the temp folder, and reused
+			until the bundle changes. """
+
+		if not self.extractFolder:
+			bundleKey = '{}-{}'.format( self.stat.st_size, self.stat.st_mtime_ns )
+			self.extractFolder = os.path.join( tempfile.gettempdir(), 'WorkloadInstallerAssets', bundleKey )
+			os.makedirs( self.extractFolder, exist_ok=True )
+
+		path = os.path.join( self.extractFolder, name + self.index[name][2] )
+		if not os.path.exists( path ):
+			tempPath = '{}.{}.tmp'.format( path, os.getpid() )
+			with open( tempPath, 'wb' ) as file:
+				file.write( self.read(name) )
+			os.replace( tempPath, path )
+		return path
+
+
+class AssetFolder:
+
+	""" Assets read directly from the image files in a folder. """
+
+	def __init__( self, folder ):
+		self.paths = {}
+		for fileName in os.listdir( folder ):
+			name, ext = os.path.splitext( fileName )
+			self.paths[name] = os.path.join( folder, fileName )
+
+	def read( self, name ):
+		with open( self.paths[name], 'rb' ) as file:
+			return file.read()
+
+	def filePath( self, name ):
+		return self.paths[name]
+
+
+def loadAssets( folder, bundlePath=None ):
+
+	""" Returns an AssetBundle for the given bundle file if it exists (and is valid and
+		up to date with the folder's images), or an AssetFolder for the given folder
+		otherwise. """
+
+	if bundlePath and os.path.exists( bundlePath ):
+		try:
+			bundle = AssetBundle( bundlePath )
+			changedImage = bundle.changedImage( folder )
+			if not changedImage:
+				return bundle
+			print( 'The asset bundle is out of date ("{}" has changed), so the imgs folder will be used; '
+				'update the bundle with --pack-assets.'.format(changedImage) )
+		except (OSError, ValueError, struct.error) as err:
+			print( 'Unable to load the asset bundle; {}'.format(err) )
+
+	return AssetFolder( folder )
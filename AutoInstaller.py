@@ -6,742 +6,454 @@
 import os
 import sys
 import time
-import random
+import locale
+import asyncio
+import argparse
+
+from Assets import packAssets
+from Agent import defaultAgentPort, agentHomeFolder, runAgent, runController
+from Runner import ProcessRunner, runPlan
+from PayloadCache import PayloadCache
+from RunArchive import RunArchive
+from Journal import RunJournal, resumePlan
+from Estimates import InstallTimeEstimator
+from Scheduler import InstallScheduler, resolvePlan, estimateMakespan, simulatePlan
+from Resources import ResourceAdmission
+from Probes import ProbeEngine, ProbeResultCache
+from Profiling import StartupTimeline, Metrics
+from Workloads import loadManifest, ManifestError, InstallStateCache, WorkloadRegistry, humanReadableTime
 
-from subprocess import Popen, PIPE
 
-from PyQt6 import QtGui, QtWidgets
-from PyQt6.QtGui import QRegion
-from PyQt6.QtCore import Qt, QPropertyAnimation, QPoint, QEasingCurve, QSize, QTimer, QRect
-from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QGridLayout, QLabel, QRadioButton
-
-
-os.environ['QT_FONT_DPI'] = "96" # Prevent system upscaling of the GUI
 useRandomBackgrounds = False
 debugMode = False
-
-# These are configuration for the radio buttons. Fill these with the names 
-# of the program/workload options you want included in that suite.
-Minimal_Suite = [ 'Example Workload 2', 'Example Workload 5', 'Example Workload 8' ]
-Balanced_Suite = [ 'Example Workload 2', 'Example Workload 3', 'Example Workload 5',
-					'Example Workload 7', 'Example Workload 8' ]
-
-
-
-def humanReadableTime( seconds ):
-
-	""" Converts a time interval in seconds to a human-readable string of days/hours/minutes, etc. """
-
-	result = []
-	intervals = (
-		('weeks', 604800),  # 60 * 60 * 24 * 7
-		('days', 86400),    # 60 * 60 * 24
-		('hours', 3600),    # 60 * 60
-		('minutes', 60),
-		('seconds', 1),
-		)
-
-	if seconds == 0:
-		return '0 seconds'
-
-	for name, count in intervals:
-		value = seconds // count # Floor division; rounds down to full int
-		if value:
-			seconds -= value * count
-			if value == 1:
-				name = name.rstrip('s')
-			result.append( "{} {}".format(int(value), name) )
-
-	if len( result ) == 2:
-		return '{} and {}'.format( result[0], result[1] )
+maxParallelInstalls = 4 # Number of workloads that may be installed at once (1 = one at a time)
+reducedMotion = None # True for a low frame rate and no idle animations; None to enable it only for remote sessions
+
+# A packed bundle of the GUI's images (built with --pack-assets), used in place of the imgs
+# folder when it exists, so startup reads one file rather than one per image (None to disable).
+assetBundleFile = 'imgs.bundle'
+
+# The file defining the workload options and suites (JSON, or TOML with Python 3.11+).
+# The path is relative to this script's directory.
+manifestFile = 'workloads.json'
+
+# When installing in parallel, workloads may declare the resources they use heavily ("cpu",
+# "disk", or "network") and their peak memory use (memoryMB) in the manifest. resourceLimits
+# caps how many workloads using each class may run at once. Beyond that, a workload is only
+# started alongside others if the system has room for it, according to live readings (on Linux):
+resourceLimits = { 'disk': 1, 'network': 2 }
+maxLoadPerCpu = 1.0 # CPU-heavy workloads wait while the 1-minute load average per CPU is above this
+minFreeMemoryMB = 512 # Workloads wait if starting them would leave less memory than this available
+maxDiskBusy = 0.8 # Disk-heavy workloads wait while the busiest disk is busy more than this fraction of the time
+
+# Where measured install times are kept, for estimating future installs (None to disable).
+installHistoryFile = 'installHistory.json'
+
+# Where the progress of the current installation is journaled, so it can be resumed after
+# a reboot or crash with the --resume option (None to disable).
+installJournalFile = 'installJournal.jsonl'
+
+# Where the compiled workload manifest and the results of slow install probes are cached between
+# runs (None to disable both). Anything in this folder may be deleted; it's rebuilt as needed.
+cacheFolder = 'cache'
+
+# How long (in seconds) the results of slow install probes (hashes, commands, etc.) are cached.
+probeCacheTTL = 3600
+
+# A folder on a local drive to copy workload folders into before installing them, for when this
+# program is run from a network share (None to run installers from their original folders). The
+# next workloads' folders are copied while the current ones install, and files with identical
+# content are only stored once. Installers then run from a scratch copy of it (per run), and
+# files they create or change there are copied back to their original folders when they finish.
+payloadCacheFolder = None
+
+# Number of warm worker processes to keep ready for running Python installers (.py files), on
+# Linux/macOS (0 to start a new interpreter for each). Each installer runs in a fresh fork of an
+# idle worker, which saves the interpreter's startup time; worthwhile when there are many quick
+# Python installers. Installers are run by this program's own Python version, whatever their shebang.
+# Other installers (shell scripts, batch files, and executables) are always started directly.
+warmRunners = 0
+
+# Number of workload payload archives (see "payload" in the manifest) that may be extracted at once.
+# The payloads of all workloads being installed are extracted in the background, ahead of their installers.
+payloadExtractionThreads = 2
+
+# Where each installer's output is logged, as '<logFolder>/<workload name>/<run ID>.log' (None to disable).
+# Log files larger than maxLogSize (in bytes) are rotated, keeping up to logBackups old files.
+logFolder = 'logs'
+maxLogSize = 10 * 1024 * 1024
+logBackups = 3
+
+# Where every run's installer output is also archived, compressed (with zstd if the zstandard package
+# is installed, otherwise gzip), and indexed by workload, run, exit code, and error-looking lines, for
+# the --runs, --failures, and --search options (None to disable).
+runArchiveFolder = 'runArchive'
+
+# With the --metrics option, each installation's queue wait, payload wait, run time, exit code, and output
+# size (plus timings of the GUI's busiest code paths) are recorded. Events are appended to metricsEventsFile as
+# JSON lines, and totals are saved to metricsFile in Prometheus' text format (e.g. for node_exporter's
+# textfile collector). Agents (see --agent) also serve the totals at /metrics, with or without --metrics.
+metricsEventsFile = 'metrics.jsonl'
+metricsFile = 'metrics.prom'
+
+# Where each agent (see --agent) keeps everything it writes (the logs, run archive, install journal and
+# history, caches, and metrics files above), as '<agentStateFolder>/<host>_<port>', so several agents
+# may run from one copy of this program. The --agent-home option gives an agent a different folder.
+agentStateFolder = 'agents'
+
+
+
+class ArgumentParser( argparse.ArgumentParser ):
+
+	""" Exits with code 1 for invalid arguments (rather than argparse's usual 2,
+		which this program uses for problems with the workload manifest). """
+
+	def error( self, message ):
+		self.print_usage( sys.stderr )
+		print( '{}: error: {}'.format(self.prog, message), file=sys.stderr )
+		sys.exit( 1 )
+
+
+def parseArguments( args ):
+
+	""" Parses command line arguments into the settings namespace used by the rest of
+		the program. Settings not given on the command line use the values above. """
+
+	parser = ArgumentParser( description='Installs a selection of workloads, using a GUI or headlessly.' )
+	parser.add_argument( 'autoStartTimeout', nargs='?', type=int, default=0,
+		help='GUI only; number of seconds of inactivity before automatically installing the default suite' )
+	parser.add_argument( '--headless', action='store_true',
+		help='install without showing the GUI (PyQt is not loaded)' )
+	parser.add_argument( '--plan', action='store_true', dest='showPlan',
+		help="print when each workload would start and finish (for the --suite, --only, or --resume selection), and the total time, without installing anything" )
+	selection = parser.add_mutually_exclusive_group()
+	selection.add_argument( '--suite',
+		help="headless or controller only; the suite to install (default: the manifest's default suite)" )
+	selection.add_argument( '--only', nargs='+', metavar='NAME',
+		help='headless or controller only; install just the named workloads (and any they require). With --runs, --failures, or --search, only show these workloads' )
+	selection.add_argument( '--resume', action='store_true',
+		help='continue the last installation from where it stopped (e.g. after a reboot), without re-running finished workloads' )
+	mode = parser.add_mutually_exclusive_group()
+	mode.add_argument( '--agent', nargs='?', const='127.0.0.1:{}'.format(defaultAgentPort), metavar='HOST:PORT',
+		help='serve an HTTP/JSON API for installing workloads on this machine remotely (default: %(const)s)' )
+	parser.add_argument( '--agent-home', metavar='FOLDER', dest='agentHome',
+		help="agent only; the folder to keep the agent's logs, run archive, journal, history, and caches in (default: {}/HOST_PORT)".format(agentStateFolder) )
+	mode.add_argument( '--controller', nargs='+', metavar='HOST:PORT',
+		help='install the --suite (or --only workloads) on each of the given agents at once, and report their progress' )
+	query = parser.add_argument_group( 'run archive queries' )
+	query.add_argument( '--runs', nargs='?', type=int, const=10, metavar='N', dest='queryRuns',
+		help='list the results of the last N runs (default: %(const)s); with --failures or --search, only look in the last N runs' )
+	query.add_argument( '--failures', action='store_true',
+		help='list failed installations, with the error-looking lines of their output' )
+	query.add_argument( '--search', metavar='TEXT',
+		help='list lines of installer output containing the given text (ignoring case)' )
+	parser.add_argument( '--jobs', type=int, default=maxParallelInstalls, metavar='N', dest='maxParallelInstalls',
+		help='number of workloads that may be installed at once (default: %(default)s)' )
+	parser.add_argument( '--manifest', default=manifestFile, dest='manifestFile',
+		help='the workload manifest to load (default: %(default)s)' )
+	parser.add_argument( '--reduced-motion', action='store_true', default=reducedMotion, dest='reducedMotion',
+		help='GUI only; use a low animation frame rate and disable idle animations' )
+	parser.add_argument( '--profile-startup', action='store_true', dest='profileStartup',
+		help='GUI only; print how long each stage of startup took, up to the first paint of the window' )
+	parser.add_argument( '--pack-assets', action='store_true', dest='packAssets',
+		help='pack the images in the imgs folder into the asset bundle, and exit' )
+	parser.add_argument( '--metrics', action='store_true', dest='collectMetrics',
+		help='record installation and GUI timings to {} (events) and {} (totals)'.format(metricsEventsFile, metricsFile) )
+	parser.add_argument( '--debug', action='store_true', default=debugMode, dest='debugMode' )
+
+	settings = parser.parse_args( args )
+	settings.useRandomBackgrounds = useRandomBackgrounds
+	settings.assetBundleFile = assetBundleFile
+	settings.installHistoryFile = installHistoryFile
+	settings.installJournalFile = installJournalFile
+	settings.resourceLimits = resourceLimits
+	settings.maxLoadPerCpu = maxLoadPerCpu
+	settings.minFreeMemoryMB = minFreeMemoryMB
+	settings.maxDiskBusy = maxDiskBusy
+	settings.cacheFolder = cacheFolder
+	settings.probeCacheTTL = probeCacheTTL
+	settings.payloadCacheFolder = payloadCacheFolder
+	settings.warmRunners = warmRunners
+	settings.payloadExtractionThreads = payloadExtractionThreads
+	settings.logFolder = logFolder
+	settings.maxLogSize = maxLogSize
+	settings.logBackups = logBackups
+	settings.runArchiveFolder = runArchiveFolder
+	settings.metricsEventsFile = metricsEventsFile
+	settings.metricsFile = metricsFile
+	settings.agentStateFolder = agentStateFolder
+	settings.querying = settings.queryRuns is not None or settings.failures or settings.search is not None
+
+	if settings.autoStartTimeout < 0:
+		parser.error( 'the autoStartTimeout should be a positive number of seconds' )
+	elif settings.maxParallelInstalls < 1:
+		parser.error( '--jobs should be at least 1' )
+	elif settings.suite and not ( settings.headless or settings.controller or settings.showPlan ):
+		parser.error( '--suite may only be used with --headless, --plan, or --controller' )
+	elif settings.only and not ( settings.headless or settings.controller or settings.showPlan or settings.querying ):
+		parser.error( '--only may only be used with --headless, --plan, --controller, --runs, --failures, or --search' )
+	elif settings.querying and ( settings.headless or settings.showPlan or settings.agent or settings.controller or settings.resume ):
+		parser.error( '--runs, --failures, and --search may not be used with --headless, --plan, --agent, --controller, or --resume' )
+	elif settings.querying and not settings.runArchiveFolder:
+		parser.error( '--runs, --failures, and --search require a run archive (runArchiveFolder is disabled)' )
+	elif settings.queryRuns is not None and settings.queryRuns < 1:
+		parser.error( '--runs should be at least 1' )
+	elif settings.agentHome and not settings.agent:
+		parser.error( '--agent-home may only be used with --agent' )
+	elif settings.showPlan and ( settings.agent or settings.controller ):
+		parser.error( '--plan may not be used with --agent or --controller' )
+	elif ( settings.agent or settings.controller ) and ( settings.headless or settings.resume ):
+		parser.error( '--agent and --controller may not be used with --headless or --resume' )
+	elif settings.packAssets and not settings.assetBundleFile:
+		parser.error( '--pack-assets requires an asset bundle path (assetBundleFile is disabled)' )
+	elif settings.resume and not settings.installJournalFile:
+		parser.error( '--resume requires an install journal (installJournalFile is disabled)' )
+
+	return settings
+
+
+def runHeadless( settings ):
+
+	""" Installs the requested workloads without a GUI, and returns an exit code:
+			0: everything requested is installed
+			1: invalid workload or suite names were given (or there's nothing to resume)
+			2: the workload manifest could not be loaded, or has no usable workloads
+			3: one or more installations failed (or were skipped because of a failure)
+		With --plan, the predicted schedule is printed instead, and nothing is installed. """
+
+	homeFolder = os.path.dirname( os.path.abspath(__file__) )
+
+	cacheFolder = os.path.join( homeFolder, settings.cacheFolder ) if settings.cacheFolder else None
+	try:
+		manifest = loadManifest( settings.manifestFile, homeFolder, cacheFolder )
+	except ManifestError as err:
+		print( err )
+		return 2
+	if not manifest.workloads:
+		print( 'No workload installers could be found.' )
+		return 2
+
+	probeCachePath = os.path.join( cacheFolder, 'installProbes.cache' ) if cacheFolder else None
+	installStates = InstallStateCache( ProbeResultCache(probeCachePath, settings.probeCacheTTL) )
+	registry = WorkloadRegistry( manifest, installStates )
+	if settings.installHistoryFile:
+		estimator = InstallTimeEstimator( os.path.join(homeFolder, settings.installHistoryFile) )
+		registry.applyEstimates( estimator )
 	else:
-		commaJoined = ', '.join( result )
-
-		# Replace the last comma and space with an 'and'
-		li = commaJoined.rsplit( ', ', 1 )
-		return ', and '.join( li )
-
-
-
-class AutoInstallerChooser( QMainWindow ):
-
-	labelStyle = (
-			'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
-		)
-
-	def __init__( self, autoStartTimeout=0 ):
-		super().__init__()
-
-		# Set window properties
-		self.setWindowTitle( 'Workload Installer' )
-		self.setWindowFlags( Qt.WindowType.FramelessWindowHint )
-		self.setAttribute( Qt.WidgetAttribute.WA_TranslucentBackground )
-
-		self.scriptHomeFolder = os.path.dirname( __file__ )
-		os.chdir( self.scriptHomeFolder )
-		self.autoStartTimeout = autoStartTimeout
-		self.totalOptions = 0
-
-		if autoStartTimeout:
-			self.closeAfterInstall = True
-		else:
-			self.closeAfterInstall = False
-
-		# Build image filepaths
-		self.imagePaths = {}
-		imagesFolder = os.path.join( self.scriptHomeFolder, 'imgs' )
-		for file in os.listdir( imagesFolder ):
-			self.imagePaths[file[:-4]] = os.path.join( imagesFolder, file )
-
-		# Load some images (so it doesn't have to be done repeatedly for each workload option)
-		self.selectionBg = QtGui.QImage( self.imagePaths['optionBg'] )
-		self.checkMark = QtGui.QImage( self.imagePaths['checkMark'] )
-		self.selectionMask = QtGui.QImage( self.imagePaths['mask'] ).createAlphaMask()
-
-		# Establish the main frame object to attach workload choices and the button frame
-		self.mainFrame = QVBoxLayout()
-		self.mainFrame.setAlignment( Qt.AlignmentFlag.AlignCenter ) # Align in the center of the bgWidget
-		self.mainFrame.setContentsMargins( 0, 20, 0, 20 )
-
-		# Add workload choices
-		self.addWorkloadOption( 'Example Workload 1', 3, r"Example Workload 1\Demo Install Script.bat", r'Example Workload 1\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 2', 3, r"Example Workload 2\Demo Install Script.bat", r'Example Workload 2\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 3', 3, r"Example Workload 3\Demo Install Script.bat", r'Example Workload 3\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 4', 3, r"Example Workload 4\Demo Install Script.bat", r'Example Workload 4\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 5', 3, r"Example Workload 5\Demo Install Script.bat", r'Example Workload 5\Done.txt', 'This one has a tooltip!' )
-		self.addWorkloadOption( 'Example Workload 6', 3, r"Example Workload 6\Demo Install Script.bat", r'Example Workload 6\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 7', 3, r"Example Workload 7\Demo Install Script.bat", r'Example Workload 7\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 8', 3, r"Example Workload 8\Demo Install Script.bat", r'Example Workload 8\Done.txt' )
-		self.addWorkloadOption( 'Example Workload 9', 3, r"Example Workload 9\Demo Install Script.bat", r'Example Workload 9\Done.txt' )
-
-		# Ensure at least some of the workload installers were found
-		if self.totalOptions == 0:
-			print( 'No workload installers could be found, and no options could be added to the GUI.' )
-			sys.exit( 2 )
-
-		# Add a little spacing between options (proportionally less if there are more options)
-		spacing = ( 10 - self.totalOptions ) * 3
-		if spacing < 0:
-			spacing = 0
-		optionHeight = 42 + spacing
-		self.mainFrame.setSpacing( spacing )
-		if debugMode:
-			print( 'option height: {}    spacing: {}'.format(optionHeight, spacing) )
-
-		# Load and resize the background image
-		if useRandomBackgrounds:
-			bgName = random.choice( ['bg1', 'bg2', 'bg3'] )
-		else:
-			bgName = 'bg1'
-		pixmapBg = QtGui.QPixmap( self.imagePaths[bgName] )
-		appWidth = pixmapBg.width()
-		appHeight = ( self.totalOptions * optionHeight ) + 200
-		if autoStartTimeout:
-			appHeight += 30
-		if debugMode:
-			print( 'appheight: ' + str(appHeight) )
-		appBg = pixmapBg.scaled( appWidth, appHeight )
-
-		# Get display dimensions and center the program in the middle of the screen
-		self.resize( appWidth, appHeight )
-		qtRectangle = self.frameGeometry()
-		if debugMode:
-			print('screen 0 geometry: ', app.screens()[0].availableGeometry() )
-		centerPoint = app.screens()[0].availableGeometry().center()
-		qtRectangle.moveCenter( centerPoint )
-		self.move( qtRectangle.topLeft() )
-
-		# Attach the background and main frame widget
-		bgWidget = QLabel()
-		bgWidget.setPixmap( appBg )
-		bgWidget.setLayout( self.mainFrame )
-		self.setCentralWidget( bgWidget )
-
-		# Add lower buttons to the interface
-		buttonsFrame = QGridLayout()
-		buttonsFrame.setContentsMargins( 50, 20, 50, 0 ) # Set (mostly) Left/Right margins
-		buttonsFrame.setSpacing( 15 ) # Set inter-widget padding
-
-		# Add the suite-selection radio buttons
-		radioBtn = StyledRadioButton( "Minimal", self.suiteSelected )
-		radioBtn.style = radioBtn.style.replace( 'imgs', imagesFolder.replace('\\', '/') ) 
-		buttonsFrame.addWidget( radioBtn, 0, 0 )
-
-		radioBtn = StyledRadioButton( "Balanced", self.suiteSelected, checked=True )
-		buttonsFrame.addWidget( radioBtn, 0, 1 )
-
-		radioBtn = StyledRadioButton( "Full", self.suiteSelected )
-		buttonsFrame.addWidget( radioBtn, 0, 2 )
-
-		self.customradioBtn = StyledRadioButton( "Custom", self.suiteSelected )
-		buttonsFrame.addWidget( self.customradioBtn, 0, 3 )
-
-		# Add total install time display
-		self.totalTimeLabel = QLabel()
-		self.totalTimeLabel.setStyleSheet( self.labelStyle )
-		buttonsFrame.addWidget( self.totalTimeLabel, 1, 0, 1, 4, Qt.AlignmentFlag.AlignCenter )
-		self.updateTotalTime()
-
-		# Add the Install/Cancel buttons
-		btn = StyledButton( self, 'Install' )
-		btn.setMinimumSize( 130, 30 )
-		btn.clicked.connect( self.installSelected )
-		buttonsFrame.addWidget( btn, 2, 0, 1, 2 )
-
-		btn = StyledButton( self, 'Cancel' )
-		btn.setMinimumSize( 130, 30 )
-		btn.clicked.connect( self.close )
-		buttonsFrame.addWidget( btn, 2, 2, 1, 2 )
-
-		# Add the timeout display
-		self.autoStartCountdown = QTimer()
-		if autoStartTimeout:
-			self.countdownLabel = QLabel( 'Auto-start in ' + humanReadableTime(autoStartTimeout) )
-			self.countdownLabel.setStyleSheet( self.labelStyle )
-			buttonsFrame.addWidget( self.countdownLabel, 3, 0, 1, 4, Qt.AlignmentFlag.AlignCenter )
-
-			# Create a timer to count down to the auto-start procedure
-			self.autoStartCountdown.setInterval( 1000 )
-			self.autoStartCountdown.timeout.connect( self.updateAutoStartLabel )
-			self.autoStartCountdown.start()
-		else:
-			self.countdownLabel = None
-
-		self.mainFrame.addLayout( buttonsFrame )
-
-		# Animations when the program is idle
-		self.idleAnimTimer = QTimer()
-		self.idleAnimTimer.setInterval( 4000 )
-		self.idleAnimTimer.timeout.connect( self.fireIdleAnim )
-		self.idleAnimTimer.start()
-
-	def addWorkloadOption( self, name, installTime, installer, checkInstallPath, toolTip='' ):
-
-		""" Adds a workload selection (checkbox and name) to the GUI for the user to toggle. 
-			Note that the 'installer' argument is relative to this script's directory. """
-
-		# Construct and validate the installer filepath
-		installerPath = os.path.join( self.scriptHomeFolder, installer )
-		if not os.path.exists( installerPath ):
-			print( 'Warning! Unable to find installer path for "{}".'.format(installerPath) )
-			return
-
-		# Add the workload to the interface
-		checkInstallPath = os.path.join( self.scriptHomeFolder, checkInstallPath ) # Update from a relative to an absolute path
-		wl = WorkloadSelection( self, name, installTime, installerPath, checkInstallPath )
-		self.mainFrame.addWidget( wl )
-		self.totalOptions += 1
-
-		if toolTip:
-			wl.setToolTip( toolTip )
-
-	def suiteSelected( self ):
-
-		""" Called whenever the suite radio buttons are changed. """
-
-		radioButton = self.sender()
-		if not radioButton.isChecked():
-			return
-
-		radioButton.repaint()
-		iterDelay = .05
-
-		if radioButton.suite == 'Minimal':
-			for wl in self.findChildren( WorkloadSelection ):
-				if wl.name in Minimal_Suite:
-					wl.selected = True
-					wl.repaint()
-				elif not wl.isInstalled():
-					wl.selected = False
-					wl.repaint()
-				time.sleep( iterDelay )
-
-		elif radioButton.suite == 'Balanced':
-			for wl in self.findChildren( WorkloadSelection ):
-				if wl.name in Balanced_Suite:
-					wl.selected = True
-					wl.repaint()
-				elif not wl.isInstalled():
-					wl.selected = False
-					wl.repaint()
-				time.sleep( iterDelay )
-
-		elif radioButton.suite == 'Full':
-			for wl in self.findChildren( WorkloadSelection ):
-				wl.selected = True
-				wl.repaint()
-				time.sleep( iterDelay )
-
-		elif radioButton.suite != 'Custom':
-			raise Exception( 'Invalid Suite selection: {}'.format(radioButton.suite) )
-
-		if not radioButton.suite == 'Custom':
-			for wl in self.findChildren( WorkloadSelection ):
-				if wl.selected:
-					# Trigger an animation on this workload
-					wl.lines.append( -40 )
-					wl.animTimer.start()
-
-		self.resetIdleAnims()
-		self.updateTotalTime()
-
-	def getSelectedSuite( self ):
-
-		""" Checks the radio buttons and returns the currently selected suite. """
-
-		for btn in self.findChildren( QRadioButton ):
-			if btn.isChecked():
-				return btn.suite
-
-	def updateTotalTime( self ):
-
-		""" Updates the total installation time displayed to the user. 
-			Should be called any time the selection of workloads changes. """
-
-		totalTime = 0
-		allSelected = True
-		allInstalled = True
-
-		for wl in self.findChildren( WorkloadSelection ):
-			if wl.selected and not wl.isInstalled():
-				allInstalled = False
-				totalTime += wl.installTime
-			elif not wl.selected:
-				allSelected = False
-
-		if allSelected and allInstalled:
-			self.totalTimeLabel.setText( 'All workloads have been installed.' )
-		elif allInstalled:
-			self.totalTimeLabel.setText( 'All selected workloads have been installed.' )
-		elif totalTime == 0:
-			self.totalTimeLabel.setText( 'Nothing selected to install.' )
+		estimator = None
+
+	# Check which workloads are installed (not needed to resume; the journal says what's done)
+	if not settings.resume:
+		probeEngine = ProbeEngine( installStates, metrics=settings.metrics )
+		registry.checkInstalls( probeEngine )
+		probeEngine.shutdown()
+		installStates.save()
+
+	# Select the workloads to install
+	if settings.resume:
+		journalState = RunJournal.read( os.path.join(homeFolder, settings.installJournalFile) )
+		if not journalState:
+			print( 'There is no interrupted installation to resume.' )
+			return 1
+		elif not journalState.remaining:
+			print( 'The last installation already completed successfully.' )
+			return 0
+	elif settings.only:
+		unknownNames = [ name for name in settings.only if name not in registry.byName ]
+		if unknownNames:
+			print( 'Unknown workload(s): ' + ', '.join(unknownNames) )
+			return 1
+		for record in registry:
+			registry.setSelected( record, record.name in settings.only or record.installed )
+	else:
+		suiteName = settings.suite or registry.defaultSuite
+		if suiteName not in registry.suites:
+			print( 'Unknown suite "{}"; available suites are: {}'.format(suiteName, ', '.join(registry.suites)) )
+			return 1
+		registry.applySuite( suiteName )
+
+	if not settings.resume and registry.pendingCount == 0:
+		print( 'All selected workloads are already installed.' )
+		return 0
+
+	try:
+		if settings.resume:
+			# The journal says what's left; finished workloads aren't re-checked or re-run
+			plan = resumePlan( journalState, registry.records )
+			print( 'Resuming the installation started {}'.format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(journalState.startTime or 0))) )
 		else:
-			self.totalTimeLabel.setText( 'Total installation time:  ' + humanReadableTime(totalTime) )
-
-	def installSelected( self ):
-
-		""" Iterates over all of the workload options and installs those that are selected. """
-
-		# Ensure one or more workloads are selected and they are not all already installed
-		nothingSelected = True
-		allInstalled = True
-		workloadOptions = self.findChildren( WorkloadSelection )
-		for wl in workloadOptions:
-			if wl.selected:
-				nothingSelected = False
-				if not wl.isInstalled():
-					allInstalled = False
-					break
-
-		if nothingSelected:
-			msg = QtWidgets.QMessageBox( self )
-			msg.setWindowTitle( 'Nothing to install' )
-			msg.setIcon( QtWidgets.QMessageBox.Icon.Warning )
-			msg.setText( "No workloads are selected!" )
-			msg.exec()
-			return
-		elif allInstalled:
-			msg = QtWidgets.QMessageBox( self )
-			msg.setWindowTitle( 'Nothing to install' )
-			msg.setIcon( QtWidgets.QMessageBox.Icon.Warning )
-			msg.setText( "All selected workloads are already installed!" )
-			msg.exec()
-			return
-
-		# Minimize the window so it doesn't interfere with installation processes
-		self.hide()
-
-		# Iterate over the workload objects and install those that are enabled
-		for wl in workloadOptions:
-			if wl.selected and not wl.isInstalled():
-				self.installWorkload( wl )
-
+			plan = resolvePlan( registry.selectedRecords(), registry.records, lambda record: record.installed )
+		admission = ResourceAdmission( settings.maxLoadPerCpu, settings.minFreeMemoryMB, settings.maxDiskBusy )
+		scheduler = InstallScheduler( plan, settings.maxParallelInstalls, settings.resourceLimits, admission )
+	except ValueError as err:
+		print( err )
+		return 2
+
+	if settings.showPlan:
+		printPlan( plan, settings )
+		return 0
+
+	estimatedTime = estimateMakespan( plan, settings.maxParallelInstalls, classLimits=settings.resourceLimits )
+	print( 'Installing {} workload(s); estimated time: {}'.format(len(plan), humanReadableTime(estimatedTime)) )
+	logFolder = os.path.join( homeFolder, settings.logFolder ) if settings.logFolder else None
+	payloadCache = PayloadCache( os.path.join(homeFolder, settings.payloadCacheFolder) ) if settings.payloadCacheFolder else None
+	archive = RunArchive( os.path.join(homeFolder, settings.runArchiveFolder) ) if settings.runArchiveFolder else None
+	runner = ProcessRunner( prefixOutput=(settings.maxParallelInstalls > 1), debugMode=settings.debugMode, 
+		logFolder=logFolder, maxLogBytes=settings.maxLogSize, logBackups=settings.logBackups, payloadCache=payloadCache,
+		warmRunners=settings.warmRunners, archive=archive, extractionThreads=settings.payloadExtractionThreads )
+	journal = RunJournal( os.path.join(homeFolder, settings.installJournalFile) ) if settings.installJournalFile else None
+	jobs = asyncio.run( runPlan(scheduler, runner, journal=journal, metrics=settings.metrics) )
+	settings.metrics.close()
+
+	if estimator:
+		estimator.recordJobs( jobs )
+		estimator.save()
+
+	failures = [ job.name for job in jobs if job.state != 'succeeded' ]
+	if failures:
+		print( 'Installation failed for: ' + ', '.join(failures) )
+		return 3
+	else:
 		print( 'All selected installations complete.' )
+		return 0
 
-		# Unminimize the program (must be shown for close method below to work)
-		self.show()
-
-		# Close the program if it is being run in automation
-		if self.closeAfterInstall and not debugMode:
-			self.close()
-		else:
-			if self.countdownLabel:
-				self.countdownLabel.setText( 'Installations complete.' )
-
-			# Show the completion message window
-			msg = QtWidgets.QMessageBox( self )
-			msg.setWindowTitle( 'Installations complete!' )
-			msg.setIcon( QtWidgets.QMessageBox.Icon.Information )
-			msg.setText( "All selected installations have completed." )
-			msg.exec()
-
-	def installWorkload( self, wl ):
 
-		""" Installs a given workload onto the SUT by running its installer in a new process. """
+def printPlan( plan, settings ):
 
-		if debugMode:
-			print( '       -  -  -' )
-			print( 'Running ' + wl.name + ' installer...' )
+	""" Prints the predicted schedule for installing the given plan (a dry run). """
 
-		# Get the current working directory for the target workload installer's directory
-		wlDir = os.path.dirname( wl.installerPath )
+	schedule, totalTime = simulatePlan( plan, settings.maxParallelInstalls, classLimits=settings.resourceLimits )
+	nameWidth = max( len(job.name) for job, _, _ in schedule )
+	planNames = { wl.name for wl in plan }
 
-		# Run the installer in a new process
-		process = Popen( wl.installerPath, cwd=wlDir, stdout=PIPE, stderr=PIPE, shell=True, text=True )
+	print( 'Installation plan for {} workload(s), up to {} at a time:'.format(len(plan), settings.maxParallelInstalls) )
+	print( '  {:>9}  {:>9}  {:<{}}  {}'.format('Start', 'Finish', 'Workload', nameWidth, 'Waits for / uses') )
+	for job, startTime, finishTime in schedule:
+		notes = [ name for name in job.after + job.requires if name in planNames ]
+		notes.extend( sorted(job.resources) + sorted(job.mutexGroups) )
+		print( '  {:>9}  {:>9}  {:<{}}  {}'.format(_clockTime(startTime), _clockTime(finishTime), job.name, nameWidth, ', '.join(notes)) )
+	print( 'Estimated total time: ' + humanReadableTime(totalTime) )
 
-		# Wait for the process to complete while printing output in real time
-		startTime = time.perf_counter()
-		timeout = 600
-		output = process.stdout.readline()
-		while output or process.poll() is None:
-			output = output.strip() # Removes leading and trailing whitespace
-			if output:
-				print( output )
-			elif time.perf_counter() - startTime >= timeout:
-				print( 'Installation time exceeded the timeout!' )
-				process.kill()
-			else:
-				time.sleep( .5 )
-			output = process.stdout.readline()
 
-		if debugMode:
-			toc = time.perf_counter()
-			print( 'Time to install {}: {}'.format(wl.name, toc-startTime) )
+def _clockTime( seconds ):
 
-		# Report any errors
-		returnCode = process.returncode
-		if returnCode != 0:
-			print( 'There was an error installing {}; error code {}'.format(wl.name, returnCode) )
-			print( process.stderr.read().strip() )
+	""" Formats seconds as 'h:mm:ss' (or 'm:ss' under an hour). """
 
-	def mousePressEvent( self, event ):
-
-		""" Used for dragging/positioning the window. """
-
-		self.resetIdleAnims()
-		self.abortAutoStart()
-		self.oldPosition = event.globalPosition().toPoint()
-
-	def mouseMoveEvent( self, event ):
-
-		""" Used for dragging/positioning the window. """
-
-		newPosition = event.globalPosition().toPoint()
-		delta = QPoint( newPosition - self.oldPosition )
-		self.move( self.x() + delta.x(), self.y() + delta.y() )
-		self.oldPosition = newPosition
-
-	def updateAutoStartLabel( self ):
-
-		""" Used with automation to automatically start installations after a timeout period. """
-
-		self.autoStartTimeout -= 1
-
-		if self.autoStartTimeout > 0:
-			self.countdownLabel.setText( 'Auto-start in ' + humanReadableTime(self.autoStartTimeout) )
-		else:
-			# Reached the timeout!
-			self.autoStartCountdown.stop()
-			self.countdownLabel.setText( 'Auto-starting installations...' )
-			self.installSelected()
-
-	def abortAutoStart( self ):
-
-		""" Cancels the auto-start procedure. Should be called if the user interacts with 
-			the program by clicking on any part of it. """
-
-		if self.countdownLabel:
-			self.autoStartCountdown.stop()
-			self.countdownLabel.setText( 'User activity detected. Auto-start aborted.' )
-
-	def resetIdleAnims( self ):
-
-		""" Prevents idle animations while a user is interacting with the program. """
-
-		self.idleAnimTimer.stop()
-		self.idleAnimTimer.start()
-
-	def fireIdleAnim( self ):
-
-		""" During periods of no user inactivity, randomly pick
-			two of the workload options and trigger their animation. """
-
-		workloadOptions = self.findChildren( WorkloadSelection )
-		randomOption = random.choice( workloadOptions )
-		randomOption.enterEvent()
-
-
-
-class StyledRadioButton( QtWidgets.QRadioButton ):
-
-	font = QtGui.QFont( 'Trebuchet', pointSize=10, weight=QtGui.QFont.Weight.DemiBold )
-
-	style = (
-			'QRadioButton'
-			'{'
-				'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
-			'}'
-			'QRadioButton::indicator'
-			'{'
-				'width: 24px;'
-				'height: 16px;'
-			'}'
-			'QRadioButton::indicator::unchecked'
-			'{'
-				'image: url("imgs/rbUnchecked.png");'
-			'}'
-			'QRadioButton::indicator:unchecked:hover'
-			'{'
-				'image: url("imgs/rbHovered.png");'
-			'}'
-			'QRadioButton::indicator::checked '
-			'{'
-				'image: url("imgs/rbChecked.png");'
-			'}'
-			'QRadioButton::indicator:checked:hover '
-			'{'
-				'image: url("imgs/rbCheckedHovered.png");'
-			'}'
-		)
-
-	def __init__( self, text, selectionHandler, checked=False ):
-		super().__init__( text )
-
-		self.suite = text
-		self.setChecked( checked )
-		self.setFont( self.font )
-
-		self.setStyleSheet( self.style )
-		self.setCursor( Qt.CursorShape.PointingHandCursor )
-
-		self.toggled.connect( selectionHandler )
-
-
-
-class StyledButton( QtWidgets.QPushButton ):
-
-	font = QtGui.QFont( 'Trebuchet', pointSize=11, weight=QtGui.QFont.Weight.DemiBold )
-	
-	style = (
-			'QPushButton {'
-				'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
-				'background-image: url("REPLACE_ME!");'
-				'background-position: center;'
-				'background-repeat: no-repeat;'
-				'padding: 3;'
-				'margin: 5px;'
-				'margin-left: 20px;'
-				'margin-right: 20px;'
-				'border-radius: 4px;'
-				'border: 1px inset rgb(90, 218, 255);'
-			'}'
-		)
-
-	def __init__( self, parent, text ):
-		super().__init__( text )
-
-		bgImagePath = parent.imagePaths['btn'].replace( '\\', '/' )
-		self.style = self.style.replace( 'REPLACE_ME!', bgImagePath )
-
-		self.setStyleSheet( self.style )
-		self.setFont( self.font )
-
-		self.anim = QPropertyAnimation( self, b"geometry" )
-		self.anim.setEasingCurve( QEasingCurve.Type.Linear )
-		self.anim.setDuration( 140 )
-
-		self.origGeom = None
-		self.largeGeom = None
-
-	def enterEvent( self, event ):
-		# Calculate new position/size
-		if not self.largeGeom:
-			self.origGeom = self.geometry()
-			newX = self.origGeom.x() - 4
-			newY = self.origGeom.y() - 3
-			newW = self.origGeom.width() + 8
-			newH = self.origGeom.height() + 6
-			self.largeGeom = QRect( newX, newY, newW, newH )
-
-		self.anim.setEndValue( self.largeGeom )
-		self.anim.start()
-
-	def leaveEvent( self, event ):
-		if self.origGeom:
-			self.anim.setEndValue( self.origGeom )
-			self.anim.start()
-
-
-
-class WorkloadSelection( QtWidgets.QLabel ):
-
-	elBlue = QtGui.QColor( 90, 218, 255 ) # Electric Blue
-	yellow = QtGui.QColor( 220, 207, 113 )
-	fadedBlue = QtGui.QColor( 104, 139, 149 ) # Faded Blue
-	whiteBlue = QtGui.QColor( 230, 250, 255 ) # Mostly-White Blue-ish
-
-	def __init__( self, parent, name, installTime, installerPath, checkInstallPath ):
-		super().__init__( parent )
-
-		self.bg = parent.selectionBg
-		self.mask = parent.selectionMask
-		self.checkMark = parent.checkMark
-
-		self.name = name
-		self.installTime = installTime
-		self.installerPath = installerPath
-		self.checkInstallPath = checkInstallPath
-		self.lines = [] # A list of base offsets or x-origins for the line(s)
-		self.width = 450
-
-		# Determine whether the workload should be selected by default
-		if debugMode or self.isInstalled():
-			self.selected = True
-		else:
-			self.selected = ( name in Balanced_Suite )
-
-		# Format install time (seconds to 'min:sec')
-		minutes = int( installTime / 60 ) # Rounds down
-		seconds = installTime % 60
-		if minutes >= 1:
-			self.installTimeStr = '{}:{:0>2}'.format( minutes, seconds )
-		else:
-			self.installTimeStr = '{} s'.format( seconds )
-
-		self.setMinimumSize( QSize(self.width, 42) )
-		self.setCursor( Qt.CursorShape.PointingHandCursor )
-		if debugMode: # Enable coords tooltip (enables self.mouseMoveEvent without needing to hold mouse-1)
-			self.setMouseTracking( True )
-
-		# Set up a clock to power animation loops
-		self.animTimer = QTimer()
-		self.animTimer.setInterval( 17 )
-		self.animTimer.timeout.connect( self.repaint )
-
-	def paintEvent( self, event ):
-		painter = QtGui.QPainter( self )
-		painter.drawImage( 0, 0, self.bg )
-		isInstalled = self.isInstalled()
-
-		# Set a white pen for font drawing
-		pen = painter.pen()
-		if self.selected or isInstalled:
-			pen.setColor( self.whiteBlue )
-		else:
-			pen.setColor( self.fadedBlue )
-		painter.setPen( pen )
-
-		# Set a font for the workload name
-		font = painter.font()
-		font.setFamily( 'Sylfaen' )
-		font.setBold( True )
-		font.setPointSize( 14 )
-		painter.setFont( font )
-		painter.drawText( 90, 28, self.name )
-
-		# Draw the time estimate
-		font.setBold( False )
-		font.setPointSize( 10 )
-		painter.setFont( font )
-		painter.drawText( 386, 26, self.installTimeStr )
-
-		# Set a mask for applying the edge-line animation
-		mask = QtGui.QBitmap.fromImage( self.mask )
-		mask = QRegion( mask )
-		painter.setClipRegion( mask )
-
-		# Draw the edge-line animations
-		if isInstalled:
-			pen.setColor( self.yellow )
-		else:
-			pen.setColor( self.elBlue )
-		lineUpdates = []
-		for line in self.lines:
-			xCoord = line + 10
-			pen.setWidth( 14 )
-			painter.setPen( pen )
-			painter.drawLine( xCoord+30, 10, xCoord, 32 )
-
-			pen.setWidth( 8 )
-			painter.setPen( pen )
-			painter.drawLine( xCoord+50, 10, xCoord+20, 32 )
-
-			if xCoord < self.width:
-				lineUpdates.append( xCoord )
-
-		# Draw a checkmark on the left if this workload is installed
-		if isInstalled:
-			painter.setClipping( False )
-			painter.drawImage( 40, 0, self.checkMark )
-
-		# Update the lines list with new offsets (forgetting finished ones)
-		self.lines = lineUpdates
-		if not self.lines:
-			self.animTimer.stop()
-
-	def isInstalled( self ):
-		if os.path.exists( self.checkInstallPath ):
-			return True
-		else:
-			return False
-
-	def mousePressEvent( self, event=None ):
-		# Queue up an animation
-		self.lines.append( -40 )
-		self.animTimer.start()
+	minutes, seconds = divmod( int(round(seconds)), 60 )
+	hours, minutes = divmod( minutes, 60 )
+	if hours:
+		return '{}:{:0>2}:{:0>2}'.format( hours, minutes, seconds )
+	else:
+		return '{}:{:0>2}'.format( minutes, seconds )
+
+
+def queryArchive( settings ):
+
+	""" Prints installations from the run archive (from the last --runs, for the --only
+		workloads, that failed with --failures, or with output matching --search), and
+		returns an exit code: 0, or 1 if some of the archived output couldn't be read. """
+
+	homeFolder = os.path.dirname( os.path.abspath(__file__) )
+	archive = RunArchive( os.path.join(homeFolder, settings.runArchiveFolder) )
+	encoding = locale.getpreferredencoding( False ) # As used to decode installer output
+	maxLines = 10 # Per installation
+
+	def printLines( lines ):
+		for line in lines[:maxLines]:
+			print( '    ' + line.decode(encoding, 'replace') )
+		if len( lines ) > maxLines:
+			print( '    ... and {} more'.format(len(lines) - maxLines) )
+
+	entries = archive.query( settings.queryRuns, settings.only, settings.failures )
+	if not entries:
+		print( 'No archived installations match.' )
+		return 0
+
+	exitCode = 0
+	if settings.search is not None:
+		text = settings.search.encode( encoding )
+		found = 0
+		for entry in entries:
+			try:
+				lines = archive.search( entry, text )
+			except OSError as err:
+				print( 'Unable to search the output of {} from run {}; {}'.format(entry.workload, entry.runId, err) )
+				exitCode = 1
+				continue
+			if lines:
+				print( '{}  {}  (exit code {}):'.format(entry.runId, entry.workload, entry.exitCode) )
+				printLines( lines )
+				found += 1
+		print( 'Found in the output of {} of {} archived installations.'.format(found, len(entries)) )
+
+	elif settings.failures:
+		for entry in entries:
+			print( '{}  {}  failed with exit code {} after {}:'.format(entry.runId, entry.workload, entry.exitCode, _clockTime(entry.endTime - entry.startTime)) )
+			if entry.errorLines:
+				try:
+					printLines( archive.errorLines(entry) )
+				except OSError as err:
+					print( '    (unable to read its output; {})'.format(err) )
+					exitCode = 1
+		print( '{} failed installation(s).'.format(len(entries)) )
 
-		mainWindow = self.window()
-		mainWindow.abortAutoStart()
-		mainWindow.resetIdleAnims()
+	else:
+		lastRunId = None
+		nameWidth = max( len(entry.workload) for entry in entries )
+		for entry in entries:
+			if entry.runId != lastRunId:
+				print( 'Run {}:'.format(entry.runId) )
+				lastRunId = entry.runId
+			result = 'succeeded' if entry.exitCode == 0 else 'failed (exit code {})'.format( entry.exitCode )
+			print( '  {:<{}}  {:>9}  {}'.format(entry.workload, nameWidth, _clockTime(entry.endTime - entry.startTime), result) )
 
-		# If this workload is not already installed, update/toggle the selection
-		if not self.isInstalled():
-			self.selected = not self.selected
+	return exitCode
 
-			# Show this as a "Custom" installation suite
-			mainWindow.customradioBtn.setChecked( True )
-			mainWindow.updateTotalTime()
 
-	def enterEvent( self, event=None ):
-		self.lines.append( -40 )
-		self.animTimer.start()
-		self.window().resetIdleAnims()
+def packAssetBundle( settings ):
 
-	def mouseMoveEvent( self, event=None ):
+	""" Packs the images used by the GUI into the asset bundle, and returns an exit code. """
 
-		""" Tooltip to show mouse coordinates, for debugging/development. """
+	homeFolder = os.path.dirname( os.path.abspath(__file__) )
+	bundlePath = os.path.join( homeFolder, settings.assetBundleFile )
 
-		position = event.position()
-		toolTipPosition = self.mapToGlobal( position.toPoint() )
-		toolTipPosition.setX( toolTipPosition.x()+10 )
-		toolTipPosition.setY( toolTipPosition.y()-60 )
-		text = f"x: {position.x()}\ny: {position.y()}"
-		QtWidgets.QToolTip.showText( toolTipPosition, text )
+	try:
+		count = packAssets( os.path.join(homeFolder, 'imgs'), bundlePath )
+	except OSError as err:
+		print( 'Unable to pack the asset bundle; {}'.format(err) )
+		return 1
 
+	print( 'Packed {} images into "{}".'.format(count, bundlePath) )
+	return 0
 
 
 if __name__ == "__main__":
-	# Parse command line arguments
-	if debugMode:
-		print( 'CMD arguments: ' + str(sys.argv) )
-	if len( sys.argv ) > 1:
-		try:
-			autoStartTimeout = int( sys.argv[1] )
-		except:
-			print( 'Invalid command line args; usage:' )
-			print( '    "' + sys.argv + '" [autoStartTimeout]' )
-			print( '' )
-			print( 'The option "autoStartTimeout" should be an integer, and' )
-			print( 'should indicate the number of seconds before the program' )
-			print( 'automatically starts installations for the default suite.' )
-			sys.exit( 1 )
+	timeline = StartupTimeline()
+	settings = parseArguments( sys.argv[1:] )
+	timeline.enabled = settings.profileStartup
+	settings.startupTimeline = timeline
+	homeFolder = os.path.dirname( os.path.abspath(__file__) )
+	stateFolder = agentHomeFolder( settings, homeFolder ) if settings.agent else homeFolder
+	if settings.collectMetrics:
+		settings.metrics = Metrics( True, os.path.join(stateFolder, settings.metricsEventsFile), os.path.join(stateFolder, settings.metricsFile) )
 	else:
-		autoStartTimeout = 0
-
-	# Start the interface
-	app = QApplication( sys.argv )
-
-	window = AutoInstallerChooser( autoStartTimeout )
-	window.show()
+		settings.metrics = Metrics( bool(settings.agent) ) # Agents serve metrics from memory
+	if settings.debugMode:
+		print( 'CMD arguments: ' + str(sys.argv) )
 
-	app.exec()
\ No newline at end of file
+	if settings.packAssets:
+		sys.exit( packAssetBundle(settings) )
+	elif settings.querying:
+		sys.exit( queryArchive(settings) )
+	elif settings.agent:
+		sys.exit( runAgent(settings, homeFolder, stateFolder) )
+	elif settings.controller:
+		sys.exit( runController(settings) )
+	elif settings.headless or settings.showPlan:
+		sys.exit( runHeadless(settings) )
+	else:
+		# Qt is only loaded when the GUI is actually needed
+		timeline.mark( 'Arguments parsed' )
+		from InstallerGui import runGui
+		timeline.mark( 'GUI modules imported (PyQt)' )
+		sys.exit( runGui(settings) )
@@ -0,0 +1,168 @@
+# Benchmark for the installation engine (scheduler and process runner). Generates
+# a set of synthetic workloads (POSIX shell scripts with a configurable runtime,
+# output volume, exit code, etc.), installs them headlessly, and reports how much
+# time and CPU the supervisor spent on top of the workloads themselves.
+#
+# e.g.  python Benchmark.py --workloads 100 --runtime 0.2 --stdout-kb 256 --jobs 8
+
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+from Runner import ProcessRunner, runPlan
+from Scheduler import InstallScheduler, estimateMakespan
+from Workloads import WorkloadInfo
+
+
+lineText = 'Synthetic installer output; copying files and registering components...'
+lineBytes = len( lineText ) + 1 # Including the newline
+
+
+def generateWorkloads( folder, options ):
+
+	""" Writes the synthetic installer scripts to the given folder, and returns a list
+		of WorkloadInfo objects for them (with installTime set to the expected runtime). """
+
+	rng = random.Random( options.seed )
+	workloads = []
+
+	for index in range( options.workloads ):
+		name = 'Synthetic Workload {}'.format( index + 1 )
+		wlFolder = os.path.join( folder, name )
+		os.makedirs( wlFolder )
+
+		hangs = rng.random() < options.hang_rate
+		fails = not hangs and rng.random() < options.fail_rate
+		stdoutLines = options.stdout_kb * 1024 // lineBytes
+		stderrLines = options.stderr_kb * 1024 // lineBytes
+
+		if options.python:
+			script = [ '#!/usr/bin/env python3', 'import sys, time', 'line = {!r}'.format(lineText + '\n') ]
+			if stdoutLines:
+				script.append( 'sys.stdout.write( line * {} )'.format(stdoutLines) )
+			if stderrLines:
+				script.append( 'sys.stderr.write( line * {} )'.format(stderrLines) )
+			if hangs:
+				script.append( 'time.sleep( 1000000 )' )
+			elif options.runtime:
+				script.append( 'time.sleep( {} )'.format(options.runtime) )
+			script.append( 'sys.exit( {} )'.format(3 if fails else 0) )
+		else:
+			script = [ '#!/bin/sh' ]
+			if stdoutLines:
+				script.append( 'yes "{}" | head -n {}'.format(lineText, stdoutLines) )
+			if stderrLines:
+				script.append( 'yes "{}" | head -n {} >&2'.format(lineText, stderrLines) )
+			if hangs:
+				script.append( 'sleep 1000000' )
+			elif options.runtime:
+				script.append( 'sleep {}'.format(options.runtime) )
+			script.append( 'exit {}'.format(3 if fails else 0) )
+
+		installerPath = os.path.join( wlFolder, 'install.py' if options.python else 'install.sh' )
+		with open( installerPath, 'w' ) as file:
+			file.write( '\n'.join(script) + '\n' )
+		os.chmod( installerPath, 0o755 )
+
+		expectedTime = options.timeout if hangs else options.runtime
+		workloads.append( WorkloadInfo(name, expectedTime, installerPath, os.path.join(wlFolder, 'Done.txt')) )
+
+	return workloads
+
+
+def runBenchmark( workloads, options ):
+
+	""" Installs the given workloads and returns a dict of measurements. """
+
+	import resource # POSIX only
+
+	scheduler = InstallScheduler( workloads, options.jobs )
+	runner = ProcessRunner( timeout=options.timeout, prefixOutput=(options.jobs > 1), warmRunners=options.warm_runners )
+
+	# Installer output is normally printed; send it to a null device unless it's wanted
+	with open( os.devnull, 'w' ) as devnull:
+		if options.show_output:
+			sink = contextlib.nullcontext()
+		else:
+			sink = contextlib.redirect_stdout( devnull )
+
+		usageBefore = resource.getrusage( resource.RUSAGE_SELF )
+		startTime = time.perf_counter()
+		with sink:
+			jobs = asyncio.run( runPlan(scheduler, runner) )
+		wallTime = time.perf_counter() - startTime
+		usageAfter = resource.getrusage( resource.RUSAGE_SELF )
+
+	supervisorCpu = ( usageAfter.ru_utime - usageBefore.ru_utime ) + ( usageAfter.ru_stime - usageBefore.ru_stime )
+	idealTime = estimateMakespan( workloads, options.jobs )
+	outputBytes = len( workloads ) * ( options.stdout_kb + options.stderr_kb ) * 1024
+	jobOverheads = [ job.duration - options.runtime for job in jobs if job.duration is not None and job.returnCode in (0, 3) ]
+
+	return {
+		'workloads': len( workloads ),
+		'jobs': options.jobs,
+		'succeeded': sum( 1 for job in jobs if job.state == 'succeeded' ),
+		'failed': sum( 1 for job in jobs if job.state == 'failed' ),
+		'wallTime': wallTime,
+		'idealTime': idealTime,
+		'overheadTime': wallTime - idealTime,
+		'perWorkloadOverhead': sum( jobOverheads ) / len( jobOverheads ) if jobOverheads else None,
+		'supervisorCpu': supervisorCpu,
+		'outputBytes': outputBytes,
+		'outputThroughput': outputBytes / wallTime if wallTime else None, # Bytes per second
+	}
+
+
+def printReport( results ):
+	print( 'Workloads:              {} ({} succeeded, {} failed) with {} worker(s)'.format(
+		results['workloads'], results['succeeded'], results['failed'], results['jobs']) )
+	print( 'Wall-clock time:        {:.3f} s'.format(results['wallTime']) )
+	print( 'Ideal (simulated) time: {:.3f} s'.format(results['idealTime']) )
+	print( 'Scheduling overhead:    {:.3f} s'.format(results['overheadTime']) )
+	if results['perWorkloadOverhead'] is not None:
+		print( 'Per-workload overhead:  {:.1f} ms'.format(results['perWorkloadOverhead'] * 1000) )
+	print( 'Supervisor CPU time:    {:.3f} s'.format(results['supervisorCpu']) )
+	print( 'Output throughput:      {:.2f} MB/s ({:.1f} MB total)'.format(
+		results['outputThroughput'] / 1048576, results['outputBytes'] / 1048576) )
+
+
+def parseArguments( args ):
+	parser = argparse.ArgumentParser( description='Benchmarks the workload installation engine using synthetic workloads.' )
+	parser.add_argument( '--workloads', type=int, default=20, help='number of synthetic workloads (default: %(default)s)' )
+	parser.add_argument( '--jobs', type=int, default=4, help='workloads to install at once (default: %(default)s)' )
+	parser.add_argument( '--runtime', type=float, default=0.5, help='seconds each workload sleeps for (default: %(default)s)' )
+	parser.add_argument( '--stdout-kb', type=int, default=16, help='KB of stdout each workload writes (default: %(default)s)' )
+	parser.add_argument( '--stderr-kb', type=int, default=0, help='KB of stderr each workload writes (default: %(default)s)' )
+	parser.add_argument( '--fail-rate', type=float, default=0.0, help='fraction of workloads that exit with an error (default: %(default)s)' )
+	parser.add_argument( '--hang-rate', type=float, default=0.0, help='fraction of workloads that never finish (default: %(default)s)' )
+	parser.add_argument( '--timeout', type=float, default=600, help='installer timeout, in seconds (default: %(default)s)' )
+	parser.add_argument( '--python', action='store_true', help='generate Python installers, rather than shell scripts' )
+	parser.add_argument( '--warm-runners', type=int, default=0, metavar='N', help='run Python installers in N warm worker processes (default: start an interpreter for each)' )
+	parser.add_argument( '--seed', type=int, default=1, help='random seed for choosing failing/hanging workloads' )
+	parser.add_argument( '--show-output', action='store_true', help='print installer output, rather than discarding it' )
+	parser.add_argument( '--json', action='store_true', help='print the results as JSON' )
+	return parser.parse_args( args )
+
+
+if __name__ == "__main__":
+	if os.name == 'nt':
+		print( 'The benchmark generates POSIX shell scripts, and must be run on Linux/macOS.' )
+		sys.exit( 1 )
+
+	options = parseArguments( sys.argv[1:] )
+
+	with tempfile.TemporaryDirectory( prefix='installerBenchmark' ) as folder:
+		workloads = generateWorkloads( folder, options )
+		results = runBenchmark( workloads, options )
+
+	if options.json:
+		print( json.dumps(results, indent=1) )
+	else:
+		printReport( results )
@@ -0,0 +1,93 @@
+# Installation time estimates learned from past runs. Measured durations are
+# kept per workload and per machine profile (so that one history file may be
+# shared by many machines), and smoothed with an exponentially-weighted
+# moving average so that a single unusual run doesn't skew the estimate.
+
+
+import os
+import json
+import platform
+
+
+def machineProfile():
+
+	""" Returns a short description of this machine's hardware class. Machines with
+		the same profile share estimates. """
+
+	return '{} {} ({} CPUs)'.format( platform.system(), platform.machine(), os.cpu_count() )
+
+
+class InstallTimeEstimator:
+
+	""" Loads, updates, and saves the install-time history file. """
+
+	def __init__( self, historyPath, profile=None, smoothing=0.3 ):
+		self.historyPath = historyPath
+		self.profile = profile or machineProfile()
+		self.smoothing = smoothing # Weight given to the newest measurement
+		self.entries = {} # Key = workload name, value = { 'average': seconds }
+		self.changed = set()
+
+		self.entries = self._read().get( self.profile, {} )
+
+	def _read( self ):
+		try:
+			with open( self.historyPath, 'r', encoding='utf-8' ) as file:
+				history = json.load( file )
+			return history if isinstance( history, dict ) else {}
+		except FileNotFoundError:
+			return {}
+		except (OSError, ValueError) as err:
+			print( 'Unable to read the install-time history; {}'.format(err) )
+			return {}
+
+	def estimate( self, name, default ):
+
+		""" Returns the estimated install time for a workload, in whole seconds, or
+			the given default if it has never been measured on this machine profile. """
+
+		entry = self.entries.get( name )
+		if not entry:
+			return default
+		return max( 1, round(entry['average']) )
+
+	def recordRun( self, name, seconds ):
+
+		""" Adds the measured duration of a successful installation. """
+
+		entry = self.entries.get( name )
+		if entry:
+			entry['average'] += self.smoothing * ( seconds - entry['average'] )
+		else:
+			self.entries[name] = { 'average': seconds }
+		self.changed.add( name )
+
+	def recordJobs( self, jobs ):
+
+		""" Records the durations of the successful jobs from an installation plan. """
+
+		for job in jobs:
+			if job.state == 'succeeded' and job.duration is not None:
+				self.recordRun( job.name, job.duration )
+
+	def save( self ):
+
+		""" Writes changed entries to the history file, merging them with whatever is
+			there now (other machines may have updated it since it was loaded). """
+
+		if not self.changed:
+			return
+
+		history = self._read()
+		profileEntries = history.setdefault( self.profile, {} )
+		for name in self.changed:
+			profileEntries[name] = self.entries[name]
+
+		try:
+			tempPath = '{}.{}.tmp'.format( self.historyPath, os.getpid() )
+			with open( tempPath, 'w', encoding='utf-8' ) as file:
+				json.dump( history, file, indent=1 )
+			os.replace( tempPath, self.historyPath )
+			self.changed.clear()
+		except OSError as err:
+			print( 'Unable to save the install-time history; {}'.format(err) )
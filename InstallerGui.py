@@ -0,0 +1,1418 @@
+# The graphical interface for the workload installer. This module is only
+# imported when the GUI is requested (see AutoInstaller.py), since loading
+# PyQt is by far the slowest part of starting the program.
+
+
+import os
+import sys
+import time
+import random
+
+from collections import OrderedDict
+
+from PyQt6 import QtGui, QtWidgets
+from PyQt6.QtGui import QRegion
+from PyQt6.QtCore import ( Qt, QObject, QEvent, QFileSystemWatcher, pyqtSignal, QPoint, QSize, QTimer, QRect, QElapsedTimer,
+	QAbstractListModel, QModelIndex, QSortFilterProxyModel )
+from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QGridLayout, QLabel
+
+from Assets import loadAssets
+from Runner import ProcessRunner, InstallSession
+from PayloadCache import PayloadCache
+from RunArchive import RunArchive
+from Journal import RunJournal, resumePlan
+from Resources import ResourceAdmission
+from Probes import ProbeEngine, ProbeResultCache
+from Estimates import InstallTimeEstimator
+from Scheduler import InstallScheduler, resolvePlan, estimateMakespan
+from Workloads import loadManifest, ManifestError, InstallStateCache, WorkloadRegistry, humanReadableTime
+
+
+os.environ['QT_FONT_DPI'] = "96" # Prevent system upscaling of the GUI
+
+
+
+def isRemoteSession():
+
+	""" Makes a best guess at whether the program is being displayed over a remote 
+		desktop connection (where every animation frame costs bandwidth). """
+
+	if os.name == 'nt':
+		return os.environ.get( 'SESSIONNAME', '' ).upper().startswith( 'RDP-' )
+	else:
+		display = os.environ.get( 'DISPLAY', '' )
+		return bool( os.environ.get('SSH_CONNECTION') ) and not display.startswith( ':' )
+
+
+class InstallEvents( QObject ):
+
+	""" Relays progress from the background installation and probe threads to the GUI thread. """
+
+	event = pyqtSignal( str, object, object ) # eventName, workload, data
+	complete = pyqtSignal( object ) # The list of jobs that were run
+	probed = pyqtSignal( object, bool ) # An install probe, and whether its workload is installed
+
+
+
+class AnimationClock( QObject ):
+
+	""" A single timer that drives all running widget animations. Widgets register with 
+		start(), and then have their advanceAnimation( elapsedMs ) method called on each 
+		tick until it returns False. Each widget repaints just what its advance changed
+		(e.g. by invalidating rows, or via setGeometry). The clock can be suspended for 
+		any number of reasons (e.g. while the window is hidden), and only runs while 
+		none apply. """
+
+	normalInterval = 17 # Milliseconds (~60 FPS)
+	reducedInterval = 100 # Milliseconds (10 FPS)
+
+	def __init__( self, reducedMotion=False ):
+		super().__init__()
+
+		self.reducedMotion = reducedMotion
+		self.widgets = set()
+		self.suspendReasons = set()
+
+		self.timer = QTimer()
+		self.timer.setInterval( self.reducedInterval if reducedMotion else self.normalInterval )
+		self.timer.timeout.connect( self.tick )
+		self.elapsedTimer = QElapsedTimer()
+
+	@property
+	def suspended( self ):
+		return bool( self.suspendReasons )
+
+	def start( self, widget ):
+
+		""" Registers a widget with an animation to play. """
+
+		self.widgets.add( widget )
+		if not self.suspendReasons and not self.timer.isActive():
+			self.elapsedTimer.start()
+			self.timer.start()
+
+	def tick( self ):
+		elapsed = self.elapsedTimer.restart()
+
+		for widget in list( self.widgets ):
+			if not widget.advanceAnimation( elapsed ):
+				self.widgets.discard( widget )
+
+		if not self.widgets:
+			self.timer.stop()
+
+	def suspend( self, reason ):
+		self.suspendReasons.add( reason )
+		self.timer.stop()
+
+	def resume( self, reason ):
+		self.suspendReasons.discard( reason )
+		if not self.suspendReasons and self.widgets and not self.timer.isActive():
+			self.elapsedTimer.start()
+			self.timer.start()
+
+
+
+class AutoInstallerChooser( QMainWindow ):
+
+	labelStyle = (
+			'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
+		)
+	filterStyle = (
+			'QLineEdit {'
+				'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
+				'background: rgba(0, 0, 0, 90);'
+				'border: 1px solid rgb(90, 218, 255);'
+				'border-radius: 4px;'
+				'padding: 1px 6px;'
+			'}'
+		)
+	filterHeight = 36 # Space taken by the filter box, when it's shown
+
+	def __init__( self, settings ):
+		super().__init__()
+
+		# Set window properties
+		self.setWindowTitle( 'Workload Installer' )
+		self.setWindowFlags( Qt.WindowType.FramelessWindowHint )
+		self.setAttribute( Qt.WidgetAttribute.WA_TranslucentBackground )
+
+		self.settings = settings
+		self.scriptHomeFolder = os.path.dirname( os.path.abspath(__file__) )
+		os.chdir( self.scriptHomeFolder )
+		self.autoStartTimeout = autoStartTimeout = settings.autoStartTimeout
+		self.cascadeRecords = [] # Records whose rows are yet to be updated after a suite selection
+		self.suiteSwitchStart = None # When the suite selection currently cascading was made
+		self.metrics = settings.metrics
+
+		# Set up the timer for the cascading effect when a suite is selected
+		self.cascadeTimer = QTimer()
+		self.cascadeTimer.setInterval( 50 )
+		self.cascadeTimer.timeout.connect( self.advanceCascade )
+		self.installing = False
+		self.installSession = None
+		self.installWhenChecked = False # Set if installation was requested while install probes were running
+
+		# Set up the relay for installation progress updates
+		self.installEvents = InstallEvents()
+
+		# Total-time updates are deferred, so several selection changes cause one recalculation
+		self.totalTimeTimer = QTimer()
+		self.totalTimeTimer.setSingleShot( True )
+		self.totalTimeTimer.setInterval( 0 )
+		self.totalTimeTimer.timeout.connect( self.showTotalTime )
+		self.installEvents.event.connect( self.installEvent )
+		self.installEvents.complete.connect( self.installComplete )
+		self.installEvents.probed.connect( self.probeFinished )
+
+		# Create the clock that drives all animations
+		if settings.reducedMotion is None:
+			self.animationClock = AnimationClock( isRemoteSession() )
+		else:
+			self.animationClock = AnimationClock( settings.reducedMotion )
+
+		# Install states are checked in the background, cached, and re-checked when the folders containing them change
+		self.cacheFolder = os.path.join( self.scriptHomeFolder, settings.cacheFolder ) if settings.cacheFolder else None
+		probeCachePath = os.path.join( self.cacheFolder, 'installProbes.cache' ) if self.cacheFolder else None
+		self.installStates = InstallStateCache( ProbeResultCache(probeCachePath, settings.probeCacheTTL) )
+		self.probeEngine = ProbeEngine( self.installStates, metrics=settings.metrics )
+
+		if autoStartTimeout:
+			self.closeAfterInstall = True
+		else:
+			self.closeAfterInstall = False
+
+		# Open the images (from the packed asset bundle, if there is one)
+		imagesFolder = os.path.join( self.scriptHomeFolder, 'imgs' )
+		bundlePath = os.path.join( self.scriptHomeFolder, settings.assetBundleFile ) if settings.assetBundleFile else None
+		self.assets = loadAssets( imagesFolder, bundlePath )
+
+		# Load some images (so it doesn't have to be done repeatedly for each workload option)
+		self.selectionBg = QtGui.QImage.fromData( self.assets.read('optionBg') )
+		self.checkMark = self.loadPixmap( 'checkMark' )
+		selectionMask = QtGui.QImage.fromData( self.assets.read('mask') ).createAlphaMask()
+		self.selectionClip = QRegion( QtGui.QBitmap.fromImage(selectionMask) ) # Clips the edge-line animations
+		settings.startupTimeline.mark( 'Assets loaded' )
+
+		# Establish the main frame object to attach workload choices and the button frame
+		self.mainFrame = QVBoxLayout()
+		self.mainFrame.setAlignment( Qt.AlignmentFlag.AlignCenter ) # Align in the center of the bgWidget
+		self.mainFrame.setContentsMargins( 0, 20, 0, 20 )
+
+		# Load the workload definitions, and add them to the GUI
+		try:
+			manifest = loadManifest( settings.manifestFile, self.scriptHomeFolder, self.cacheFolder )
+		except ManifestError as err:
+			print( err )
+			sys.exit( 2 )
+		self.registry = WorkloadRegistry( manifest, self.installStates, selectAll=settings.debugMode )
+
+		# Replace the manifest's install times with estimates learned from past runs
+		if settings.installHistoryFile:
+			self.estimator = InstallTimeEstimator( os.path.join(self.scriptHomeFolder, settings.installHistoryFile) )
+			self.registry.applyEstimates( self.estimator )
+		else:
+			self.estimator = None
+
+		# Ensure at least some of the workload installers were found
+		if not len( self.registry ):
+			print( 'No workload installers could be found, and no options could be added to the GUI.' )
+			sys.exit( 2 )
+
+		# Start checking which workloads are installed; rows show as 'checking' until their results arrive
+		self.probeEngine.submit( self.registry.uncheckedProbes(), self.installEvents.probed.emit )
+
+		self.fileWatcher = QFileSystemWatcher()
+		self.watchProbeFolders()
+		self.fileWatcher.directoryChanged.connect( self.checkPathsChanged )
+
+		# Watch the manifest, and apply changes to it (once they've settled) without restarting
+		self.manifestPath = os.path.join( self.scriptHomeFolder, settings.manifestFile )
+		self.manifestWatcher = QFileSystemWatcher( [self.manifestPath, os.path.dirname(self.manifestPath)] )
+		self.manifestWatcher.fileChanged.connect( self.manifestFileChanged )
+		self.manifestWatcher.directoryChanged.connect( self.manifestFileChanged )
+		self.manifestReloadTimer = QTimer()
+		self.manifestReloadTimer.setSingleShot( True )
+		self.manifestReloadTimer.setInterval( 300 )
+		self.manifestReloadTimer.timeout.connect( self.reloadManifest )
+		self.manifestStat = self.statManifest()
+		self.reloadAfterInstall = False # Set if the manifest changed while installing
+
+		# Add a little spacing between options (proportionally less if there are more options)
+		spacing = ( 10 - len(self.registry) ) * 3
+		if spacing < 0:
+			spacing = 0
+		optionHeight = 42 + spacing
+		self.mainFrame.setSpacing( spacing )
+		if settings.debugMode:
+			print( 'option height: {}    spacing: {}'.format(optionHeight, spacing) )
+
+		# Show as many options as fit on the screen; the rest are reached by scrolling (or filtering)
+		screen = QApplication.instance().screens()[0]
+		maxHeight = screen.availableGeometry().height() - 200 - ( 30 if autoStartTimeout else 0 ) - self.filterHeight
+		visibleRows = min( len(self.registry), max(3, maxHeight // optionHeight) )
+		scrolling = visibleRows < len( self.registry )
+
+		# Add the list of workload options
+		self.listModel = WorkloadListModel( self.registry )
+		self.registry.addObserver( self.workloadChanged )
+		self.workloadList = WorkloadListView( self, self.listModel, optionHeight, spacing )
+		listWidth = self.workloadList.rowWidth
+		if scrolling:
+			listWidth += self.workloadList.verticalScrollBar().sizeHint().width()
+			self.filterBox = QtWidgets.QLineEdit()
+			self.filterBox.setPlaceholderText( 'Filter workloads by name' )
+			self.filterBox.setClearButtonEnabled( True )
+			self.filterBox.setStyleSheet( self.filterStyle )
+			self.filterBox.setFixedSize( self.workloadList.rowWidth - 80, self.filterHeight - 10 )
+			self.filterBox.textChanged.connect( self.filterChanged )
+			self.mainFrame.addWidget( self.filterBox, alignment=Qt.AlignmentFlag.AlignHCenter )
+		else:
+			self.filterBox = None
+		self.workloadList.setFixedSize( listWidth, visibleRows * optionHeight )
+		self.mainFrame.addWidget( self.workloadList, alignment=Qt.AlignmentFlag.AlignHCenter )
+
+		settings.startupTimeline.mark( 'Manifest loaded and workload rows built' )
+
+		# Load and resize the background image
+		if settings.useRandomBackgrounds:
+			bgName = random.choice( ['bg1', 'bg2', 'bg3'] )
+		else:
+			bgName = 'bg1'
+		pixmapBg = self.loadPixmap( bgName )
+		appWidth = pixmapBg.width()
+		appHeight = ( visibleRows * optionHeight ) + 200
+		if scrolling:
+			appHeight += self.filterHeight
+		if autoStartTimeout:
+			appHeight += 30
+		if settings.debugMode:
+			print( 'appheight: ' + str(appHeight) )
+		appBg = pixmapBg.scaled( appWidth, appHeight )
+
+		# Get display dimensions and center the program in the middle of the screen
+		self.resize( appWidth, appHeight )
+		qtRectangle = self.frameGeometry()
+		if settings.debugMode:
+			print('screen 0 geometry: ', screen.availableGeometry() )
+		centerPoint = screen.availableGeometry().center()
+		qtRectangle.moveCenter( centerPoint )
+		self.move( qtRectangle.topLeft() )
+
+		# Attach the background and main frame widget
+		bgWidget = QLabel()
+		bgWidget.setPixmap( appBg )
+		bgWidget.setLayout( self.mainFrame )
+		self.setCentralWidget( bgWidget )
+
+		# Add lower buttons to the interface
+		self.buttonsFrame = QGridLayout()
+		self.buttonsFrame.setContentsMargins( 50, 20, 50, 0 ) # Set (mostly) Left/Right margins
+		self.buttonsFrame.setSpacing( 15 ) # Set inter-widget padding
+
+		# Add total install time display
+		self.totalTimeLabel = QLabel()
+		self.totalTimeLabel.setStyleSheet( self.labelStyle )
+		self.updateTotalTime()
+
+		# Add the Install/Cancel buttons
+		self.installBtn = StyledButton( self, 'Install' )
+		self.installBtn.setMinimumSize( 130, 30 )
+		self.installBtn.clicked.connect( self.installSelected )
+
+		self.cancelBtn = StyledButton( self, 'Cancel' )
+		self.cancelBtn.setMinimumSize( 130, 30 )
+		self.cancelBtn.clicked.connect( self.close )
+
+		# Add the timeout display
+		self.autoStartCountdown = QTimer()
+		if autoStartTimeout:
+			self.countdownLabel = QLabel( 'Auto-start in ' + humanReadableTime(autoStartTimeout) )
+			self.countdownLabel.setStyleSheet( self.labelStyle )
+
+			# Create a timer to count down to the auto-start procedure
+			self.autoStartCountdown.setInterval( 1000 )
+			self.autoStartCountdown.timeout.connect( self.updateAutoStartLabel )
+			self.autoStartCountdown.start()
+		else:
+			self.countdownLabel = None
+
+		# Add the suite-selection radio buttons, and lay out the rest around them
+		self.suiteButtons = []
+		self.layoutButtons( self.registry.defaultSuite )
+		self.mainFrame.addLayout( self.buttonsFrame )
+
+		# Continue an interrupted installation, if requested
+		if settings.resume:
+			self.resumeInstall()
+
+		# Animations when the program is idle
+		self.idleAnimTimer = QTimer()
+		self.idleAnimTimer.setInterval( 4000 )
+		self.idleAnimTimer.timeout.connect( self.fireIdleAnim )
+		if not self.animationClock.reducedMotion:
+			self.idleAnimTimer.start()
+
+		settings.startupTimeline.mark( 'Window built' )
+		if settings.startupTimeline.enabled:
+			bgWidget.installEventFilter( self ) # To catch the first paint
+
+	def layoutButtons( self, checkedSuite ):
+
+		""" Creates the suite-selection radio buttons (those from the manifest, plus Full and
+			Custom), replacing any already there, and lays out the other buttons and labels
+			below them, spanning the same number of columns. """
+
+		frame = self.buttonsFrame
+		for btn in self.suiteButtons:
+			frame.removeWidget( btn )
+			btn.setParent( None ) # Takes it out of the radio buttons' exclusive group immediately
+			btn.deleteLater()
+
+		suiteNames = self.registry.suiteNames + [ 'Full', 'Custom' ]
+		columns = len( suiteNames )
+		self.suiteButtons = []
+		for column, suiteName in enumerate( suiteNames ):
+			radioBtn = StyledRadioButton( self, suiteName, self.suiteSelected, checked=(suiteName == checkedSuite) )
+			radioBtn.setEnabled( not self.installing )
+			frame.addWidget( radioBtn, 0, column )
+			self.suiteButtons.append( radioBtn )
+		self.customradioBtn = radioBtn
+		if checkedSuite not in suiteNames:
+			self.customradioBtn.setChecked( True )
+
+		for widget in ( self.totalTimeLabel, self.installBtn, self.cancelBtn, self.countdownLabel ):
+			if widget:
+				frame.removeWidget( widget )
+		frame.addWidget( self.totalTimeLabel, 1, 0, 1, columns, Qt.AlignmentFlag.AlignCenter )
+		frame.addWidget( self.installBtn, 2, 0, 1, columns // 2 )
+		frame.addWidget( self.cancelBtn, 2, columns // 2, 1, columns - columns // 2 )
+		if self.countdownLabel:
+			frame.addWidget( self.countdownLabel, 3, 0, 1, columns, Qt.AlignmentFlag.AlignCenter )
+
+	def watchProbeFolders( self ):
+
+		""" Watches the folders containing install-probe paths (and stops watching those
+			that no longer contain any). """
+
+		folders = { folder for folder in self.installStates.folders() if os.path.isdir(folder) }
+		watched = set( self.fileWatcher.directories() )
+		if watched - folders:
+			self.fileWatcher.removePaths( list(watched - folders) )
+		if folders - watched:
+			self.fileWatcher.addPaths( list(folders - watched) )
+
+	def statManifest( self ):
+		try:
+			stat = os.stat( self.manifestPath )
+			return ( stat.st_mtime_ns, stat.st_size )
+		except OSError:
+			return None
+
+	def manifestFileChanged( self, path ):
+
+		""" Called by the manifest watcher when the manifest (or its folder) changes. Editors
+			often save by replacing the file, which stops it being watched, so it's watched
+			again once it's back. The reload waits for changes to settle. """
+
+		if os.path.exists( self.manifestPath ) and self.manifestPath not in self.manifestWatcher.files():
+			self.manifestWatcher.addPath( self.manifestPath )
+		if self.statManifest() != self.manifestStat: # Not just another file in the folder changing
+			self.manifestReloadTimer.start()
+
+	def reloadManifest( self ):
+
+		""" Loads the changed manifest and applies only its differences: rows are added,
+			removed, or updated in place, suite buttons are rebuilt if the suites were renamed,
+			current selections are kept, and only new or changed install probes are run.
+			Deferred until any installation in progress has finished. """
+
+		if self.installing:
+			self.reloadAfterInstall = True
+			return
+
+		stat = self.statManifest()
+		if stat is None or stat == self.manifestStat:
+			return
+		self.manifestStat = stat
+
+		try:
+			manifest = loadManifest( self.settings.manifestFile, self.scriptHomeFolder, self.cacheFolder )
+		except ManifestError as err:
+			print( err )
+			return
+		if not manifest.workloads:
+			print( 'The changed workload manifest has no usable workloads; keeping the current ones.' )
+			return
+
+		self.finishCascade()
+		suite = self.getSelectedSuite()
+		changes = self.registry.reload( manifest, selectSuite=suite )
+		if not changes:
+			return
+
+		self.workloadList.animations.clear() # Keyed by record ID, which may have changed
+		self.listModel.syncRecords( changes.updated )
+		if self.estimator:
+			self.registry.applyEstimates( self.estimator )
+		if changes.suitesChanged:
+			self.layoutButtons( suite )
+		self.watchProbeFolders()
+		if changes.probes:
+			self.probeEngine.submit( changes.probes, self.installEvents.probed.emit )
+		self.updateTotalTime()
+
+		print( 'Reloaded the workload manifest: {} added, {} removed, {} changed.'.format(len(changes.added), len(changes.removed), len(changes.updated)) )
+
+	def eventFilter( self, watched, event ):
+
+		""" Used with --profile-startup, to time the first paint of the window. """
+
+		if event.type() == QEvent.Type.Paint:
+			watched.removeEventFilter( self )
+			QTimer.singleShot( 0, self.firstPaintDone ) # Runs once the paint has finished
+		return False
+
+	def firstPaintDone( self ):
+		self.settings.startupTimeline.mark( 'First paint' )
+		self.settings.startupTimeline.report()
+
+	def loadPixmap( self, name ):
+
+		""" Returns a pixmap of the given image from the assets. """
+
+		pixmap = QtGui.QPixmap()
+		pixmap.loadFromData( self.assets.read(name) )
+		return pixmap
+
+	def workloadChanged( self, record ):
+
+		""" Called by the registry when a workload's selection, install state, or 
+			estimated install time changes. """
+
+		self.listModel.recordChanged( record )
+		if not self.installing:
+			self.updateTotalTime()
+
+	def suiteSelected( self ):
+
+		""" Called whenever the suite radio buttons are changed. The new selections are 
+			applied immediately, and then revealed in the GUI with a cascading effect. """
+
+		radioButton = self.sender()
+		if not radioButton.isChecked():
+			return
+
+		# Complete any cascade still in progress from a previous suite selection
+		self.finishCascade()
+
+		if radioButton.suite in self.registry.suites:
+			self.suiteSwitchStart = time.perf_counter()
+			with self.metrics.timer( 'gui_suite_apply_seconds' ):
+				# Keep showing the current selections until the cascade reaches each row
+				shownSelected = self.workloadList.shownSelected
+				for record in self.registry:
+					shownSelected[record.id] = record.selected
+				self.registry.applySuite( radioButton.suite )
+			self.metrics.event( 'suiteSelected', suite=radioButton.suite )
+
+			self.cascadeRecords = list( reversed(self.registry.records) ) # Reversed so records may be popped from the end
+			self.cascadeTimer.start()
+
+		elif radioButton.suite != 'Custom':
+			raise Exception( 'Invalid Suite selection: {}'.format(radioButton.suite) )
+
+		self.resetIdleAnims()
+		self.updateTotalTime()
+
+	def advanceCascade( self ):
+
+		""" Reveals the new selection state of the next row(s) in the cascade. The number 
+			of rows per step grows with the list, so the cascade takes at most ~1 second. """
+
+		rowsPerStep = max( 1, -(-len(self.registry) // 20) ) # Rounds up
+		for _ in range( rowsPerStep ):
+			if not self.cascadeRecords:
+				break
+			record = self.cascadeRecords.pop()
+			self.workloadList.shownSelected.pop( record.id, None )
+			self.workloadList.updateRecord( record )
+			if record.selected:
+				# Trigger an animation on this workload (if it's in view)
+				self.workloadList.startAnimation( record )
+
+		if not self.cascadeRecords:
+			self.cascadeTimer.stop()
+			self.endSuiteSwitch()
+
+	def finishCascade( self ):
+
+		""" Immediately reveals the selection state of any rows the cascade hasn't reached. """
+
+		self.cascadeTimer.stop()
+		if self.cascadeRecords:
+			self.workloadList.shownSelected.clear()
+			self.workloadList.viewport().update()
+		self.cascadeRecords = []
+		self.endSuiteSwitch()
+
+	def endSuiteSwitch( self ):
+
+		""" Records how long the last suite selection took to be fully shown. """
+
+		if self.suiteSwitchStart is not None:
+			self.metrics.observe( 'gui_suite_switch_seconds', time.perf_counter() - self.suiteSwitchStart )
+			self.suiteSwitchStart = None
+
+	def filterChanged( self, text ):
+
+		""" Called as the text in the filter box is edited. """
+
+		self.abortAutoStart()
+		self.resetIdleAnims()
+		self.workloadList.setFilter( text )
+
+	def getSelectedSuite( self ):
+
+		""" Checks the radio buttons and returns the currently selected suite. """
+
+		for btn in self.suiteButtons:
+			if btn.isChecked():
+				return btn.suite
+
+	def updateTotalTime( self ):
+
+		""" Updates the total installation time displayed to the user (once control 
+			returns to the event loop). Should be called any time the selection of 
+			workloads changes. """
+
+		self.totalTimeTimer.start()
+
+	def showTotalTime( self ):
+
+		""" Calculates and displays the total installation time. When installing in 
+			parallel, this is the predicted time for the whole plan to complete. """
+
+		if self.installing:
+			return
+
+		registry = self.registry
+
+		if registry.checkingCount > 0:
+			if self.installWhenChecked:
+				self.totalTimeLabel.setText( 'Waiting for install checks to finish...' )
+			else:
+				self.totalTimeLabel.setText( 'Checking which workloads are installed...' )
+		elif registry.allSelected and registry.pendingCount == 0:
+			self.totalTimeLabel.setText( 'All workloads have been installed.' )
+		elif registry.pendingCount == 0:
+			self.totalTimeLabel.setText( 'All selected workloads have been installed.' )
+		elif registry.pendingSeconds == 0:
+			self.totalTimeLabel.setText( 'Nothing selected to install.' )
+		elif self.settings.maxParallelInstalls > 1:
+			try:
+				plan = resolvePlan( registry.selectedRecords(), registry.records, lambda record: record.installed )
+				totalTime = estimateMakespan( plan, self.settings.maxParallelInstalls, classLimits=self.settings.resourceLimits )
+			except ValueError: # Invalid dependencies; reported if installation is attempted
+				totalTime = registry.pendingSeconds
+			self.totalTimeLabel.setText( 'Total installation time:  ' + humanReadableTime(totalTime) )
+		else:
+			self.totalTimeLabel.setText( 'Total installation time:  ' + humanReadableTime(registry.pendingSeconds) )
+
+	def installSelected( self ):
+
+		""" Iterates over all of the workload options and installs those that are selected. """
+
+		# Wait for install states to be known before deciding what to install
+		if self.registry.checkingCount > 0:
+			self.installWhenChecked = True
+			self.totalTimeLabel.setText( 'Waiting for install checks to finish...' )
+			return
+
+		# Ensure one or more workloads are selected and they are not all already installed
+		if self.registry.selectedCount == 0:
+			msg = QtWidgets.QMessageBox( self )
+			msg.setWindowTitle( 'Nothing to install' )
+			msg.setIcon( QtWidgets.QMessageBox.Icon.Warning )
+			msg.setText( "No workloads are selected!" )
+			msg.exec()
+			return
+		elif self.registry.pendingCount == 0:
+			msg = QtWidgets.QMessageBox( self )
+			msg.setWindowTitle( 'Nothing to install' )
+			msg.setIcon( QtWidgets.QMessageBox.Icon.Warning )
+			msg.setText( "All selected workloads are already installed!" )
+			msg.exec()
+			return
+
+		# Determine what to install (including any workloads the selections require)
+		try:
+			plan = resolvePlan( self.registry.selectedRecords(), self.registry.records, lambda record: record.installed )
+			scheduler = self.createScheduler( plan )
+		except ValueError as err:
+			msg = QtWidgets.QMessageBox( self )
+			msg.setWindowTitle( 'Invalid workload configuration' )
+			msg.setIcon( QtWidgets.QMessageBox.Icon.Critical )
+			msg.setText( str(err) )
+			msg.exec()
+			return
+
+		self.startInstall( plan, scheduler )
+
+	def createScheduler( self, plan ):
+
+		""" Returns an InstallScheduler for the given plan, using the parallelism and
+			resource limits from the settings. May raise ValueError for an invalid plan. """
+
+		settings = self.settings
+		admission = ResourceAdmission( settings.maxLoadPerCpu, settings.minFreeMemoryMB, settings.maxDiskBusy )
+		return InstallScheduler( plan, settings.maxParallelInstalls, settings.resourceLimits, admission )
+
+	def startInstall( self, plan, scheduler ):
+
+		""" Locks the GUI and starts installing the given plan in the background. """
+
+		# Lock the selections (and pause animations) while installing
+		self.finishCascade()
+		self.installing = True
+		self.setAnimationsPaused( 'installing', True )
+		self.installBtn.setEnabled( False )
+		for btn in self.suiteButtons:
+			btn.setEnabled( False )
+		self.installsTotal = len( plan )
+		self.installsFinished = 0
+		self.updateInstallProgress()
+
+		# Install the workloads in the background (running independent ones in 
+		# parallel), so the GUI remains responsive while they're running
+		logFolder = os.path.join( self.scriptHomeFolder, self.settings.logFolder ) if self.settings.logFolder else None
+		if self.settings.payloadCacheFolder:
+			payloadCache = PayloadCache( os.path.join(self.scriptHomeFolder, self.settings.payloadCacheFolder) )
+		else:
+			payloadCache = None
+		archive = RunArchive( os.path.join(self.scriptHomeFolder, self.settings.runArchiveFolder) ) if self.settings.runArchiveFolder else None
+		runner = ProcessRunner( prefixOutput=(self.settings.maxParallelInstalls > 1), debugMode=self.settings.debugMode, 
+			logFolder=logFolder, maxLogBytes=self.settings.maxLogSize, logBackups=self.settings.logBackups, payloadCache=payloadCache,
+			warmRunners=self.settings.warmRunners, archive=archive, extractionThreads=self.settings.payloadExtractionThreads )
+		if self.settings.installJournalFile:
+			journal = RunJournal( os.path.join(self.scriptHomeFolder, self.settings.installJournalFile) )
+		else:
+			journal = None
+		self.installSession = InstallSession( scheduler, runner, self.installEvents.event.emit, self.installEvents.complete.emit, journal, self.metrics )
+		self.installSession.start()
+
+	def resumeInstall( self ):
+
+		""" Selects the workloads an interrupted installation didn't finish (according
+			to the install journal), and starts installing them once the GUI is shown. """
+
+		journalState = RunJournal.read( os.path.join(self.scriptHomeFolder, self.settings.installJournalFile) )
+		if not journalState or not journalState.remaining:
+			print( 'There is no interrupted installation to resume.' )
+			return
+
+		try:
+			plan = resumePlan( journalState, self.registry.records )
+			scheduler = self.createScheduler( plan )
+		except ValueError as err:
+			print( err )
+			return
+
+		planIds = { record.id for record in plan }
+		for record in self.registry:
+			self.registry.setSelected( record, record.id in planIds or record.installed )
+		self.customradioBtn.setChecked( True )
+
+		self.autoStartCountdown.stop()
+		if self.countdownLabel:
+			self.countdownLabel.setText( 'Resuming installations...' )
+		QTimer.singleShot( 0, lambda: self.startInstall(plan, scheduler) )
+
+	def installEvent( self, eventName, record, data ):
+
+		""" Called (in the GUI thread) as workloads are started, finished, or skipped. """
+
+		if eventName != 'started':
+			self.installsFinished += 1
+			probe = self.registry.setChecking( record )
+			self.probeEngine.submit( [probe], self.installEvents.probed.emit, useCache=False )
+
+		self.updateInstallProgress()
+
+	def checkPathsChanged( self, folder ):
+
+		""" Called by the filesystem watcher when a folder containing install-probe paths 
+			changes. Re-checks the probes for those paths in the background. """
+
+		probes = self.installStates.probesInFolder( folder )
+		for probe in probes:
+			self.registry.setChecking( self.registry.byProbe[probe] )
+		self.probeEngine.submit( probes, self.installEvents.probed.emit )
+
+	def probeFinished( self, probe, installed ):
+
+		""" Called (in the GUI thread) with each install probe's result. """
+
+		self.registry.setProbeResult( probe, installed )
+
+		if self.registry.checkingCount == 0:
+			self.installStates.save()
+			if self.installWhenChecked:
+				self.installWhenChecked = False
+				self.installSelected()
+
+	def updateInstallProgress( self ):
+
+		""" Shows the installations in progress, in place of the total installation time. """
+
+		self.totalTimeLabel.setText( 'Installing...   {} of {} complete'.format(self.installsFinished, self.installsTotal) )
+
+	def installComplete( self, jobs ):
+
+		""" Called (in the GUI thread) once all installations have finished. """
+
+		print( 'All selected installations complete.' )
+
+		# Learn from how long the installations took
+		if self.estimator:
+			self.estimator.recordJobs( jobs )
+			self.estimator.save()
+			self.registry.applyEstimates( self.estimator )
+
+		self.installing = False
+		self.setAnimationsPaused( 'installing', False )
+		self.installBtn.setEnabled( True )
+		for btn in self.suiteButtons:
+			btn.setEnabled( True )
+		self.updateTotalTime()
+		if self.reloadAfterInstall:
+			self.reloadAfterInstall = False
+			self.reloadManifest()
+
+		# Close the program if it is being run in automation
+		if self.closeAfterInstall and not self.settings.debugMode:
+			self.close()
+		else:
+			if self.countdownLabel:
+				self.countdownLabel.setText( 'Installations complete.' )
+
+			# Show the completion message window
+			msg = QtWidgets.QMessageBox( self )
+			msg.setWindowTitle( 'Installations complete!' )
+			msg.setIcon( QtWidgets.QMessageBox.Icon.Information )
+			msg.setText( "All selected installations have completed." )
+			msg.exec()
+
+	def closeEvent( self, event ):
+
+		""" Stops any installations still in progress when the program is closed. """
+
+		if self.installSession and self.installSession.is_alive():
+			self.installSession.cancel()
+			self.installSession.join( 10 )
+		self.probeEngine.shutdown()
+		self.installStates.save()
+		self.metrics.close()
+
+		event.accept()
+
+	def mousePressEvent( self, event ):
+
+		""" Used for dragging/positioning the window. """
+
+		self.resetIdleAnims()
+		self.abortAutoStart()
+		self.oldPosition = event.globalPosition().toPoint()
+
+	def mouseMoveEvent( self, event ):
+
+		""" Used for dragging/positioning the window. """
+
+		newPosition = event.globalPosition().toPoint()
+		delta = QPoint( newPosition - self.oldPosition )
+		self.move( self.x() + delta.x(), self.y() + delta.y() )
+		self.oldPosition = newPosition
+
+	def updateAutoStartLabel( self ):
+
+		""" Used with automation to automatically start installations after a timeout period. """
+
+		self.autoStartTimeout -= 1
+
+		if self.autoStartTimeout > 0:
+			self.countdownLabel.setText( 'Auto-start in ' + humanReadableTime(self.autoStartTimeout) )
+		else:
+			# Reached the timeout!
+			self.autoStartCountdown.stop()
+			self.countdownLabel.setText( 'Auto-starting installations...' )
+			self.installSelected()
+
+	def abortAutoStart( self ):
+
+		""" Cancels the auto-start procedure. Should be called if the user interacts with 
+			the program by clicking on any part of it. """
+
+		if self.countdownLabel:
+			self.autoStartCountdown.stop()
+			self.countdownLabel.setText( 'User activity detected. Auto-start aborted.' )
+
+	def showEvent( self, event ):
+		self.setAnimationsPaused( 'hidden', False )
+
+	def hideEvent( self, event ):
+		self.setAnimationsPaused( 'hidden', True )
+
+	def changeEvent( self, event ):
+
+		""" Pauses animations while the window is minimized. """
+
+		if event.type() == QEvent.Type.WindowStateChange:
+			self.setAnimationsPaused( 'minimized', self.isMinimized() )
+		super().changeEvent( event )
+
+	def setAnimationsPaused( self, reason, paused ):
+
+		""" Suspends or resumes the animation clock and idle animations for the given reason. 
+			Animations only run while there are no reasons for them to be paused. """
+
+		if paused:
+			self.animationClock.suspend( reason )
+			self.idleAnimTimer.stop()
+		else:
+			self.animationClock.resume( reason )
+			self.resetIdleAnims()
+
+	def resetIdleAnims( self ):
+
+		""" Prevents idle animations while a user is interacting with the program. """
+
+		self.idleAnimTimer.stop()
+		if not self.animationClock.suspended and not self.animationClock.reducedMotion:
+			self.idleAnimTimer.start()
+
+	def fireIdleAnim( self ):
+
+		""" During periods of no user inactivity, randomly pick
+			two of the workload options and trigger their animation. """
+
+		records = self.workloadList.visibleRecords()
+		if records:
+			self.workloadList.startAnimation( random.choice(records) )
+
+
+
+class StyledRadioButton( QtWidgets.QRadioButton ):
+
+	font = QtGui.QFont( 'Trebuchet', pointSize=10, weight=QtGui.QFont.Weight.DemiBold )
+
+	style = (
+			'QRadioButton'
+			'{'
+				'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
+			'}'
+			'QRadioButton::indicator'
+			'{'
+				'width: 24px;'
+				'height: 16px;'
+			'}'
+			'QRadioButton::indicator::unchecked'
+			'{'
+				'image: url("imgs/rbUnchecked.png");'
+			'}'
+			'QRadioButton::indicator:unchecked:hover'
+			'{'
+				'image: url("imgs/rbHovered.png");'
+			'}'
+			'QRadioButton::indicator::checked '
+			'{'
+				'image: url("imgs/rbChecked.png");'
+			'}'
+			'QRadioButton::indicator:checked:hover '
+			'{'
+				'image: url("imgs/rbCheckedHovered.png");'
+			'}'
+		)
+
+	def __init__( self, parent, text, selectionHandler, checked=False ):
+		super().__init__( text )
+
+		self.suite = text
+		self.setChecked( checked )
+		self.setFont( self.font )
+
+		# Point the style at the indicator images (which may come from the asset bundle)
+		style = self.style
+		for name in ( 'rbUnchecked', 'rbHovered', 'rbChecked', 'rbCheckedHovered' ):
+			style = style.replace( 'imgs/{}.png'.format(name), parent.assets.filePath(name).replace('\\', '/') )
+		self.setStyleSheet( style )
+		self.setCursor( Qt.CursorShape.PointingHandCursor )
+
+		self.toggled.connect( selectionHandler )
+
+
+
+class StyledButton( QtWidgets.QPushButton ):
+
+	font = QtGui.QFont( 'Trebuchet', pointSize=11, weight=QtGui.QFont.Weight.DemiBold )
+	
+	style = (
+			'QPushButton {'
+				'color: rgb(230, 250, 255);' # Mostly-White Blue-ish
+				'background-image: url("REPLACE_ME!");'
+				'background-position: center;'
+				'background-repeat: no-repeat;'
+				'padding: 3;'
+				'margin: 5px;'
+				'margin-left: 20px;'
+				'margin-right: 20px;'
+				'border-radius: 4px;'
+				'border: 1px inset rgb(90, 218, 255);'
+			'}'
+		)
+
+	def __init__( self, parent, text ):
+		super().__init__( text )
+
+		bgImagePath = parent.assets.filePath( 'btn' ).replace( '\\', '/' )
+		self.style = self.style.replace( 'REPLACE_ME!', bgImagePath )
+
+		self.setStyleSheet( self.style )
+		self.setFont( self.font )
+
+		self.animationClock = parent.animationClock
+		self.animDuration = 140 # Milliseconds
+		self.animStart = None
+		self.animEnd = None
+		self.animProgress = 1.0
+
+		self.origGeom = None
+		self.largeGeom = None
+
+	def enterEvent( self, event ):
+		# Calculate new position/size
+		if not self.largeGeom:
+			self.origGeom = self.geometry()
+			newX = self.origGeom.x() - 4
+			newY = self.origGeom.y() - 3
+			newW = self.origGeom.width() + 8
+			newH = self.origGeom.height() + 6
+			self.largeGeom = QRect( newX, newY, newW, newH )
+
+		self.animateTo( self.largeGeom )
+
+	def leaveEvent( self, event ):
+		if self.origGeom:
+			self.animateTo( self.origGeom )
+
+	def animateTo( self, geometry ):
+
+		""" Starts a linear grow/shrink animation from the current geometry to the given one. """
+
+		if self.animationClock.reducedMotion:
+			self.setGeometry( geometry )
+			return
+
+		self.animStart = self.geometry()
+		self.animEnd = geometry
+		self.animProgress = 0.0
+		self.animationClock.start( self )
+
+	def advanceAnimation( self, elapsed ):
+
+		""" Called by the animation clock. Returns whether the animation is still running.
+			Changing the geometry repaints the button. """
+
+		self.animProgress = min( 1.0, self.animProgress + elapsed / self.animDuration )
+		start, end, progress = self.animStart, self.animEnd, self.animProgress
+
+		self.setGeometry( QRect(
+			round( start.x() + (end.x() - start.x()) * progress ),
+			round( start.y() + (end.y() - start.y()) * progress ),
+			round( start.width() + (end.width() - start.width()) * progress ),
+			round( start.height() + (end.height() - start.height()) * progress )
+		) )
+
+		return self.animProgress < 1.0
+
+
+
+class WorkloadListModel( QAbstractListModel ):
+
+	""" Presents the workload registry's records (one per row, in display order) to the
+		workload list view. Row numbers are the same as record IDs. """
+
+	def __init__( self, registry ):
+		super().__init__()
+		self.registry = registry
+		self.records = list( registry.records )
+
+	def rowCount( self, parent=QModelIndex() ):
+		if parent.isValid():
+			return 0
+		return len( self.records )
+
+	def data( self, index, role=Qt.ItemDataRole.DisplayRole ):
+		record = self.records[index.row()]
+		if role == Qt.ItemDataRole.DisplayRole:
+			return record.name
+		elif role == Qt.ItemDataRole.ToolTipRole:
+			return record.toolTip or None
+		elif role == Qt.ItemDataRole.UserRole:
+			return record
+		return None
+
+	def recordChanged( self, record ):
+
+		""" Should be called when a record's selection, install state, or time estimate changes. """
+
+		index = self.index( record.id )
+		self.dataChanged.emit( index, index )
+
+	def syncRecords( self, updated=() ):
+
+		""" Brings the rows up-to-date with the registry's records after it's reloaded,
+			removing, inserting, and moving only the rows that changed (so the view keeps
+			its scroll position, and other rows aren't re-laid out). 'updated' are records
+			whose definitions changed. """
+
+		newRecords = self.registry.records
+		kept = set( newRecords )
+
+		# Remove rows of records no longer in the registry (in contiguous runs, from the bottom up)
+		row = len( self.records ) - 1
+		while row >= 0:
+			if self.records[row] in kept:
+				row -= 1
+				continue
+			last = row
+			while row > 0 and self.records[row-1] not in kept:
+				row -= 1
+			self.beginRemoveRows( QModelIndex(), row, last )
+			del self.records[row:last+1]
+			self.endRemoveRows()
+			row -= 1
+
+		# Insert new rows and move reordered ones, so each row matches the registry
+		current = set( self.records )
+		for row, record in enumerate( newRecords ):
+			if row < len( self.records ) and self.records[row] is record:
+				continue
+			elif record not in current:
+				self.beginInsertRows( QModelIndex(), row, row )
+				self.records.insert( row, record )
+				self.endInsertRows()
+			else:
+				oldRow = self.records.index( record, row )
+				self.beginMoveRows( QModelIndex(), oldRow, oldRow, QModelIndex(), row )
+				self.records.insert( row, self.records.pop(oldRow) )
+				self.endMoveRows()
+
+		for record in updated:
+			self.recordChanged( record )
+
+
+
+class WorkloadDelegate( QtWidgets.QStyledItemDelegate ):
+
+	""" Paints the rows of the workload list. Only rows in view are ever painted; their
+		pre-rendered backgrounds and text are cached for the most recently painted rows. """
+
+	elBlue = QtGui.QColor( 90, 218, 255 ) # Electric Blue
+	yellow = QtGui.QColor( 220, 207, 113 )
+	fadedBlue = QtGui.QColor( 104, 139, 149 ) # Faded Blue
+	whiteBlue = QtGui.QColor( 230, 250, 255 ) # Mostly-White Blue-ish
+	checkingFont = QtGui.QFont( 'Trebuchet', pointSize=8 )
+	maxCachedLayers = 64
+
+	def __init__( self, view, mainWindow ):
+		super().__init__( view )
+
+		self.view = view
+		self.bg = mainWindow.selectionBg
+		self.clipRegion = mainWindow.selectionClip
+		self.checkMark = mainWindow.checkMark
+		self.staticLayers = OrderedDict() # Pre-rendered background and text; key = (record ID, name, time, textIsBright, pixelRatio)
+
+	def sizeHint( self, option, index ):
+		return QSize( self.view.rowWidth, self.view.rowHeight )
+
+	@staticmethod
+	def formatInstallTime( seconds ):
+
+		""" Formats an install time (seconds to 'min:sec'). """
+
+		minutes = int( seconds / 60 ) # Rounds down
+		if minutes >= 1:
+			return '{}:{:0>2}'.format( minutes, seconds % 60 )
+		else:
+			return '{} s'.format( seconds % 60 )
+
+	def staticLayer( self, record, bright ):
+
+		""" Returns a pixmap of a row's background, name, and time estimate, rendering it
+			if it's not in the cache (e.g. the first time the row is scrolled into view). """
+
+		ratio = self.view.devicePixelRatioF()
+		installTimeStr = self.formatInstallTime( record.installTime )
+		key = ( record.id, record.name, installTimeStr, bright, ratio )
+		pixmap = self.staticLayers.get( key )
+		if pixmap:
+			self.staticLayers.move_to_end( key )
+			return pixmap
+
+		width = max( self.bg.width(), self.view.rowWidth )
+		height = max( self.bg.height(), 42 )
+		pixmap = QtGui.QPixmap( round(width * ratio), round(height * ratio) )
+		pixmap.setDevicePixelRatio( ratio )
+		pixmap.fill( Qt.GlobalColor.transparent )
+
+		painter = QtGui.QPainter( pixmap )
+		painter.drawImage( 0, 0, self.bg )
+
+		# Set a white pen for font drawing
+		pen = painter.pen()
+		if bright:
+			pen.setColor( self.whiteBlue )
+		else:
+			pen.setColor( self.fadedBlue )
+		painter.setPen( pen )
+
+		# Set a font for the workload name
+		font = QtGui.QFont( self.view.font() )
+		font.setFamily( 'Sylfaen' )
+		font.setBold( True )
+		font.setPointSize( 14 )
+		painter.setFont( font )
+		painter.drawText( 90, 28, record.name )
+
+		# Draw the time estimate
+		font.setBold( False )
+		font.setPointSize( 10 )
+		painter.setFont( font )
+		painter.drawText( 386, 26, installTimeStr )
+		painter.end()
+
+		self.staticLayers[key] = pixmap
+		if len( self.staticLayers ) > self.maxCachedLayers:
+			self.staticLayers.popitem( last=False )
+		return pixmap
+
+	def paint( self, painter, option, index ):
+		view = self.view
+		record = index.data( Qt.ItemDataRole.UserRole )
+		isInstalled = record.installed
+		selected = view.shownSelected.get( record.id, record.selected )
+
+		painter.save()
+		painter.translate( option.rect.x(), option.rect.y() + view.rowSpacing // 2 )
+		painter.drawPixmap( 0, 0, self.staticLayer(record, selected or isInstalled) )
+
+		# Show that the install state isn't known yet
+		if record.checking and not isInstalled:
+			painter.setPen( self.fadedBlue )
+			painter.setFont( self.checkingFont )
+			painter.drawText( 22, 26, 'checking' )
+
+		# Draw the edge-line animations (clipped to the shape of the option's background)
+		lines = view.animations.get( record.id )
+		if lines:
+			painter.setClipRegion( self.clipRegion )
+			if isInstalled:
+				pen = QtGui.QPen( self.yellow )
+			else:
+				pen = QtGui.QPen( self.elBlue )
+
+			for xCoord in lines:
+				pen.setWidth( 14 )
+				painter.setPen( pen )
+				painter.drawLine( xCoord+30, 10, xCoord, 32 )
+
+				pen.setWidth( 8 )
+				painter.setPen( pen )
+				painter.drawLine( xCoord+50, 10, xCoord+20, 32 )
+
+		# Draw a checkmark on the left if this workload is installed
+		if isInstalled:
+			painter.setClipping( False )
+			painter.drawPixmap( 40, 0, self.checkMark )
+
+		painter.restore()
+
+
+
+class WorkloadListView( QtWidgets.QListView ):
+
+	""" A scrolling list of the workload options, which may be filtered by name. Rows are
+		painted by the WorkloadDelegate, and only those in view are painted or animated, so
+		the cost of the list doesn't grow with the number of workloads. """
+
+	style = (
+			'QListView { background: transparent; }'
+			'QScrollBar:vertical { background: transparent; width: 8px; margin: 0px; }'
+			'QScrollBar::handle:vertical { background: rgba(90, 218, 255, 120); border-radius: 4px; min-height: 30px; }'
+			'QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical { height: 0px; }'
+			'QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical { background: none; }'
+		)
+
+	def __init__( self, mainWindow, model, rowHeight, rowSpacing ):
+		super().__init__()
+
+		self.mainWindow = mainWindow
+		self.registry = mainWindow.registry
+		self.animationClock = mainWindow.animationClock
+		self.metrics = mainWindow.metrics
+		self.debugMode = mainWindow.settings.debugMode
+		self.rowWidth = 450
+		self.rowHeight = rowHeight
+		self.rowSpacing = rowSpacing
+
+		self.animations = {} # Edge-line animations; key = record ID, value = list of line x-origins
+		self.shownSelected = {} # Overrides the displayed selection state while a suite selection cascades; key = record ID
+
+		# Filtering is done by a proxy between the model and the view
+		self.sourceModel = model
+		self.filterModel = QSortFilterProxyModel()
+		self.filterModel.setSourceModel( model )
+		self.filterModel.setFilterCaseSensitivity( Qt.CaseSensitivity.CaseInsensitive )
+		self.setModel( self.filterModel )
+		self.setItemDelegate( WorkloadDelegate(self, mainWindow) )
+
+		self.setUniformItemSizes( True ) # Rows are laid out without measuring each one
+		self.setSelectionMode( QtWidgets.QAbstractItemView.SelectionMode.NoSelection )
+		self.setVerticalScrollMode( QtWidgets.QAbstractItemView.ScrollMode.ScrollPerPixel )
+		self.verticalScrollBar().setSingleStep( rowHeight // 2 )
+		self.setHorizontalScrollBarPolicy( Qt.ScrollBarPolicy.ScrollBarAlwaysOff )
+		self.setFocusPolicy( Qt.FocusPolicy.NoFocus )
+		self.setFrameShape( QtWidgets.QFrame.Shape.NoFrame )
+		self.setStyleSheet( self.style )
+		self.viewport().setAutoFillBackground( False )
+		self.viewport().setCursor( Qt.CursorShape.PointingHandCursor )
+		self.setMouseTracking( True ) # For the entered signal, to animate rows as the mouse moves over them
+		self.viewport().setMouseTracking( True )
+		self.entered.connect( self.rowEntered )
+
+	def setFilter( self, text ):
+
+		""" Shows only the workloads with the given text in their name. """
+
+		self.filterModel.setFilterFixedString( text )
+		for recordId in list( self.animations ):
+			if not self.isRecordVisible( self.registry.records[recordId] ):
+				del self.animations[recordId]
+
+	def indexOf( self, record ):
+
+		""" Returns the view's model index for a record (invalid if it's filtered out). """
+
+		return self.filterModel.mapFromSource( self.sourceModel.index(record.id) )
+
+	def isRecordVisible( self, record ):
+		index = self.indexOf( record )
+		return index.isValid() and self.visualRect( index ).intersects( self.viewport().rect() )
+
+	def visibleRecords( self ):
+
+		""" Returns the records of the rows currently in view. """
+
+		first = self.indexAt( QPoint(0, 0) ).row()
+		if first == -1:
+			return []
+		last = self.indexAt( QPoint(0, self.viewport().height() - 1) ).row()
+		if last == -1:
+			last = self.filterModel.rowCount() - 1
+		return [ self.filterModel.index(row, 0).data(Qt.ItemDataRole.UserRole) for row in range(first, last + 1) ]
+
+	def updateRecord( self, record ):
+
+		""" Repaints a record's row, if it's in view. """
+
+		index = self.indexOf( record )
+		if index.isValid():
+			self.viewport().update( self.visualRect(index) )
+
+	def startAnimation( self, record ):
+
+		""" Queues up a new edge-line animation sweep across a row (if it's in view). """
+
+		if self.isRecordVisible( record ):
+			self.animations.setdefault( record.id, [] ).append( -40 )
+			self.animationClock.start( self )
+
+	def advanceAnimation( self, elapsed ):
+
+		""" Called by the animation clock. Moves the lines along (at 10 pixels per 17 ms), 
+			forgetting those that have finished, and those in rows scrolled out of view.
+			Returns whether any lines remain. """
+
+		step = round( 10 * elapsed / 17 )
+		for recordId in list( self.animations ):
+			record = self.registry.records[recordId]
+			lines = [ xCoord + step for xCoord in self.animations[recordId] if xCoord < self.rowWidth ]
+			if lines and self.isRecordVisible( record ):
+				self.animations[recordId] = lines
+			else:
+				del self.animations[recordId]
+			self.updateRecord( record )
+
+		return bool( self.animations )
+
+	def rowEntered( self, index ):
+		self.startAnimation( index.data(Qt.ItemDataRole.UserRole) )
+		self.mainWindow.resetIdleAnims()
+
+	def mousePressEvent( self, event ):
+		mainWindow = self.mainWindow
+		mainWindow.abortAutoStart()
+		mainWindow.resetIdleAnims()
+
+		index = self.indexAt( event.position().toPoint() )
+		if not index.isValid():
+			return
+		record = index.data( Qt.ItemDataRole.UserRole )
+
+		# Queue up an animation
+		self.startAnimation( record )
+
+		# If this workload is not already installed, update/toggle the selection
+		if not mainWindow.installing and not record.installed:
+			self.registry.setSelected( record, not record.selected )
+
+			# Show this as a "Custom" installation suite
+			mainWindow.customradioBtn.setChecked( True )
+
+	def mouseDoubleClickEvent( self, event ):
+		self.mousePressEvent( event ) # Treat quick clicks as separate toggles
+
+	def mouseMoveEvent( self, event ):
+		super().mouseMoveEvent( event )
+
+		# Tooltip to show mouse coordinates (relative to the row), for debugging/development
+		if self.debugMode:
+			position = event.position().toPoint()
+			index = self.indexAt( position )
+			if index.isValid():
+				rowPosition = position - self.visualRect( index ).topLeft()
+				toolTipPosition = self.viewport().mapToGlobal( position )
+				toolTipPosition.setX( toolTipPosition.x()+10 )
+				toolTipPosition.setY( toolTipPosition.y()-60 )
+				text = f"x: {rowPosition.x()}\ny: {rowPosition.y() - self.rowSpacing // 2}"
+				QtWidgets.QToolTip.showText( toolTipPosition, text )
+
+	def paintEvent( self, event ):
+		with self.metrics.timer( 'gui_paint_seconds', widget='WorkloadListView' ):
+			super().paintEvent( event )
+
+
+
+def runGui( settings ):
+
+	""" Builds and shows the main window, and runs the Qt event loop until it's closed. 
+		'settings' is the namespace of options built by AutoInstaller.py. """
+
+	app = QApplication( sys.argv )
+	settings.startupTimeline.mark( 'QApplication created' )
+
+	window = AutoInstallerChooser( settings )
+	window.show()
+
+	return app.exec()
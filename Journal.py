@@ -0,0 +1,151 @@
+# Durable record of an installation plan's progress. Each event is appended to
+# the journal file and flushed to disk before the installation moves on, so if
+# the machine reboots or the program crashes partway through a plan, the plan
+# can be resumed from where it stopped (see the --resume option).
+
+
+import os
+import json
+import time
+
+
+class JournalState:
+
+	""" The contents of a journal file; the plan it recorded and how far it got. """
+
+	def __init__( self ):
+		self.runId = None
+		self.startTime = None
+		self.names = [] # The plan's workload names, in plan order
+		self.states = {} # Key = workload name, value = queued/started/succeeded/failed/skipped
+		self.complete = False # True if the plan ran to the end (successfully or not)
+
+	@property
+	def remaining( self ):
+
+		""" Names of the workloads in the plan that have not been successfully installed. """
+
+		return [ name for name in self.names if self.states.get(name) != 'succeeded' ]
+
+
+class RunJournal:
+
+	""" An append-only journal of one installation plan. Each line of the file is a
+		JSON object with an 'event' key (plan, queued, started, succeeded, failed,
+		skipped, or complete), and is fsync'd as it's written. Starting a new plan
+		replaces the journal of the previous one. """
+
+	def __init__( self, path ):
+		self.path = path
+		self.file = None
+
+	def begin( self, jobs, runId ):
+
+		""" Starts a new journal for the given jobs (from an InstallScheduler). """
+
+		# Write the plan to a new file and swap it in, so there's always a complete journal on disk
+		tempPath = '{}.{}.tmp'.format( self.path, os.getpid() )
+		with open( tempPath, 'w', encoding='utf-8' ) as file:
+			lines = [ { 'event': 'plan', 'run': runId, 'time': time.time(), 'names': [job.name for job in jobs] } ]
+			lines.extend( {'event': 'queued', 'name': job.name} for job in jobs )
+			file.write( ''.join(json.dumps(line) + '\n' for line in lines) )
+			file.flush()
+			os.fsync( file.fileno() )
+		os.replace( tempPath, self.path )
+		_syncFolder( os.path.dirname(os.path.abspath(self.path)) )
+
+		self.file = open( self.path, 'a', encoding='utf-8' )
+
+	def record( self, eventName, wl, data ):
+
+		""" Adds an event from Runner.runPlan to the journal. """
+
+		if eventName == 'finished':
+			eventName = 'succeeded' if data == 0 else 'failed'
+			self._append( {'event': eventName, 'name': wl.name, 'code': data, 'time': time.time()} )
+		else:
+			self._append( {'event': eventName, 'name': wl.name, 'time': time.time()} )
+
+	def end( self ):
+
+		""" Marks the plan as having run to the end, and closes the journal. """
+
+		self._append( {'event': 'complete', 'time': time.time()} )
+		self.close()
+
+	def close( self ):
+
+		""" Closes the journal (without marking the plan as complete, if it's not). """
+
+		if self.file:
+			try:
+				self.file.close()
+			except OSError:
+				pass # Anything not yet written is lost either way
+			self.file = None
+
+	def _append( self, entry ):
+		self.file.write( json.dumps(entry) + '\n' )
+		self.file.flush()
+		os.fsync( self.file.fileno() )
+
+	@staticmethod
+	def read( path ):
+
+		""" Returns a JournalState for the given journal file, or None if there is no
+			journal. A partially-written last line (from a crash) is ignored. """
+
+		try:
+			with open( path, 'r', encoding='utf-8' ) as file:
+				lines = file.read().splitlines()
+		except FileNotFoundError:
+			return None
+
+		state = None
+		for line in lines:
+			try:
+				entry = json.loads( line )
+				event = entry['event']
+			except (ValueError, TypeError, KeyError):
+				continue
+
+			if event == 'plan':
+				state = JournalState()
+				state.runId = entry.get( 'run' )
+				state.startTime = entry.get( 'time' )
+				state.names = list( entry.get('names', []) )
+			elif not state:
+				continue
+			elif event == 'complete':
+				state.complete = True
+			elif 'name' in entry:
+				state.states[entry['name']] = event
+
+		return state
+
+
+def _syncFolder( folder ):
+
+	""" Flushes a folder's entries (e.g. a rename) to disk; not supported on Windows. """
+
+	if os.name == 'nt':
+		return
+
+	fd = os.open( folder, os.O_RDONLY )
+	try:
+		os.fsync( fd )
+	finally:
+		os.close( fd )
+
+
+def resumePlan( state, allWorkloads ):
+
+	""" Returns the workloads from a journal's plan that still need to be installed, in
+		their original plan order. Raises ValueError if any of them are no longer defined. """
+
+	byName = { wl.name: wl for wl in allWorkloads }
+	missingNames = [ name for name in state.remaining if name not in byName ]
+	if missingNames:
+		raise ValueError( 'The interrupted installation includes workloads that are no longer defined: ' + ', '.join(missingNames) )
+
+	return [ byName[name] for name in state.remaining ]
@@ -0,0 +1,247 @@
+# A local, content-addressed cache of workload folders. When the program is run
+# from a network share, each workload's folder is copied to local disk (ideally
+# while the previous workload is still installing; see Runner.ProcessRunner.prefetch)
+# and its installer is run from there. Files are stored once per unique content
+# (named by their SHA-256 hash), and each workload's cached folder is made of
+# hardlinks to those files, so identical files shared by many workloads are only
+# ever copied once. Cached folders are kept between runs, and only files that have
+# changed are re-copied. Each run of an installer gets its own scratch copy of its
+# cached folder (also made of links), and the files it creates or changes there are
+# copied back to the workload's own folder once it finishes (so its checkInstallPath
+# and probes still refer to the original folder).
+
+
+import os
+import re
+import json
+import shutil
+import stat
+import hashlib
+import threading
+
+
+chunkSize = 0x100000
+
+
+class PayloadCache:
+
+	""" Copies workload folders into the cache folder. Stored files are made read-only,
+		since the files in each workload's cached folder are links to them. Safe to
+		use from multiple threads. """
+
+	def __init__( self, folder ):
+		self.folder = folder
+		self.objectsFolder = os.path.join( folder, 'objects' )
+		self.treesFolder = os.path.join( folder, 'trees' )
+		self.indexPath = os.path.join( folder, 'index.json' )
+		self.lock = threading.Lock()
+
+		# Hashes of source files; key = source path, value = [ size, mtime_ns, sha256 ]
+		try:
+			with open( self.indexPath, 'r', encoding='utf-8' ) as file:
+				self.index = json.load( file )
+		except (OSError, ValueError):
+			self.index = {}
+
+	def prepare( self, wl ):
+
+		""" Copies the given workload's folder into the cache (as needed), and returns the
+			path of the cached folder. A cached folder is only changed where its source
+			files have changed (by size and modification time) since it was last prepared.
+			Raises OSError if that's not possible. """
+
+		sourceFolder = os.path.dirname( wl.installerPath )
+		treeFolder = os.path.join( self.treesFolder, _folderName(wl) )
+		treeIndexPath = treeFolder + '.json'
+
+		# The content of each file in the cached folder when it was last prepared; key = relative path, value = sha256
+		try:
+			with open( treeIndexPath, 'r', encoding='utf-8' ) as file:
+				oldTree = json.load( file )
+		except (OSError, ValueError):
+			oldTree = {}
+			if os.path.exists( treeFolder ): # Unknown content; start over
+				shutil.rmtree( treeFolder, onerror=_removeReadOnly )
+
+		tree = {}
+		for root, folders, files in os.walk( sourceFolder ):
+			relFolder = os.path.relpath( root, sourceFolder )
+			os.makedirs( os.path.join(treeFolder, relFolder), exist_ok=True )
+			for name in files:
+				relPath = os.path.normpath( os.path.join(relFolder, name) )
+				objectPath = self.store( os.path.join(root, name) )
+				tree[relPath] = os.path.basename( objectPath )
+				if oldTree.get( relPath ) == tree[relPath] and _sameFile( os.path.join(treeFolder, relPath), objectPath ):
+					continue # Unchanged
+				_linkOrCopy( objectPath, os.path.join(treeFolder, relPath) )
+
+		# Remove files that are no longer in the source folder
+		for relPath in oldTree.keys() - tree.keys():
+			try:
+				_removeFile( os.path.join(treeFolder, relPath) )
+			except FileNotFoundError:
+				pass
+
+		if tree != oldTree:
+			_writeJson( treeIndexPath, tree )
+		self.saveIndex()
+		return treeFolder
+
+	def scratchFolder( self, wl, runId ):
+
+		""" Returns the path of the given workload's scratch folder for a run (see checkout). """
+
+		return os.path.join( self.folder, 'runs', runId, _folderName(wl) )
+
+	def checkout( self, treeFolder, workFolder ):
+
+		""" Creates a scratch copy of a cached folder (from prepare) for one run of its
+			installer, made of links to the stored files, and returns the state of its
+			files for collectOutputs(); key = relative path, value = [ stored file path,
+			size, mtime_ns ]. Raises OSError if that's not possible. """
+
+		try:
+			with open( treeFolder + '.json', 'r', encoding='utf-8' ) as file:
+				tree = json.load( file )
+		except FileNotFoundError: # Empty folder
+			tree = {}
+
+		files = {}
+		try:
+			for root, folders, _ in os.walk( treeFolder ):
+				os.makedirs( os.path.join(workFolder, os.path.relpath(root, treeFolder)), exist_ok=True )
+			for relPath, digest in tree.items():
+				objectPath = self._objectPath( digest )
+				path = os.path.join( workFolder, relPath )
+				_linkOrCopy( objectPath, path )
+				fileStat = os.stat( path )
+				files[relPath] = [ objectPath, fileStat.st_size, fileStat.st_mtime_ns ]
+		except BaseException:
+			shutil.rmtree( workFolder, onerror=_removeReadOnly )
+			raise
+		return files
+
+	def collectOutputs( self, workFolder, files, destinationFolder ):
+
+		""" Copies the files that an installer created or changed in its scratch folder
+			(see checkout) to the given folder (the workload's own), and then deletes the
+			scratch folder. Stored files that were changed in place (through their links)
+			are removed from the cache, so they're stored again when next needed. """
+
+		try:
+			for root, folders, names in os.walk( workFolder ):
+				relFolder = os.path.relpath( root, workFolder )
+				for name in names:
+					relPath = os.path.normpath( os.path.join(relFolder, name) )
+					path = os.path.join( root, name )
+					fileStat = os.stat( path )
+					original = files.get( relPath )
+					if original and original[1:] == [ fileStat.st_size, fileStat.st_mtime_ns ]:
+						continue # Unchanged
+					destination = os.path.join( destinationFolder, relPath )
+					os.makedirs( os.path.dirname(destination), exist_ok=True )
+					shutil.copyfile( path, destination )
+					if original and os.path.exists( original[0] ) and os.path.samefile( path, original[0] ):
+						_removeFile( original[0] )
+		finally:
+			shutil.rmtree( workFolder, onerror=_removeReadOnly )
+			try:
+				os.rmdir( os.path.dirname(workFolder) ) # The run's folder, once its last workload is done
+			except OSError:
+				pass
+
+	def store( self, sourcePath ):
+
+		""" Adds a file to the cache (unless a file with the same content is already
+			there), and returns the path of the stored copy. Files are only read if
+			their size or modification time has changed since they were last stored. """
+
+		fileStat = os.stat( sourcePath )
+		with self.lock:
+			entry = self.index.get( sourcePath )
+		if entry and entry[:2] == [ fileStat.st_size, fileStat.st_mtime_ns ]:
+			objectPath = self._objectPath( entry[2] )
+			if os.path.exists( objectPath ):
+				return objectPath
+
+		# Copy the file into the cache while hashing it, so it's only read once
+		os.makedirs( self.objectsFolder, exist_ok=True )
+		tempPath = os.path.join( self.objectsFolder, 'incoming.{}.{}'.format(os.getpid(), threading.get_ident()) )
+		fileHash = hashlib.sha256()
+		with open( sourcePath, 'rb' ) as source, open( tempPath, 'wb' ) as destination:
+			for chunk in iter( lambda: source.read(chunkSize), b'' ):
+				fileHash.update( chunk )
+				destination.write( chunk )
+		digest = fileHash.hexdigest()
+
+		objectPath = self._objectPath( digest )
+		if os.path.exists( objectPath ):
+			os.remove( tempPath ) # Same content as a file already stored
+		else:
+			os.makedirs( os.path.dirname(objectPath), exist_ok=True )
+			shutil.copymode( sourcePath, tempPath )
+			os.chmod( tempPath, stat.S_IMODE(os.stat(tempPath).st_mode) & ~0o222 ) # Read-only
+			os.replace( tempPath, objectPath )
+
+		with self.lock:
+			self.index[sourcePath] = [ fileStat.st_size, fileStat.st_mtime_ns, digest ]
+		return objectPath
+
+	def _objectPath( self, digest ):
+		return os.path.join( self.objectsFolder, digest[:2], digest )
+
+	def saveIndex( self ):
+		with self.lock:
+			_writeJson( self.indexPath, self.index )
+
+
+def _folderName( wl ):
+	return re.sub( r'[<>:"/\\|?*]', '_', wl.name ).strip( ' .' ) or 'workload'
+
+
+def _sameFile( path, objectPath ):
+
+	""" Checks whether a file is a link to (or an unchanged copy of) a stored file. """
+
+	try:
+		fileStat, objectStat = os.stat( path ), os.stat( objectPath )
+	except FileNotFoundError:
+		return False
+	return ( fileStat.st_size, fileStat.st_mtime_ns ) == ( objectStat.st_size, objectStat.st_mtime_ns )
+
+
+def _writeJson( path, value ):
+	tempPath = '{}.{}.tmp'.format( path, threading.get_ident() )
+	with open( tempPath, 'w', encoding='utf-8' ) as file:
+		json.dump( value, file )
+	os.replace( tempPath, path )
+
+
+def _linkOrCopy( source, destination ):
+
+	""" Hardlinks a file, or copies it if links aren't supported (e.g. across drives). """
+
+	try:
+		_removeFile( destination ) # Replacing an older version
+	except FileNotFoundError:
+		pass
+	try:
+		os.link( source, destination )
+	except OSError:
+		shutil.copy2( source, destination )
+
+
+def _removeFile( path ):
+	try:
+		os.remove( path )
+	except PermissionError: # Read-only, on Windows
+		os.chmod( path, stat.S_IWRITE )
+		os.remove( path )
+
+
+def _removeReadOnly( function, path, excInfo ):
+
+	""" Error handler for shutil.rmtree; clears the read-only flag (needed on Windows). """
+
+	os.chmod( path, stat.S_IWRITE )
+	function( path )
@@ -0,0 +1,205 @@
+# Extraction of workload payloads shipped as archives (tar, optionally compressed
+# with gzip, bzip2, or xz, or zip). A workload's payload is extracted into a folder
+# next to its installer before the installer runs. Archives are read once, front to
+# back, in fixed-size chunks; the SHA-256 hash is computed from the same reads that
+# feed the extraction, so verifying a payload costs no extra pass over it. Files are
+# extracted into a temporary folder that's only swapped in once the hash has been
+# checked, along with a marker file recording it; if the marker of an existing
+# extracted folder matches, extraction is skipped entirely.
+
+
+import os
+import json
+import shutil
+import hashlib
+import tarfile
+import zipfile
+
+
+chunkSize = 0x100000 # Bytes read from (or written to) a file at once
+markerFileName = '.payload.json'
+archiveExtensions = ( '.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tbz2', '.txz', '.tar', '.zip' )
+
+
+class PayloadError( Exception ):
+	pass
+
+
+def extractedFolderName( archivePath ):
+
+	""" Returns the default name of the folder to extract an archive into; its file
+		name without the archive extension. Raises ValueError if the archive type isn't
+		supported. """
+
+	fileName = os.path.basename( archivePath )
+	for extension in archiveExtensions:
+		if fileName.lower().endswith( extension ):
+			return fileName[:-len(extension)]
+	raise ValueError( 'unsupported archive type (should be one of: {})'.format(', '.join(archiveExtensions)) )
+
+
+class HashingReader:
+
+	""" Wraps a file opened for reading, hashing its bytes in order as they're read.
+		Reads that continue from (or overlap) the hashed part of the file extend the
+		hash; reads just past it (e.g. after a skipped zip header) first hash the small
+		gap; reads far ahead (such as zipfile's read of the central directory at the
+		end) aren't hashed, and are covered by finish(). """
+
+	def __init__( self, file ):
+		self.file = file
+		self.hash = hashlib.sha256()
+		self.hashedTo = 0
+
+	def read( self, size=-1 ):
+		position = self.file.tell()
+		if self.hashedTo < position <= self.hashedTo + chunkSize:
+			self.file.seek( self.hashedTo )
+			self.hash.update( self.file.read(position - self.hashedTo) )
+			self.hashedTo = position
+
+		data = self.file.read( size )
+		end = position + len( data )
+		if position <= self.hashedTo < end:
+			self.hash.update( memoryview(data)[self.hashedTo - position:] )
+			self.hashedTo = end
+		return data
+
+	def seek( self, offset, whence=os.SEEK_SET ):
+		return self.file.seek( offset, whence )
+
+	def tell( self ):
+		return self.file.tell()
+
+	def seekable( self ):
+		return True
+
+	def finish( self ):
+
+		""" Hashes the rest of the file (any part not yet read), and returns the hex digest. """
+
+		self.file.seek( self.hashedTo )
+		for chunk in iter( lambda: self.file.read(chunkSize), b'' ):
+			self.hash.update( chunk )
+		self.hashedTo = self.file.tell()
+		return self.hash.hexdigest()
+
+
+def isExtracted( payload ):
+
+	""" Returns whether the payload's folder already holds this archive's contents,
+		according to its marker file. With an expected hash in the manifest, the
+		marker's hash must match it; otherwise, the archive's size and modification
+		time must be the same as when it was extracted. """
+
+	try:
+		with open( os.path.join(payload['extractTo'], markerFileName), 'r', encoding='utf-8' ) as file:
+			marker = json.load( file )
+		if payload['sha256']:
+			return marker['sha256'] == payload['sha256']
+		stat = os.stat( payload['archive'] )
+		return [ marker['archiveSize'], marker['archiveMtime'] ] == [ stat.st_size, stat.st_mtime_ns ]
+	except (OSError, ValueError, KeyError, TypeError):
+		return False
+
+
+def extractPayload( payload, cancelled=None ):
+
+	""" Extracts a payload archive (if it's not already extracted), verifying its hash
+		if one is expected. Returns True if it was extracted, or False if that wasn't
+		needed. Raises PayloadError if it can't be extracted or its hash is wrong, or
+		if 'cancelled' (a threading.Event) is set partway through. """
+
+	if isExtracted( payload ):
+		return False
+
+	archivePath = payload['archive']
+	extractTo = payload['extractTo']
+	tempFolder = '{}.{}.tmp'.format( extractTo, os.getpid() )
+	if os.path.exists( tempFolder ):
+		shutil.rmtree( tempFolder )
+
+	try:
+		with open( archivePath, 'rb' ) as file:
+			stat = os.fstat( file.fileno() )
+			reader = HashingReader( file )
+			if archivePath.lower().endswith( '.zip' ):
+				_extractZip( reader, tempFolder, cancelled )
+			else:
+				_extractTar( reader, tempFolder, cancelled )
+			digest = reader.finish()
+
+		if payload['sha256'] and digest != payload['sha256']:
+			raise PayloadError( 'The payload "{}" is damaged or has changed; its SHA-256 hash is {}, rather than {}.'.format(archivePath, digest, payload['sha256']) )
+
+		with open( os.path.join(tempFolder, markerFileName), 'w', encoding='utf-8' ) as file:
+			json.dump( {'sha256': digest, 'archiveSize': stat.st_size, 'archiveMtime': stat.st_mtime_ns}, file )
+
+		# Swap the new folder in for any previous one
+		oldFolder = '{}.{}.old'.format( extractTo, os.getpid() )
+		if os.path.exists( extractTo ):
+			os.replace( extractTo, oldFolder )
+		os.replace( tempFolder, extractTo )
+		if os.path.exists( oldFolder ):
+			shutil.rmtree( oldFolder, ignore_errors=True )
+
+	except (OSError, tarfile.TarError, zipfile.BadZipFile, EOFError, ValueError) as err:
+		shutil.rmtree( tempFolder, ignore_errors=True )
+		raise PayloadError( 'Unable to extract the payload "{}"; {}'.format(archivePath, err) )
+	except BaseException:
+		shutil.rmtree( tempFolder, ignore_errors=True )
+		raise
+
+	return True
+
+
+def _extractTar( reader, folder, cancelled ):
+
+	""" Extracts a tar archive as a stream (reading it front to back just once). """
+
+	os.makedirs( folder )
+	with tarfile.open( fileobj=reader, mode='r|*', bufsize=chunkSize ) as archive:
+		for member in archive:
+			if cancelled and cancelled.is_set():
+				raise PayloadError( 'Extraction was cancelled.' )
+			_checkMemberPath( folder, member.name )
+			if hasattr( tarfile, 'data_filter' ): # Python 3.8.17+, 3.11.4+
+				archive.extract( member, folder, filter='data' )
+			elif member.isfile() or member.isdir():
+				archive.extract( member, folder )
+			else:
+				raise PayloadError( '"{}" is a link or special file, which isn\'t supported by this version of Python.'.format(member.name) )
+
+
+def _extractZip( reader, folder, cancelled ):
+
+	""" Extracts a zip archive, in the order its files are stored (so it's read front to
+		back, apart from the central directory at the end). """
+
+	os.makedirs( folder )
+	with zipfile.ZipFile( reader ) as archive:
+		for info in sorted( archive.infolist(), key=lambda info: info.header_offset ):
+			if cancelled and cancelled.is_set():
+				raise PayloadError( 'Extraction was cancelled.' )
+			path = _checkMemberPath( folder, info.filename )
+			if info.is_dir():
+				os.makedirs( path, exist_ok=True )
+				continue
+
+			os.makedirs( os.path.dirname(path), exist_ok=True )
+			with archive.open( info ) as source, open( path, 'wb' ) as destination:
+				shutil.copyfileobj( source, destination, chunkSize )
+			mode = info.external_attr >> 16 # Unix permissions, if stored
+			if mode & 0o777:
+				os.chmod( path, mode & 0o777 )
+
+
+def _checkMemberPath( folder, name ):
+
+	""" Returns where an archive member should be extracted to, raising PayloadError
+		if that's outside of the folder (e.g. an absolute path, or one using '..'). """
+
+	path = os.path.normpath( os.path.join(folder, name) )
+	if os.path.isabs( name ) or os.path.commonpath( [folder, path] ) != os.path.normpath( folder ):
+		raise PayloadError( 'The archive member "{}" would be extracted outside of its folder.'.format(name) )
+	return path
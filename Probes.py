@@ -0,0 +1,283 @@
+# Install probes; the checks that decide whether a workload is already installed.
+# Each workload declares a probe type in the manifest (the default just checks
+# that its checkInstallPath exists). Probes are run concurrently in a thread
+# pool, and the results of slow ones are cached, keyed by the probe's inputs.
+
+
+import os
+import json
+import time
+import hashlib
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class Probe:
+
+	""" Base class for install probes. 'spec' is the probe's (validated) definition
+		from the manifest, and 'workFolder' is the workload's folder. Subclasses
+		should raise ValueError from __init__ if the definition is invalid. """
+
+	watchPath = None # A path whose changes may change the result; its folder is watched by the GUI
+
+	def __init__( self, spec, workFolder ):
+		self.spec = spec
+		self.workFolder = workFolder
+
+	def key( self ):
+
+		""" Returns a JSON-compatible list identifying the inputs to this probe, or None
+			if the result shouldn't be cached (e.g. the probe is as quick as a lookup). """
+
+		return None
+
+	def check( self ):
+
+		""" Returns whether the workload is installed. May be called from any thread. """
+
+		raise NotImplementedError
+
+	def _required( self, name, valueType=str ):
+		value = self.spec.get( name )
+		if not isinstance( value, valueType ):
+			raise ValueError( 'The "{}" probe needs a "{}" {}.'.format(self.spec['type'], name, valueType.__name__) )
+		return value
+
+
+class FileProbe( Probe ):
+
+	""" Base class for probes that examine a file. Results are keyed by the file's
+		modification time and size, so they're re-checked whenever it changes. """
+
+	def __init__( self, spec, workFolder ):
+		super().__init__( spec, workFolder )
+		self.path = self._required( 'path' )
+		self.watchPath = self.path
+
+	def key( self ):
+		try:
+			stat = os.stat( self.path )
+		except OSError:
+			return None
+		return [ self.spec, stat.st_mtime_ns, stat.st_size ]
+
+	def check( self ):
+		try:
+			return self.checkFile()
+		except OSError:
+			return False
+
+	def checkFile( self ):
+		raise NotImplementedError
+
+
+class PathProbe( FileProbe ):
+
+	""" Installed if the path exists. """
+
+	def key( self ):
+		return None
+
+	def checkFile( self ):
+		return os.path.exists( self.path )
+
+
+class VersionProbe( FileProbe ):
+
+	""" Installed if the file contains the given version string. """
+
+	def __init__( self, spec, workFolder ):
+		super().__init__( spec, workFolder )
+		self.version = self._required( 'version' )
+
+	def checkFile( self ):
+		with open( self.path, 'r', encoding='utf-8', errors='replace' ) as file:
+			return self.version in file.read()
+
+
+class HashProbe( FileProbe ):
+
+	""" Installed if the file's SHA-256 hash matches. """
+
+	def __init__( self, spec, workFolder ):
+		super().__init__( spec, workFolder )
+		self.sha256 = self._required( 'sha256' ).lower()
+
+	def checkFile( self ):
+		fileHash = hashlib.sha256()
+		with open( self.path, 'rb' ) as file:
+			for chunk in iter( lambda: file.read(0x100000), b'' ):
+				fileHash.update( chunk )
+		return fileHash.hexdigest() == self.sha256
+
+
+class KeyFileProbe( FileProbe ):
+
+	""" Installed if a key in an INI-style file (lines of 'key = value', optionally
+		within [sections]) is present, and has the given value (if one is given). """
+
+	def __init__( self, spec, workFolder ):
+		super().__init__( spec, workFolder )
+		self.keyName = self._required( 'key' ).lower()
+		self.value = spec.get( 'value' )
+		self.section = spec.get( 'section' )
+		if self.section is not None:
+			self.section = self.section.lower()
+
+	def checkFile( self ):
+		section = None
+		with open( self.path, 'r', encoding='utf-8', errors='replace' ) as file:
+			for line in file:
+				line = line.strip()
+				if line.startswith( '[' ) and line.endswith( ']' ):
+					section = line[1:-1].strip().lower()
+				elif '=' in line and line[0] not in ';#':
+					key, value = line.split( '=', 1 )
+					if key.strip().lower() != self.keyName:
+						continue
+					elif self.section is not None and section != self.section:
+						continue
+					elif self.value is None or value.strip() == self.value:
+						return True
+		return False
+
+
+class CommandProbe( Probe ):
+
+	""" Installed if the command (run from the workload's folder) exits with the
+		expected code (0 by default). Results are cached until their TTL expires. """
+
+	def __init__( self, spec, workFolder ):
+		super().__init__( spec, workFolder )
+		self.command = self._required( 'command' )
+		self.exitCode = spec.get( 'exitCode', 0 )
+		self.timeout = spec.get( 'timeout', 30 )
+
+	def key( self ):
+		return [ self.spec, self.workFolder ]
+
+	def check( self ):
+		try:
+			process = subprocess.run( self.command, shell=True, cwd=self.workFolder, timeout=self.timeout,
+				stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL )
+		except (OSError, subprocess.TimeoutExpired):
+			return False
+		return process.returncode == self.exitCode
+
+
+probeTypes = {
+	'path': PathProbe,
+	'version': VersionProbe,
+	'hash': HashProbe,
+	'keyFile': KeyFileProbe,
+	'command': CommandProbe,
+}
+
+
+def createProbe( spec, workFolder ):
+
+	""" Creates a probe from its manifest definition. Raises ValueError if it's invalid. """
+
+	probeClass = probeTypes.get( spec.get('type') )
+	if not probeClass:
+		raise ValueError( 'Unknown probe type "{}"; should be one of: {}'.format(spec.get('type'), ', '.join(probeTypes)) )
+	return probeClass( spec, workFolder )
+
+
+class ProbeResultCache:
+
+	""" Results of slow probes, saved between runs (unless the path is None). Entries
+		are keyed by the probe's inputs (see Probe.key), and expire after 'ttl' seconds. """
+
+	def __init__( self, path, ttl=3600 ):
+		self.path = path
+		self.ttl = ttl
+		self.changed = False
+		self.entries = {}
+
+		if not path:
+			return
+		try:
+			with open( path, 'r', encoding='utf-8' ) as file:
+				self.entries = json.load( file ) # Key = JSON of probe key, value = [ result, timestamp ]
+			if not isinstance( self.entries, dict ):
+				self.entries = {}
+		except (OSError, ValueError):
+			self.entries = {}
+
+	def get( self, key ):
+
+		""" Returns the cached result for the given probe key, or None. """
+
+		entry = self.entries.get( json.dumps(key) )
+		if entry and time.time() - entry[1] < self.ttl:
+			return entry[0]
+		return None
+
+	def put( self, key, result ):
+		self.entries[json.dumps( key )] = [ result, time.time() ]
+		self.changed = True
+
+	def save( self ):
+		if not self.changed or not self.path:
+			return
+
+		# Leave out expired entries
+		now = time.time()
+		entries = { key: entry for key, entry in list(self.entries.items()) if now - entry[1] < self.ttl }
+
+		try:
+			os.makedirs( os.path.dirname(self.path), exist_ok=True )
+			tempPath = '{}.{}.tmp'.format( self.path, os.getpid() )
+			with open( tempPath, 'w', encoding='utf-8' ) as file:
+				json.dump( entries, file )
+			os.replace( tempPath, self.path )
+			self.changed = False
+		except OSError as err:
+			print( 'Unable to save the install probe cache; {}'.format(err) )
+
+
+class ProbeEngine:
+
+	""" Runs probes concurrently in a thread pool, storing their results in the given
+		InstallStateCache. If Metrics are given, the time taken by each check is recorded. """
+
+	def __init__( self, installStates, maxWorkers=8, metrics=None ):
+		self.installStates = installStates
+		self.pool = ThreadPoolExecutor( maxWorkers, thread_name_prefix='probe' )
+		self.metrics = metrics
+
+	def _check( self, probe, useCache=True ):
+		try:
+			if self.metrics:
+				with self.metrics.timer( 'install_probe_seconds', probe=type(probe).__name__ ):
+					return self.installStates.check( probe, useCache )
+			return self.installStates.check( probe, useCache )
+		except Exception as err:
+			print( 'Unable to run the install probe for {}; {}'.format(probe.spec, err) )
+			return False
+
+	def submit( self, probes, onResult, useCache=True ):
+
+		""" Starts checking the given probes, and returns immediately. 'onResult' is
+			called with ( probe, installed ) as each finishes, from a pool thread. Set
+			'useCache' to False to ignore cached results (e.g. after an installation). """
+
+		for probe in probes:
+			future = self.pool.submit( self._check, probe, useCache )
+			future.add_done_callback( lambda future, probe=probe: future.cancelled() or onResult(probe, future.result()) )
+
+	def checkAll( self, probes ):
+
+		""" Checks the given probes, yielding ( probe, installed ) as each finishes. """
+
+		futures = { self.pool.submit(self._check, probe): probe for probe in probes }
+		for future in as_completed( futures ):
+			yield futures[future], future.result()
+
+	def shutdown( self ):
+
+		""" Stops the pool; probes that haven't started yet are abandoned. """
+
+		self.pool.shutdown( wait=False, cancel_futures=True )
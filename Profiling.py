@@ -0,0 +1,226 @@
+# Timing instruments for finding where the program spends its time, and metrics
+# for watching installations (and the GUI's responsiveness) over time.
+
+
+import os
+import json
+import time
+import threading
+
+
+class StartupTimeline:
+
+	""" Records named points in time during startup (e.g. 'assets loaded'), and prints
+		them as a timeline. Marks are ignored unless the timeline is enabled. """
+
+	def __init__( self, enabled=True ):
+		self.enabled = enabled
+		self.startTime = time.perf_counter()
+		self.marks = [] # List of ( label, seconds since start )
+
+	def mark( self, label ):
+		if self.enabled:
+			self.marks.append( (label, time.perf_counter() - self.startTime) )
+
+	def report( self ):
+
+		""" Prints each mark, with the time since the start and since the previous mark. """
+
+		if not self.enabled:
+			return
+
+		print( 'Startup timeline (milliseconds since launch; interpreter startup not included):' )
+		previous = 0.0
+		for label, elapsed in self.marks:
+			print( '  {:8.1f}  (+{:7.1f})  {}'.format(elapsed * 1000, (elapsed - previous) * 1000, label) )
+			previous = elapsed
+
+
+# Descriptions of the metrics recorded; key = metric name, value = ( Prometheus type, help text )
+metricTypes = {
+	'workload_install_queue_wait_seconds': ( 'summary', 'Time from the start of a run until a workload started installing' ),
+	'workload_install_duration_seconds': ( 'summary', 'Time taken by workload installers' ),
+	'workload_install_exit_code': ( 'gauge', 'Exit code of the latest run of each workload installer' ),
+	'workload_install_output_bytes_total': ( 'counter', 'Output written by workload installers (stdout and stderr)' ),
+	'workload_installs_total': ( 'counter', 'Workload installations finished, by result' ),
+	'install_probe_seconds': ( 'summary', 'Time taken to check whether a workload is installed, by probe type' ),
+	'gui_paint_seconds': ( 'summary', 'Time spent in paintEvent, by widget class' ),
+	'gui_suite_apply_seconds': ( 'summary', 'Time taken to apply a suite selection' ),
+	'gui_suite_switch_seconds': ( 'summary', 'Time from choosing a suite until the new selections are fully shown' ),
+}
+
+
+class _NullTimer:
+
+	""" Stands in for a timer when metrics are disabled. """
+
+	def __enter__( self ):
+		return self
+
+	def __exit__( self, *excInfo ):
+		return False
+
+
+class _Timer:
+
+	def __init__( self, metrics, name, labels ):
+		self.metrics = metrics
+		self.name = name
+		self.labels = labels
+
+	def __enter__( self ):
+		self.startTime = time.perf_counter()
+		return self
+
+	def __exit__( self, *excInfo ):
+		self.metrics.observe( self.name, time.perf_counter() - self.startTime, **self.labels )
+		return False
+
+
+class Metrics:
+
+	""" Collects counters, gauges, and timing summaries (each with optional labels,
+		such as the workload name), for export in Prometheus' text format, and writes
+		notable events as they happen to a JSON-lines event stream. Nothing is recorded
+		unless enabled. Safe to use from multiple threads. """
+
+	nullTimer = _NullTimer()
+
+	def __init__( self, enabled=False, eventsPath=None, textPath=None ):
+		self.enabled = enabled
+		self.eventsPath = eventsPath
+		self.textPath = textPath # Where the Prometheus text is saved
+
+		self.lock = threading.Lock()
+		self.values = {} # Counters and gauges; key = ( name, labels ), value = number
+		self.summaries = {} # Key = ( name, labels ), value = [ count, sum, max ]
+		self.eventsFile = None
+
+	def increment( self, name, amount=1, **labels ):
+		if self.enabled:
+			key = ( name, tuple(sorted(labels.items())) )
+			with self.lock:
+				self.values[key] = self.values.get( key, 0 ) + amount
+
+	def setGauge( self, name, value, **labels ):
+		if self.enabled:
+			with self.lock:
+				self.values[( name, tuple(sorted(labels.items())) )] = value
+
+	def observe( self, name, seconds, **labels ):
+		if self.enabled:
+			key = ( name, tuple(sorted(labels.items())) )
+			with self.lock:
+				summary = self.summaries.get( key )
+				if summary:
+					summary[0] += 1
+					summary[1] += seconds
+					summary[2] = max( summary[2], seconds )
+				else:
+					self.summaries[key] = [ 1, seconds, seconds ]
+
+	def timer( self, name, **labels ):
+
+		""" Returns a context manager that observes how long its block takes. """
+
+		if self.enabled:
+			return _Timer( self, name, labels )
+		else:
+			return self.nullTimer
+
+	def event( self, eventName, **fields ):
+
+		""" Writes an event to the event stream (if there is one), as one line of JSON. """
+
+		if not self.enabled or not self.eventsPath:
+			return
+
+		line = json.dumps( dict(time=round(time.time(), 3), event=eventName, **fields) ) + '\n'
+		with self.lock:
+			try:
+				if not self.eventsFile:
+					self.eventsFile = open( self.eventsPath, 'a', encoding='utf-8' )
+				self.eventsFile.write( line )
+				self.eventsFile.flush()
+			except OSError as err:
+				print( 'Unable to write to the metrics event stream "{}"; {}'.format(self.eventsPath, err) )
+				self.eventsPath = None
+
+	def recordJob( self, job, queueWait, outputBytes ):
+
+		""" Records the metrics and 'finished' event for an installation. """
+
+		result = 'succeeded' if job.returnCode == 0 else 'failed'
+		self.observe( 'workload_install_queue_wait_seconds', queueWait, workload=job.name )
+		self.observe( 'workload_install_payload_wait_seconds', job.payloadWait, workload=job.name )
+		self.observe( 'workload_install_duration_seconds', job.duration, workload=job.name )
+		self.setGauge( 'workload_install_exit_code', job.returnCode, workload=job.name )
+		self.increment( 'workload_install_output_bytes_total', outputBytes, workload=job.name )
+		self.increment( 'workload_installs_total', workload=job.name, result=result )
+		self.event( 'installFinished', workload=job.name, result=result, exitCode=job.returnCode,
+			queueWait=round(queueWait, 3), payloadWait=round(job.payloadWait, 3), duration=round(job.duration, 3), outputBytes=outputBytes )
+
+	def render( self ):
+
+		""" Returns all of the metrics in Prometheus' text exposition format. """
+
+		byName = {} # Key = metric name, value = list of ( sample suffix, labels, value )
+		with self.lock:
+			for ( name, labels ), value in self.values.items():
+				byName.setdefault( name, [] ).append( ('', labels, value) )
+			for ( name, labels ), ( count, total, maximum ) in self.summaries.items():
+				samples = byName.setdefault( name, [] )
+				samples.append( ('_count', labels, count) )
+				samples.append( ('_sum', labels, total) )
+				byName.setdefault( name + '_max', [] ).append( ('', labels, maximum) ) # Exported as a separate gauge
+
+		lines = []
+		for name in sorted( byName ):
+			if name in metricTypes:
+				metricType, helpText = metricTypes[name]
+			elif name.endswith( '_max' ) and name[:-4] in metricTypes:
+				metricType, helpText = 'gauge', 'Longest observation of ' + name[:-4]
+			else:
+				metricType, helpText = 'untyped', name
+			lines.append( '# HELP {} {}'.format(name, helpText) )
+			lines.append( '# TYPE {} {}'.format(name, metricType) )
+			for suffix, labels, value in sorted( byName[name], key=lambda sample: (sample[1], sample[0]) ):
+				if labels:
+					labelText = ','.join( '{}="{}"'.format(key, _escapeLabel(labelValue)) for key, labelValue in labels )
+					lines.append( '{}{}{{{}}} {}'.format(name, suffix, labelText, _formatValue(value)) )
+				else:
+					lines.append( '{}{} {}'.format(name, suffix, _formatValue(value)) )
+
+		return '\n'.join( lines ) + '\n'
+
+	def save( self ):
+
+		""" Writes the Prometheus text to its file (if there is one). """
+
+		if not self.enabled or not self.textPath:
+			return
+
+		tempPath = '{}.{}.tmp'.format( self.textPath, os.getpid() )
+		try:
+			with open( tempPath, 'w', encoding='utf-8' ) as file:
+				file.write( self.render() )
+			os.replace( tempPath, self.textPath )
+		except OSError as err:
+			print( 'Unable to save metrics to "{}"; {}'.format(self.textPath, err) )
+
+	def close( self ):
+		self.save()
+		with self.lock:
+			if self.eventsFile:
+				self.eventsFile.close()
+				self.eventsFile = None
+
+
+def _escapeLabel( value ):
+	return str( value ).replace( '\\', '\\\\' ).replace( '"', '\\"' ).replace( '\n', '\\n' )
+
+
+def _formatValue( value ):
+	if isinstance( value, float ):
+		return repr( round(value, 6) )
+	return str( value )
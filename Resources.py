@@ -0,0 +1,121 @@
+# Resource-aware admission of installations. Workloads may declare the resources
+# they use heavily (cpu, disk, network) and their peak memory use; while other
+# installations are running, new ones are only started if live readings of the
+# system's load (from /proc, on Linux) show there's room for them.
+
+
+import os
+import time
+
+
+resourceClasses = ( 'cpu', 'disk', 'network' )
+
+
+class SystemMonitor:
+
+	""" Reads the system's load from /proc. Readings are refreshed at most once per
+		'interval' seconds, and are None where they aren't available (e.g. not on Linux). """
+
+	def __init__( self, interval=1.0 ):
+		self.interval = interval
+		self.lastRead = None
+		self.loadPerCpu = None # 1-minute load average, divided by the number of CPUs
+		self.availableMemory = None # MB
+		self.diskBusy = None # Fraction of the last interval that the busiest disk was busy
+
+		self.diskTicks = None # Key = disk name, value = milliseconds spent doing I/O
+		self.diskTickTime = None
+		self.disks = self._wholeDisks()
+
+	def _wholeDisks( self ):
+
+		""" Returns the names of physical disks (leaving out partitions and virtual devices). """
+
+		try:
+			return { name for name in os.listdir('/sys/block') if not name.startswith(('loop', 'ram', 'zram')) }
+		except OSError:
+			return set()
+
+	def refresh( self ):
+
+		""" Updates the readings, if they're more than 'interval' seconds old. """
+
+		now = time.monotonic()
+		if self.lastRead is not None and now - self.lastRead < self.interval:
+			return
+		self.lastRead = now
+
+		try:
+			with open( '/proc/loadavg', 'r' ) as file:
+				self.loadPerCpu = float( file.read().split()[0] ) / ( os.cpu_count() or 1 )
+		except (OSError, ValueError, IndexError):
+			self.loadPerCpu = None
+
+		try:
+			with open( '/proc/meminfo', 'r' ) as file:
+				for line in file:
+					if line.startswith( 'MemAvailable:' ):
+						self.availableMemory = int( line.split()[1] ) // 1024
+						break
+		except (OSError, ValueError, IndexError):
+			self.availableMemory = None
+
+		self._readDiskStats( now )
+
+	def _readDiskStats( self, now ):
+		ticks = {}
+		try:
+			with open( '/proc/diskstats', 'r' ) as file:
+				for line in file:
+					fields = line.split()
+					if len( fields ) > 12 and fields[2] in self.disks:
+						ticks[fields[2]] = int( fields[12] )
+		except (OSError, ValueError):
+			self.diskBusy = None
+			return
+
+		# Busy time is the increase in I/O ticks since the last reading
+		if self.diskTicks is not None and ticks:
+			elapsedMs = ( now - self.diskTickTime ) * 1000
+			busiest = max( ticks[name] - self.diskTicks.get(name, ticks[name]) for name in ticks )
+			self.diskBusy = min( 1.0, busiest / elapsedMs ) if elapsedMs > 0 else None
+		self.diskTicks = ticks
+		self.diskTickTime = now
+
+
+class ResourceAdmission:
+
+	""" Decides whether the system has room for another installation to start. Used by
+		the InstallScheduler for jobs that would run alongside others (a job is always
+		admitted if nothing else is running, so a plan can't stall). """
+
+	def __init__( self, maxLoadPerCpu=1.0, minFreeMemoryMB=512, maxDiskBusy=0.8, monitor=None ):
+		self.maxLoadPerCpu = maxLoadPerCpu
+		self.minFreeMemoryMB = minFreeMemoryMB
+		self.maxDiskBusy = maxDiskBusy
+		self.monitor = monitor or SystemMonitor()
+		self.pollInterval = self.monitor.interval # How often to retry jobs that were held back
+
+		self.reservedMemory = 0 # MB estimated for jobs started since the last memory reading
+		self.memoryReadTime = None
+
+	def admit( self, job ):
+
+		""" Returns whether the given job may start now. """
+
+		monitor = self.monitor
+		monitor.refresh()
+		if monitor.lastRead != self.memoryReadTime:
+			self.reservedMemory = 0 # Newly-started jobs should now be included in the reading
+			self.memoryReadTime = monitor.lastRead
+
+		if 'cpu' in job.resources and monitor.loadPerCpu is not None and monitor.loadPerCpu > self.maxLoadPerCpu:
+			return False
+		elif 'disk' in job.resources and monitor.diskBusy is not None and monitor.diskBusy > self.maxDiskBusy:
+			return False
+		elif job.memoryMB and monitor.availableMemory is not None:
+			if monitor.availableMemory - self.reservedMemory - job.memoryMB < self.minFreeMemoryMB:
+				return False
+
+		self.reservedMemory += job.memoryMB
+		return True
@@ -0,0 +1,376 @@
+# A compressed archive of installer output from every run, with an index for
+# querying it. Each workload's output from each run is compressed (with zstd if
+# the zstandard package is installed, otherwise gzip) as a separate member of an
+# append-only data file, and described by a line in the index file: the workload,
+# run ID, start and end times, exit code, where its compressed output is in the
+# data file, the byte offsets of error-looking lines within it, and where its bloom
+# filter (of the trigrams in the output's words) is in a separate blooms file.
+# Queries by workload, run, or exit code only read the index (and queries of the
+# last few runs only read the end of it), and text searches only read the bloom
+# filters, then decompress the outputs that may contain the text.
+
+
+import os
+import re
+import zlib
+import json
+import time
+import tempfile
+import threading
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+
+dataFileName = 'runs.dat'
+indexFileName = 'index.jsonl'
+bloomsFileName = 'blooms.dat'
+chunkSize = 0x100000
+indexReadSize = 0x10000 # Bytes of the index read at once, when reading it from the end
+maxErrorLines = 100 # Offsets of error-looking lines kept per output
+minBloomBits = 0x200
+maxBloomBits = 0x10000
+maxWords = 0x10000 # Unique words collected per output; beyond this, its bloom filter matches anything
+
+wordPattern = re.compile( rb'\w+' )
+trailingWordPattern = re.compile( rb'\w*' ) # Matched against reversed bytes
+errorLinePattern = re.compile( rb'\b(error|errors|failed|failure|fatal|exception|traceback|denied|cannot|unable)\b', re.IGNORECASE )
+
+
+class ArchiveEntry:
+
+	""" The index's description of one workload's output from one run. """
+
+	__slots__ = ( 'workload', 'runId', 'startTime', 'endTime', 'exitCode', 'offset', 'length', 'size', 'codec', 'errorLines', 'bloomOffset', 'bloomLength' )
+
+	def __init__( self, values ):
+		for name in self.__slots__:
+			setattr( self, name, values[name] )
+
+	def toDict( self ):
+		return { name: getattr(self, name) for name in self.__slots__ }
+
+	@classmethod
+	def parse( cls, line ):
+
+		""" Returns the entry described by a line of the index, or None if it's invalid
+			(e.g. a partly-written last line). """
+
+		try:
+			return cls( json.loads(line) )
+		except (ValueError, KeyError, TypeError):
+			return None
+
+
+class ArchiveRecord:
+
+	""" Collects one workload's output from a run, to be added to the archive with
+		RunArchive.add() once it has finished. Output is spooled to a temporary file
+		(in memory until it gets large), so it can be written from the event loop. """
+
+	def __init__( self, archive, workload, runId ):
+		self.archive = archive
+		self.workload = workload
+		self.runId = runId
+		self.startTime = time.time()
+		self.file = tempfile.SpooledTemporaryFile( chunkSize, dir=archive.folder )
+		self.path = os.path.join( archive.folder, dataFileName ) # For error messages
+
+	def write( self, data ):
+		self.file.write( data )
+
+	def close( self ):
+		self.file.close()
+
+
+class RunArchive:
+
+	""" Adds installers' output to the archive folder, and answers queries about it.
+		Records may be added from multiple threads. """
+
+	def __init__( self, folder ):
+		self.folder = folder
+		self.dataPath = os.path.join( folder, dataFileName )
+		self.indexPath = os.path.join( folder, indexFileName )
+		self.bloomsPath = os.path.join( folder, bloomsFileName )
+		self.lock = threading.Lock()
+
+	def begin( self, workload, runId ):
+
+		""" Returns a new ArchiveRecord to collect output in. Raises OSError if the
+			archive folder can't be created. """
+
+		os.makedirs( self.folder, exist_ok=True )
+		return ArchiveRecord( self, workload, runId )
+
+	def add( self, record, exitCode ):
+
+		""" Compresses and indexes a finished record's output (then closes the record).
+			This reads all of the output, so is best done in a worker thread. """
+
+		try:
+			record.file.seek( 0 )
+			if zstandard:
+				codec = 'zstd'
+				compressor = zstandard.ZstdCompressor( level=9 ).compressobj()
+			else:
+				codec = 'gzip'
+				compressor = zlib.compressobj( 6, zlib.DEFLATED, 31 ) # 31 for a gzip header
+			scanner = _OutputScanner()
+			compressed = tempfile.SpooledTemporaryFile( chunkSize, dir=self.folder )
+			with compressed:
+				# Compress, find error lines, and collect trigrams in one pass over the output
+				size = 0
+				for chunk in iter( lambda: record.file.read(chunkSize), b'' ):
+					size += len( chunk )
+					scanner.scan( chunk )
+					compressed.write( compressor.compress(chunk) )
+				compressed.write( compressor.flush() )
+				scanner.finish()
+				length = compressed.tell()
+
+				bloom = scanner.bloom()
+
+				with self.lock:
+					with open( self.dataPath, 'ab' ) as dataFile:
+						offset = dataFile.seek( 0, os.SEEK_END )
+						compressed.seek( 0 )
+						for chunk in iter( lambda: compressed.read(chunkSize), b'' ):
+							dataFile.write( chunk )
+					with open( self.bloomsPath, 'ab' ) as bloomsFile:
+						bloomOffset = bloomsFile.seek( 0, os.SEEK_END )
+						bloomsFile.write( bloom )
+
+					entry = {
+						'workload': record.workload, 'runId': record.runId, 'startTime': record.startTime, 'endTime': time.time(),
+						'exitCode': exitCode, 'offset': offset, 'length': length, 'size': size, 'codec': codec,
+						'errorLines': scanner.errorLines, 'bloomOffset': bloomOffset, 'bloomLength': len( bloom )
+					}
+					with open( self.indexPath, 'a', encoding='utf-8' ) as indexFile:
+						indexFile.write( json.dumps(entry) + '\n' )
+		finally:
+			record.close()
+
+	def entries( self ):
+
+		""" Returns all ArchiveEntries in the index, oldest first. """
+
+		try:
+			with open( self.indexPath, 'rb' ) as file:
+				return [ entry for entry in map(ArchiveEntry.parse, file) if entry ]
+		except FileNotFoundError:
+			return []
+
+	def recentEntries( self ):
+
+		""" Yields the ArchiveEntries in the index, newest first, reading the index from
+			the end (so only as much of it is read as is needed). """
+
+		try:
+			file = open( self.indexPath, 'rb' )
+		except FileNotFoundError:
+			return
+
+		with file:
+			position = file.seek( 0, os.SEEK_END )
+			partialLine = b''
+			while position > 0:
+				readSize = min( indexReadSize, position )
+				position -= readSize
+				file.seek( position )
+				lines = ( file.read(readSize) + partialLine ).split( b'\n' )
+				partialLine = lines.pop( 0 ) # May continue in the previous chunk
+				for line in reversed( lines ):
+					entry = ArchiveEntry.parse( line ) if line else None
+					if entry:
+						yield entry
+			entry = ArchiveEntry.parse( partialLine ) if partialLine else None
+			if entry:
+				yield entry
+
+	def query( self, lastRuns=None, workloads=None, failuresOnly=False ):
+
+		""" Returns the entries for the given workloads (or all) from the last 'lastRuns'
+			runs (or all runs), optionally only those that failed, oldest first. Only the
+			index is read; just the end of it, for the last few runs. """
+
+		if lastRuns is None:
+			entries = self.entries()
+		else:
+			entries = []
+			runIds = set()
+			for entry in self.recentEntries():
+				if entry.runId not in runIds:
+					if len( runIds ) == lastRuns:
+						break
+					runIds.add( entry.runId )
+				entries.append( entry )
+			entries.reverse()
+		if workloads:
+			entries = [ entry for entry in entries if entry.workload in workloads ]
+		if failuresOnly:
+			entries = [ entry for entry in entries if entry.exitCode != 0 ]
+		return entries
+
+	def read( self, entry ):
+
+		""" Returns the (decompressed) output of the given entry, as bytes. Raises OSError
+			if it can't be read. """
+
+		with open( self.dataPath, 'rb' ) as file:
+			file.seek( entry.offset )
+			data = file.read( entry.length )
+
+		if entry.codec == 'zstd' and not zstandard:
+			raise OSError( 'The zstandard package is needed to read this run archive.' )
+		try:
+			if entry.codec == 'zstd':
+				return zstandard.ZstdDecompressor().decompressobj().decompress( data )
+			else:
+				return zlib.decompress( data, 31 )
+		except Exception as err: # zlib.error or zstandard.ZstdError
+			raise OSError( 'The archived output of {} (run {}) is damaged; {}'.format(entry.workload, entry.runId, err) )
+
+	def mayContain( self, entry, text ):
+
+		""" Returns whether the output of the given entry may contain the given (lowercase)
+			bytes, according to its bloom filter (i.e. whether every trigram of every word
+			in the text appears in its words); False means it definitely doesn't. """
+
+		if not entry.bloomLength: # Too many words to be worth filtering
+			return True
+		with open( self.bloomsPath, 'rb' ) as file:
+			file.seek( entry.bloomOffset )
+			data = file.read( entry.bloomLength )
+		if len( data ) != entry.bloomLength:
+			raise OSError( 'The bloom filter for the output of {} (run {}) is missing.'.format(entry.workload, entry.runId) )
+
+		bits = _BloomBits( bytearray(data) )
+		return all( bits.contains(trigram) for word in wordPattern.findall(text) for trigram in _trigrams(word) )
+
+	def errorLines( self, entry, output=None ):
+
+		""" Returns the error-looking lines (as bytes) of the given entry's output. """
+
+		if output is None:
+			output = self.read( entry )
+		return [ _lineAt(output, offset) for offset in entry.errorLines ]
+
+	def search( self, entry, text ):
+
+		""" Searches the output of the given entry for text within a line (bytes, case-
+			insensitive), and returns the lines containing it. The output is only read
+			if its bloom filter says it may contain the text (see mayContain). """
+
+		text = text.lower()
+		if not self.mayContain( entry, text ):
+			return []
+
+		output = self.read( entry )
+		lowered = output.lower()
+		lines = []
+		start = lowered.find( text )
+		while start != -1:
+			lineStart = lowered.rfind( b'\n', 0, start ) + 1
+			lines.append( _lineAt(output, lineStart) )
+			lineEnd = lowered.find( b'\n', start )
+			start = lowered.find( text, lineEnd ) if lineEnd != -1 else -1
+		return lines
+
+
+class _OutputScanner:
+
+	""" Finds the offsets of error-looking lines in output given a chunk at a time,
+		and collects the output's unique (lowercase) words. """
+
+	def __init__( self ):
+		self.offset = 0 # Of the start of the partial line
+		self.partialLine = b''
+		self.errorLines = []
+		self.words = set() # None once there are too many to be useful
+
+	def scan( self, data ):
+		data = self.partialLine + data
+		lastNewline = data.rfind( b'\n' )
+		if lastNewline == -1 and len( data ) >= chunkSize:
+			# Scan very long lines in pieces, split between words (unless it's all one word)
+			lastNewline = len( data ) - len( trailingWordPattern.match(data[::-1]).group() ) - 1
+			if lastNewline == -1:
+				lastNewline = len( data ) - 1
+		self._scanLines( data[:lastNewline+1] )
+		self.offset += lastNewline + 1
+		self.partialLine = data[lastNewline+1:]
+
+	def finish( self ):
+		self._scanLines( self.partialLine )
+		self.partialLine = b''
+
+	def _scanLines( self, data ):
+		if not data:
+			return
+		if self.words is not None:
+			self.words.update( wordPattern.findall(data.lower()) )
+			if len( self.words ) > maxWords:
+				self.words = None
+		if len( self.errorLines ) >= maxErrorLines:
+			return
+		for match in errorLinePattern.finditer( data ):
+			lineStart = data.rfind( b'\n', 0, match.start() ) + 1
+			if self.errorLines and self.errorLines[-1] == self.offset + lineStart:
+				continue # Another match in the same line
+			self.errorLines.append( self.offset + lineStart )
+			if len( self.errorLines ) >= maxErrorLines:
+				break
+
+	def bloom( self ):
+
+		""" Returns a bloom filter of the trigrams in the words, as bytes (sized for about
+			5% false positives per trigram, within limits). """
+
+		if self.words is None:
+			return b'' # Matches anything
+		trigrams = set()
+		for word in self.words:
+			trigrams.update( _trigrams(word) )
+
+		size = minBloomBits
+		while size < len( trigrams ) * 8 and size < maxBloomBits:
+			size *= 2
+		bits = _BloomBits( bytearray(size // 8) )
+		for trigram in trigrams:
+			bits.add( trigram )
+		return bytes( bits.data )
+
+
+class _BloomBits:
+
+	""" A bloom filter of trigrams (as 24-bit integers), with two hash functions. """
+
+	def __init__( self, data ):
+		self.data = data
+		self.mask = len( data ) * 8 - 1 # The size is a power of two
+
+	def _positions( self, trigram ):
+		return ( (trigram * 0x9E3779B1) >> 7 ) & self.mask, ( (trigram * 0x85EBCA77) >> 11 ) & self.mask
+
+	def add( self, trigram ):
+		for position in self._positions( trigram ):
+			self.data[position >> 3] |= 1 << ( position & 7 )
+
+	def contains( self, trigram ):
+		return all( self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(trigram) )
+
+
+def _trigrams( data ):
+
+	""" Returns the set of 3-byte sequences in the given bytes (none if it's shorter),
+		as integers. """
+
+	return { int.from_bytes(data[index:index+3], 'little') for index in range(len(data) - 2) }
+
+
+def _lineAt( output, offset ):
+	end = output.find( b'\n', offset )
+	return output[offset:end if end != -1 else len(output)].rstrip( b'\r' )
@@ -0,0 +1,595 @@
+# Event-driven execution of workload installers. Installer processes are run
+# and supervised on an asyncio event loop, so any number of them can be
+# watched from a single thread without polling.
+
+
+import os
+import re
+import sys
+import time
+import shlex
+import codecs
+import asyncio
+import signal
+import locale
+import itertools
+import threading
+
+from collections import deque
+from asyncio.subprocess import PIPE
+from concurrent.futures import ThreadPoolExecutor
+
+from WarmPool import WarmPool
+from Payloads import extractPayload
+
+
+chunkSize = 0x10000 # Max bytes read from an output stream at once
+errorTailSize = 0x10000 # Bytes of stderr kept for reporting failures
+
+_runCounter = itertools.count( 1 )
+
+
+def newRunId():
+
+	""" Returns a unique ID for a new run: the date and time it started (to the
+		millisecond), this process's ID, and a count of the runs it has started, so
+		runs started at once (by this or another process) never share an ID. """
+
+	now = time.time()
+	startTime = time.strftime( '%Y-%m-%d_%H-%M-%S', time.localtime(now) )
+	return '{}.{:03d}_{}-{}'.format( startTime, int(now % 1 * 1000), os.getpid(), next(_runCounter) )
+
+
+class RotatingLog:
+
+	""" A binary log file that's rotated once it reaches a size limit; the full file
+		is renamed with a .1 suffix (shifting older ones to .2, .3, etc.), and a new
+		file is started. At most 'backupCount' old files are kept. """
+
+	def __init__( self, path, maxBytes, backupCount ):
+		self.path = path
+		self.maxBytes = maxBytes
+		self.backupCount = backupCount
+
+		os.makedirs( os.path.dirname(path), exist_ok=True )
+		self.file = open( path, 'ab' )
+		self.size = self.file.tell()
+
+	def write( self, data ):
+		if self.size + len( data ) > self.maxBytes and self.size > 0:
+			self.rotate()
+
+		self.file.write( data )
+		self.size += len( data )
+
+	def rotate( self ):
+		self.file.close()
+
+		for index in range( self.backupCount - 1, 0, -1 ):
+			older = '{}.{}'.format( self.path, index )
+			if os.path.exists( older ):
+				os.replace( older, '{}.{}'.format(self.path, index + 1) )
+		if self.backupCount > 0:
+			os.replace( self.path, self.path + '.1' )
+		else:
+			os.remove( self.path )
+
+		self.file = open( self.path, 'wb' )
+		self.size = 0
+
+	def close( self ):
+		self.file.close()
+
+
+class ConsoleWriter:
+
+	""" Decodes an installer's output and writes it to the console a chunk at a time.
+		Only complete lines are written (so parallel installers' lines don't get mixed
+		together), each with an optional prefix. """
+
+	def __init__( self, prefix, encoding ):
+		self.prefix = prefix
+		self.decoder = codecs.getincrementaldecoder( encoding )( 'replace' )
+		self.partialLine = ''
+
+	def write( self, data ):
+		text = self.partialLine + self.decoder.decode( data )
+
+		# Hold back any incomplete last line (unless it's getting too long)
+		lastNewline = text.rfind( '\n' )
+		if lastNewline == -1 and len( text ) < chunkSize:
+			self.partialLine = text
+			return
+		elif lastNewline != -1:
+			self.partialLine = text[lastNewline+1:]
+			text = text[:lastNewline+1]
+		else:
+			self.partialLine = ''
+			text += '\n'
+
+		self._print( text )
+
+	def flush( self ):
+		text = self.partialLine + self.decoder.decode( b'', True )
+		self.partialLine = ''
+		if text:
+			self._print( text + '\n' )
+
+	def _print( self, text ):
+		if self.prefix:
+			text = self.prefix + text[:-1].replace( '\n', '\n' + self.prefix ) + '\n'
+		if sys.stdout: # May be None when run without a console
+			sys.stdout.write( text )
+
+
+class ProcessRunner:
+
+	""" Runs workload installers as asynchronous subprocesses, printing their
+		output to the console as it arrives. Use from within an asyncio event loop.
+
+		If a log folder is given, each installer's output (stdout and stderr) is
+		also saved to '<logFolder>/<workload name>/<run ID>.log', with the file
+		rotated if it grows beyond 'maxLogBytes'. If a RunArchive is given, the
+		output is also compressed into it once the installer finishes.
+
+		Workloads with a payload archive have it extracted (see Payloads.py) before
+		their installer runs, with up to 'extractionThreads' being extracted at once
+		(start them ahead of time with extractPayloads()).
+
+		If a PayloadCache is given, each workload's folder is copied into it (after
+		any payload has been extracted), and the installer is run from a scratch copy
+		of its cached folder (its working directory too, so relative reads are local).
+		Files it creates or changes there, such as its checkInstallPath, are copied
+		back to the workload's own folder once it finishes.
+
+		If 'warmRunners' is set (on POSIX systems), Python installers (.py files) are
+		run by that many warm worker processes (see WarmPool), rather than each
+		starting a new interpreter. Call close() once finished, to stop them. """
+
+	def __init__( self, timeout=600, prefixOutput=False, debugMode=False, logFolder=None, maxLogBytes=0xA00000, logBackups=3, 
+				  payloadCache=None, warmRunners=0, archive=None, extractionThreads=2 ):
+		self.timeout = timeout
+		self.prefixOutput = prefixOutput
+		self.debugMode = debugMode
+		self.encoding = locale.getpreferredencoding( False )
+
+		self.logFolder = logFolder
+		self.maxLogBytes = maxLogBytes
+		self.logBackups = logBackups
+		self.runId = newRunId()
+		self.archive = archive
+
+		self.payloadCache = payloadCache
+		self.payloads = {} # Key = workload name, value = future for the path of its cached folder
+		self.extractionThreads = extractionThreads
+		self.extractionPool = None # Created when the first payload is extracted
+		self.extractions = {} # Key = folder being extracted to, value = future for whether it was extracted
+		self.extractionCancelled = threading.Event()
+		self.outputBytes = {} # Key = workload name, value = bytes of output from its latest run
+		self.spawnTimes = {} # Key = workload name, value = loop time its installer was started
+
+		self.pool = WarmPool( warmRunners ) if warmRunners and os.name != 'nt' else None
+
+		self.loop = None
+		self.processes = set()
+		self.cancelled = False
+
+	def buildCommand( self, installerPath ):
+
+		""" Returns the shell command used to launch the given installer. """
+
+		if os.name == 'nt':
+			return installerPath
+		else:
+			return shlex.quote( installerPath )
+
+	def prefetch( self, wl ):
+
+		""" Starts copying the given workload's folder into the payload cache in the
+			background (if there is a cache, and it hasn't already been started). Must
+			be called from the event loop's thread. """
+
+		if self.payloadCache and wl.name not in self.payloads:
+			self.payloads[wl.name] = asyncio.ensure_future( self._cachePayload(wl) )
+
+	async def _cachePayload( self, wl ):
+		if wl.payload: # Copy the extracted files too (any error extracting them is reported by install)
+			await asyncio.wait( [self.extractPayload(wl)] )
+		return await asyncio.get_running_loop().run_in_executor( None, self.payloadCache.prepare, wl )
+
+	def extractPayload( self, wl ):
+
+		""" Starts extracting the given workload's payload archive in the background (unless
+			it's already been started), and returns a future for whether it was extracted
+			(False if it was already). Must be called from the event loop's thread. """
+
+		extractTo = wl.payload['extractTo']
+		if extractTo not in self.extractions:
+			if not self.extractionPool:
+				self.extractionPool = ThreadPoolExecutor( max(1, self.extractionThreads), thread_name_prefix='PayloadExtraction' )
+			loop = asyncio.get_running_loop()
+			self.extractions[extractTo] = loop.run_in_executor( self.extractionPool, extractPayload, wl.payload, self.extractionCancelled )
+		return self.extractions[extractTo]
+
+	def extractPayloads( self, workloads ):
+
+		""" Starts extracting the payloads of the given workloads (those that have one),
+			so they're extracted in parallel, ahead of their installers. """
+
+		for wl in workloads:
+			if wl.payload:
+				self.extractPayload( wl )
+
+	async def getWorkFolder( self, wl ):
+
+		""" Returns the folder to run the given workload's installer from, and the state
+			of its files if it's a scratch copy from the payload cache (see PayloadCache.
+			checkout), or None if it's the workload's own folder. """
+
+		wlDir = os.path.dirname( wl.installerPath )
+		if not self.payloadCache:
+			return wlDir, None
+
+		self.prefetch( wl )
+		try:
+			cachedFolder = await self.payloads.pop( wl.name )
+			workFolder = self.payloadCache.scratchFolder( wl, self.runId )
+			files = await self.loop.run_in_executor( None, self.payloadCache.checkout, cachedFolder, workFolder )
+		except OSError as err:
+			print( 'Unable to cache the payload for {}, so it will run from its original folder; {}'.format(wl.name, err) )
+			return wlDir, None
+
+		return workFolder, files
+
+	async def collectOutputs( self, wl, workFolder, files ):
+
+		""" Copies the files the given workload's installer wrote in its scratch folder
+			(if it was run from one) back to the workload's own folder. """
+
+		if files is None:
+			return
+		try:
+			await self.loop.run_in_executor( None, self.payloadCache.collectOutputs, workFolder, files, os.path.dirname(wl.installerPath) )
+		except OSError as err:
+			print( 'Unable to copy the files written by the {} installer to its folder; {}'.format(wl.name, err) )
+
+	async def install( self, wl ):
+
+		""" Installs a given workload onto the SUT by running its installer in a new
+			process, and returns the installer's exit code once it completes. """
+
+		self.loop = asyncio.get_running_loop()
+
+		if self.debugMode:
+			print( '       -  -  -' )
+			print( 'Running ' + wl.name + ' installer...' )
+
+		if self.prefixOutput:
+			prefix = '[{}] '.format( wl.name )
+		else:
+			prefix = ''
+
+		# Make sure the payload is ready (raises PayloadError if it's not)
+		waitStart = self.loop.time()
+		if wl.payload:
+			await self.extractPayload( wl )
+		wlDir, files = await self.getWorkFolder( wl )
+		installerPath = os.path.join( wlDir, os.path.basename(wl.installerPath) )
+
+		# Run the installer in a new process, from within its workload's directory (or scratch copy of it)
+		startTime = self.loop.time()
+		self.spawnTimes[wl.name] = startTime
+		if self.debugMode and startTime - waitStart >= 0.001:
+			print( 'Time waiting for the payload of {}: {}'.format(wl.name, startTime - waitStart) )
+		try:
+			if self.pool and installerPath.lower().endswith( '.py' ):
+				process = await self.pool.spawn( installerPath, wlDir )
+			else:
+				process = await asyncio.create_subprocess_shell( self.buildCommand(installerPath), cwd=wlDir, stdout=PIPE, stderr=PIPE, 
+					start_new_session=(os.name != 'nt') ) # Own process group, so the whole tree can be killed
+		except BaseException:
+			await self.collectOutputs( wl, wlDir, files ) # Just removes the scratch folder
+			raise
+		self.processes.add( process )
+
+		# Drain both output streams as data arrives. Stdout is printed in real time, the
+		# end of stderr is kept for reporting failures, and both are logged and archived if enabled
+		console = ConsoleWriter( prefix, self.encoding )
+		errorTail = deque()
+		log = self.openLog( wl )
+		record = self.openArchiveRecord( wl )
+		outputs = [ output for output in (log, record) if output ]
+		self.outputBytes[wl.name] = 0
+		readers = [
+			asyncio.ensure_future( self._drain(wl.name, process.stdout, console, None, outputs) ),
+			asyncio.ensure_future( self._drain(wl.name, process.stderr, None, errorTail, outputs) )
+		]
+
+		try:
+			await asyncio.wait_for( process.wait(), self.timeout )
+		except asyncio.TimeoutError:
+			print( prefix + 'Installation time exceeded the timeout!' )
+			self._kill( process )
+			await process.wait()
+		finally:
+			self.processes.discard( process )
+
+		# Give the readers a moment to collect trailing output (child processes
+		# spawned by the installer may keep the pipes open indefinitely)
+		await asyncio.wait( readers, timeout=5 )
+		for reader in readers:
+			reader.cancel()
+		console.flush()
+		if hasattr( process, 'close' ): # Pooled processes' pipes aren't closed with the process
+			process.close()
+
+		if log:
+			log.write( '\n--- Exit code {} after {:.1f} seconds ---\n'.format(process.returncode, self.loop.time() - startTime).encode() )
+			log.close()
+		if record:
+			# Compress and index the output in a worker thread, to keep the event loop free
+			try:
+				await self.loop.run_in_executor( None, self.archive.add, record, process.returncode )
+			except OSError as err:
+				print( 'Unable to archive the output of {}; {}'.format(wl.name, err) )
+
+		await self.collectOutputs( wl, wlDir, files )
+
+		if self.debugMode:
+			print( 'Time to install {}: {}'.format(wl.name, self.loop.time() - startTime) )
+
+		# Report any errors
+		returnCode = process.returncode
+		if returnCode != 0:
+			print( 'There was an error installing {}; error code {}'.format(wl.name, returnCode) )
+			errorOutput = b''.join( errorTail ).decode( self.encoding, 'replace' ).strip()
+			if errorOutput:
+				print( errorOutput )
+
+		return returnCode
+
+	def openLog( self, wl ):
+
+		""" Opens the log file for this run of the given workload, or returns None
+			if logging is disabled (or the file can't be opened). """
+
+		if not self.logFolder:
+			return None
+
+		folderName = re.sub( r'[<>:"/\\|?*]', '_', wl.name ).strip( ' .' ) or 'workload'
+		path = os.path.join( self.logFolder, folderName, self.runId + '.log' )
+		try:
+			log = RotatingLog( path, self.maxLogBytes, self.logBackups )
+		except OSError as err:
+			print( 'Unable to open log file "{}"; {}'.format(path, err) )
+			return None
+
+		log.write( '--- {} installer; run {} ---\n'.format(wl.name, self.runId).encode() )
+		return log
+
+	def openArchiveRecord( self, wl ):
+
+		""" Starts an ArchiveRecord for this run of the given workload's output, or returns
+			None if there's no archive (or the record can't be started). """
+
+		if not self.archive:
+			return None
+
+		try:
+			return self.archive.begin( wl.name, self.runId )
+		except OSError as err:
+			print( 'Unable to archive the output of {}; {}'.format(wl.name, err) )
+			return None
+
+	async def _drain( self, name, stream, console, tail, outputs ):
+
+		""" Reads the given stream in chunks until it closes, passing each chunk to the
+			console writer (if given) and the outputs (log files and archive records),
+			and keeping the last part of the stream in the 'tail' deque (if given). """
+
+		tailSize = 0
+		while True:
+			data = await stream.read( chunkSize )
+			if not data:
+				break
+			self.outputBytes[name] += len( data )
+
+			if console:
+				console.write( data )
+			for output in outputs:
+				try:
+					output.write( data )
+				except OSError as err:
+					print( 'Unable to write to "{}"; {}'.format(output.path, err) )
+					outputs = [ other for other in outputs if other is not output ]
+			if tail is not None:
+				tail.append( data )
+				tailSize += len( data )
+				while tailSize - len( tail[0] ) >= errorTailSize:
+					tailSize -= len( tail.popleft() )
+
+	async def close( self ):
+
+		""" Stops the warm runner processes and payload extraction threads (if used). """
+
+		if self.pool:
+			await self.pool.close()
+		if self.extractionPool:
+			# Stop any extractions started for workloads that were never run (e.g. skipped)
+			self.extractionCancelled.set()
+			for future in self.extractions.values():
+				if not future.cancel() and not future.cancelled():
+					future.exception() # Marks any error as seen
+			self.extractionPool.shutdown( wait=False, cancel_futures=True )
+			self.extractionPool = None
+
+	def cancel( self ):
+
+		""" Stops any new installations from starting and kills those currently
+			running. May be called from any thread. """
+
+		self.cancelled = True
+		self.extractionCancelled.set()
+		if self.loop and not self.loop.is_closed():
+			self.loop.call_soon_threadsafe( self._killAll )
+
+	def _killAll( self ):
+		for process in list( self.processes ):
+			if process.returncode is None:
+				self._kill( process )
+
+	def _kill( self, process ):
+
+		""" Kills an installer process, along with any processes it started (on POSIX systems). """
+
+		if os.name == 'nt':
+			process.kill()
+		else:
+			try:
+				os.killpg( process.pid, signal.SIGKILL )
+			except ProcessLookupError:
+				try: # A pooled job may not have made its own process group yet
+					os.kill( process.pid, signal.SIGKILL )
+				except ProcessLookupError:
+					pass
+
+
+async def runPlan( scheduler, runner, onEvent=None, journal=None, metrics=None ):
+
+	""" Runs the jobs of the given scheduler as soon as the scheduler allows them to
+		start, all supervised by the current event loop. If given, 'onEvent' is called
+		with ( eventName, workload, data ) for each of the following events:
+			started:	a workload's installer has been launched
+			finished:	an installer has exited; data is the exit code
+			skipped:	a workload won't be installed (a requirement failed or the run was cancelled)
+		If a RunJournal is given, the plan and each of these events are also recorded in it.
+		If Metrics are given, each workload's queue wait, payload wait, run time, exit code,
+		and output size are recorded (and the metrics are saved after each installation
+		finishes). Jobs' start times and durations are those of their installers alone,
+		not counting the wait for their payloads (recorded as their payloadWait).
+		Returns the scheduler's list of jobs once everything has finished. """
+
+	if not onEvent:
+		onEvent = lambda eventName, wl, data: None
+
+	if journal:
+		try:
+			journal.begin( scheduler.jobs, runner.runId )
+		except OSError as err:
+			print( 'Unable to create the install journal; {}'.format(err) )
+			journal = None
+		else:
+			notifyEvent = onEvent
+			def onEvent( eventName, wl, data ):
+				nonlocal journal
+				if journal:
+					try:
+						journal.record( eventName, wl, data )
+					except OSError as err:
+						# Only the ability to resume is lost; carry on without the journal
+						print( 'Unable to write to the install journal, so this installation can\'t be resumed; {}'.format(err) )
+						journal.close()
+						journal = None
+				notifyEvent( eventName, wl, data )
+
+	loop = asyncio.get_running_loop()
+	planStartTime = loop.time()
+	runner.extractPayloads( job.workload for job in scheduler.upcoming(len(scheduler.jobs)) ) # In parallel, in the order they'll be needed
+	tasks = {}
+
+	if metrics:
+		metrics.event( 'runStarted', runId=runner.runId, workloads=[job.name for job in scheduler.jobs] )
+		notifyMetrics = onEvent
+		def onEvent( eventName, wl, data ):
+			if eventName == 'started':
+				metrics.event( 'installStarted', workload=wl.name )
+			elif eventName == 'skipped':
+				metrics.event( 'installSkipped', workload=wl.name )
+			notifyMetrics( eventName, wl, data )
+
+	while not scheduler.done:
+		if runner.cancelled:
+			for job in scheduler.cancelPending():
+				onEvent( 'skipped', job.workload, None )
+
+		# Start as many jobs as are currently allowed
+		job = None if runner.cancelled else scheduler.nextJob()
+		while job:
+			job.startTime = loop.time()
+			tasks[asyncio.ensure_future( runner.install(job.workload) )] = job
+			onEvent( 'started', job.workload, None )
+			job = scheduler.nextJob()
+
+		if not tasks:
+			break # Nothing running and nothing startable; shouldn't happen for a valid plan
+
+		# Copy the payloads of the workloads that may start next while the current ones install
+		for job in scheduler.upcoming( scheduler.maxWorkers ):
+			runner.prefetch( job.workload )
+
+		# Wait for any job to finish (or for a while, to retry jobs held back by resource admission)
+		timeout = scheduler.admission.pollInterval if scheduler.held else None
+		finishedTasks, _ = await asyncio.wait( tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED )
+		for task in finishedTasks:
+			job = tasks.pop( task )
+			launchTime = job.startTime
+
+			# Time the installer itself, apart from any wait for its payload
+			job.startTime = runner.spawnTimes.pop( job.name, launchTime )
+			job.payloadWait = job.startTime - launchTime
+			job.duration = loop.time() - job.startTime
+			try:
+				returnCode = task.result()
+			except Exception as err:
+				print( 'Unable to run the {} installer; {}'.format(job.name, err) )
+				returnCode = -1
+
+			skippedJobs = scheduler.markFinished( job, returnCode )
+			onEvent( 'finished', job.workload, returnCode )
+			if metrics:
+				metrics.recordJob( job, launchTime - planStartTime, runner.outputBytes.get(job.name, 0) )
+				metrics.save()
+
+			for skippedJob in skippedJobs:
+				print( 'Skipping {}; a workload it requires was not installed.'.format(skippedJob.name) )
+				onEvent( 'skipped', skippedJob.workload, None )
+
+	await runner.close()
+	if journal:
+		try:
+			journal.end()
+		except OSError as err:
+			print( 'Unable to finish the install journal; {}'.format(err) )
+			journal.close()
+	if metrics:
+		metrics.event( 'runFinished', runId=runner.runId, succeeded=sum(1 for job in scheduler.jobs if job.state == 'succeeded'), 
+			failed=sum(1 for job in scheduler.jobs if job.state == 'failed'), skipped=sum(1 for job in scheduler.jobs if job.state == 'skipped'), 
+			duration=round(loop.time() - planStartTime, 3) )
+
+	return scheduler.jobs
+
+
+class InstallSession( threading.Thread ):
+
+	""" Runs an installation plan on its own event loop in a background thread,
+		leaving the calling (GUI) thread free. Note that 'onEvent' and 'onComplete'
+		are called from the background thread. """
+
+	def __init__( self, scheduler, runner, onEvent=None, onComplete=None, journal=None, metrics=None ):
+		super().__init__( daemon=True )
+
+		self.scheduler = scheduler
+		self.runner = runner
+		self.onEvent = onEvent
+		self.onComplete = onComplete
+		self.journal = journal
+		self.metrics = metrics
+
+	def run( self ):
+		jobs = asyncio.run( runPlan(self.scheduler, self.runner, self.onEvent, self.journal, self.metrics) )
+
+		if self.onComplete:
+			self.onComplete( jobs )
+
+	def cancel( self ):
+		self.runner.cancel()
@@ -0,0 +1,307 @@
+# Scheduling of workload installations; decides which workloads may run
+# concurrently based on declared dependencies and mutual-exclusion groups,
+# starting those on the longest chain of dependent work first.
+
+
+import heapq
+
+
+class InstallJob:
+
+	""" Tracks the state of one workload within an installation plan. """
+
+	__slots__ = ( 'workload', 'name', 'after', 'requires', 'mutexGroups', 'resources', 'memoryMB',
+				  'priority', 'state', 'returnCode', 'startTime', 'payloadWait', 'duration' )
+
+	def __init__( self, workload ):
+		self.workload = workload
+		self.name = workload.name
+		self.after = tuple( getattr(workload, 'after', ()) )
+		self.requires = tuple( getattr(workload, 'requires', ()) )
+		self.mutexGroups = tuple( getattr(workload, 'mutexGroups', ()) )
+		self.resources = frozenset( getattr(workload, 'resources', ()) )
+		self.memoryMB = getattr( workload, 'memoryMB', 0 )
+		self.priority = 0 # Estimated seconds from this job's start until everything depending on it is done
+		self.state = 'pending' # One of pending/running/succeeded/failed/skipped
+		self.returnCode = None
+		self.startTime = None # When its installer started (once it has)
+		self.payloadWait = None # Seconds waited for its payload to be extracted and cached before that
+		self.duration = None # Seconds, once finished
+
+	def __repr__( self ):
+		return '<InstallJob {} ({})>'.format( self.name, self.state )
+
+
+def resolvePlan( selected, allWorkloads, isInstalled ):
+
+	""" Expands a list of selected workloads with any not-yet-installed workloads they
+		require (recursively), and returns the resulting list in the original order.
+		'isInstalled' should be a callable accepting a workload object. Raises
+		ValueError if a dependency names a workload that doesn't exist. """
+
+	byName = { wl.name: wl for wl in allWorkloads }
+	planNames = set()
+	toVisit = [ wl for wl in selected if not isInstalled(wl) ]
+
+	while toVisit:
+		wl = toVisit.pop()
+		if wl.name in planNames:
+			continue
+		planNames.add( wl.name )
+
+		for depName in getattr( wl, 'requires', () ):
+			dependency = byName.get( depName )
+			if not dependency:
+				raise ValueError( '"{}" requires "{}", which is not a known workload.'.format(wl.name, depName) )
+			elif depName not in planNames and not isInstalled( dependency ):
+				toVisit.append( dependency )
+
+	return [ wl for wl in allWorkloads if wl.name in planNames ]
+
+
+class InstallScheduler:
+
+	""" Decides which jobs of an installation plan may be started at any given moment.
+
+		When installing in parallel, jobs are started in order of priority; those
+		with the longest critical path (their own estimated duration plus that of
+		the longest chain of jobs waiting on them) go first, so that long chains
+		don't end up running alone at the end. Ties (and all jobs, when only one
+		may run at a time) go in plan order. Jobs start subject to these constraints:
+			- no more than 'maxWorkers' jobs run at once
+			- a job waits for the workloads named in its 'after' and 'requires'
+			  attributes (if they're part of the plan) to finish
+			- a job is skipped if a workload it 'requires' fails or is skipped
+			- only one job within each named mutex group may run at a time
+			- no more than classLimits[resourceClass] jobs using a resource class
+			  (e.g. 'disk') may run at once
+			- if an admission object is given (see Resources.ResourceAdmission), a job
+			  only starts alongside others if admission.admit( job ) returns True
+
+		This class doesn't run anything itself; a driver (such as Runner.runPlan)
+		asks it for the next job to start and reports back when jobs finish. If
+		'held' is True after calling nextJob, a job was held back by the admission
+		check, and the driver should ask again after admission.pollInterval seconds.
+
+		'durationOf' may be given to estimate job durations for prioritizing; it's
+		called with each workload object and should return seconds (by default,
+		the workload's installTime is used). """
+
+	def __init__( self, workloads, maxWorkers=1, classLimits=None, admission=None, durationOf=None ):
+		self.maxWorkers = max( 1, maxWorkers )
+		self.jobs = [ InstallJob(wl) for wl in workloads ]
+		self.jobsByName = { job.name: job for job in self.jobs }
+		self.running = 0
+		self.lockedGroups = set()
+		self.classLimits = classLimits or {}
+		self.classCounts = dict.fromkeys( self.classLimits, 0 ) # Running jobs per limited resource class
+		self.admission = admission
+		self.held = False
+
+		self._checkForCycles()
+		if self.maxWorkers > 1:
+			self._prioritize( durationOf or (lambda wl: getattr(wl, 'installTime', 0)) )
+		else:
+			self.queue = list( self.jobs )
+
+	def _dependencies( self, job ):
+
+		""" Returns the jobs within this plan that the given job must wait for. """
+
+		deps = []
+		for name in job.after + job.requires:
+			dependency = self.jobsByName.get( name )
+			if dependency and dependency is not job:
+				deps.append( dependency )
+		return deps
+
+	def _checkForCycles( self ):
+
+		""" Raises ValueError if the plan's dependencies form a loop (which would
+			otherwise result in jobs that can never be started). """
+
+		visiting = set()
+		visited = set()
+
+		for root in self.jobs:
+			if root.name in visited:
+				continue
+
+			# Iterative depth-first search, to handle long dependency chains
+			stack = [ (root, iter(self._dependencies(root))) ]
+			visiting.add( root.name )
+			while stack:
+				job, deps = stack[-1]
+				dependency = next( deps, None )
+				if dependency is None:
+					stack.pop()
+					visiting.discard( job.name )
+					visited.add( job.name )
+				elif dependency.name in visiting:
+					raise ValueError( 'Circular workload dependency involving "{}" and "{}".'.format(job.name, dependency.name) )
+				elif dependency.name not in visited:
+					visiting.add( dependency.name )
+					stack.append( (dependency, iter(self._dependencies(dependency))) )
+
+	def _prioritize( self, durationOf ):
+
+		""" Sets each job's priority to the length of its critical path, and builds the
+			queue of jobs in the order they should be started. """
+
+		# Each job's priority depends on those of the jobs waiting for it, so work back
+		# from the end of the dependency chains (jobs' dependencies all come before them)
+		dependents = { job.name: [] for job in self.jobs }
+		for job in self._dependencyOrder():
+			for dependency in self._dependencies( job ):
+				dependents[dependency.name].append( job )
+		for job in reversed( self._dependencyOrder() ):
+			job.priority = durationOf( job.workload ) + max( (dependent.priority for dependent in dependents[job.name]), default=0 )
+
+		planOrder = { job.name: index for index, job in enumerate(self.jobs) }
+		self.queue = sorted( self.jobs, key=lambda job: (-job.priority, planOrder[job.name]) )
+
+	def _dependencyOrder( self ):
+
+		""" Returns the jobs in an order where each comes after all of its dependencies. """
+
+		order = []
+		visited = set()
+		for root in self.jobs:
+			if root.name in visited:
+				continue
+			visited.add( root.name )
+			stack = [ (root, iter(self._dependencies(root))) ]
+			while stack:
+				job, deps = stack[-1]
+				dependency = next( deps, None )
+				if dependency is None:
+					stack.pop()
+					order.append( job )
+				elif dependency.name not in visited:
+					visited.add( dependency.name )
+					stack.append( (dependency, iter(self._dependencies(dependency))) )
+		return order
+
+	@property
+	def done( self ):
+		return all( job.state not in ('pending', 'running') for job in self.jobs )
+
+	def nextJob( self ):
+
+		""" Returns the next job that may be started (and marks it as running),
+			or None if nothing can be started right now. """
+
+		self.held = False
+		if self.running >= self.maxWorkers:
+			return None
+
+		for job in self.queue:
+			if job.state != 'pending':
+				continue
+			elif self.lockedGroups.intersection( job.mutexGroups ):
+				continue
+			elif any( self.classCounts[name] >= self.classLimits[name] for name in job.resources if name in self.classLimits ):
+				continue
+			elif any( dep.state in ('pending', 'running') for dep in self._dependencies(job) ):
+				continue
+			elif self.admission and self.running > 0 and not self.admission.admit( job ):
+				self.held = True
+				continue
+
+			job.state = 'running'
+			self.running += 1
+			self.lockedGroups.update( job.mutexGroups )
+			self._countClasses( job, 1 )
+			return job
+
+		return None
+
+	def markFinished( self, job, returnCode ):
+
+		""" Records the result of a job, releases its mutex groups, and skips any
+			pending jobs that require it if it failed. Returns a list of the jobs
+			that were skipped as a result. """
+
+		job.returnCode = returnCode
+		job.state = 'succeeded' if returnCode == 0 else 'failed'
+		self.running -= 1
+		self.lockedGroups.difference_update( job.mutexGroups )
+		self._countClasses( job, -1 )
+
+		skipped = []
+		if job.state == 'failed':
+			self._skipDependents( job, skipped )
+		return skipped
+
+	def upcoming( self, count ):
+
+		""" Returns up to 'count' of the pending jobs, in the order they're expected to start. """
+
+		return [ job for job in self.queue if job.state == 'pending' ][:count]
+
+	def _countClasses( self, job, change ):
+		for name in job.resources:
+			if name in self.classCounts:
+				self.classCounts[name] += change
+
+	def cancelPending( self ):
+
+		""" Marks all jobs which haven't been started yet as skipped, and returns them. """
+
+		skipped = []
+		for job in self.jobs:
+			if job.state == 'pending':
+				job.state = 'skipped'
+				skipped.append( job )
+		return skipped
+
+	def _skipDependents( self, failedJob, skipped ):
+
+		for job in self.jobs:
+			if job.state == 'pending' and failedJob.name in job.requires:
+				job.state = 'skipped'
+				skipped.append( job )
+				self._skipDependents( job, skipped )
+
+
+def simulatePlan( workloads, maxWorkers, durationOf=None, classLimits=None ):
+
+	""" Predicts how the given plan of workloads will be installed, by simulating the 
+		scheduler with each workload taking its estimated install time. 'durationOf' 
+		may be given to use a different estimate; it's called with each workload 
+		object and should return seconds. Live resource admission isn't simulated, 
+		since it depends on the system's load at the time. Returns a list of 
+		( job, startTime, finishTime ) tuples in the order the jobs would start, 
+		and the total time (in seconds). """
+
+	if not durationOf:
+		durationOf = lambda wl: wl.installTime
+
+	scheduler = InstallScheduler( workloads, maxWorkers, classLimits, durationOf=durationOf )
+	clock = 0
+	running = [] # Heap of ( finishTime, startOrder, job )
+	schedule = []
+
+	while not scheduler.done:
+		job = scheduler.nextJob()
+		while job:
+			finishTime = clock + durationOf( job.workload )
+			heapq.heappush( running, (finishTime, len(schedule), job) )
+			schedule.append( (job, clock, finishTime) )
+			job = scheduler.nextJob()
+
+		if not running:
+			break
+
+		clock, _, job = heapq.heappop( running )
+		scheduler.markFinished( job, 0 )
+
+	return schedule, clock
+
+
+def estimateMakespan( workloads, maxWorkers, durationOf=None, classLimits=None ):
+
+	""" Predicts the total time (in seconds) to install the given plan of workloads.
+		See simulatePlan for the arguments. """
+
+	return simulatePlan( workloads, maxWorkers, durationOf, classLimits )[1]
@@ -0,0 +1,301 @@
+# A pool of warm Python worker processes for running Python installers (POSIX
+# only). When many workloads are tiny configuration scripts that finish in well
+# under a second, starting a new interpreter for each one dominates their run
+# time. Instead, a few worker processes are started once (with commonly used
+# modules already imported), and each installer runs in a fork of an idle worker;
+# the worker is sent the job (and the write ends of the job's output pipes) over
+# a Unix socket, and reports back the job's process ID and exit status.
+#
+# Every job is a fresh fork of an untouched worker, with its own working directory,
+# environment (a copy of the supervisor's current one), process group, and output
+# pipes, so nothing carries over between jobs. Exit codes are the same as those of
+# a separate interpreter (including for sys.exit() and uncaught exceptions), and
+# negative for a signal, as for a subprocess.
+#
+# Only Python installers are run this way. Shell scripts, batch files, and other
+# programs still need a new process of their own, and starting one from a warm
+# worker was measured to be slower than starting it directly, so they gain nothing.
+
+
+import gc
+import os
+import sys
+import json
+import struct
+import signal
+import socket
+import asyncio
+
+from asyncio.subprocess import PIPE
+
+
+headerFormat = '<I' # Length of the JSON request that follows
+
+
+class PooledProcess:
+
+	""" A job running in a warm worker. Has the same attributes used by the
+		ProcessRunner as an asyncio subprocess (pid, stdout, stderr, returncode,
+		and wait()), so either may be supervised the same way. """
+
+	def __init__( self, pid, stdout, stderr, transports ):
+		self.pid = pid # Also its process group ID
+		self.stdout = stdout
+		self.stderr = stderr
+		self.transports = transports
+		self.returncode = None
+		self.finished = asyncio.Event()
+
+	async def wait( self ):
+		await self.finished.wait()
+		return self.returncode
+
+	def close( self ):
+
+		""" Closes the output pipes (if they're not already closed, by reaching their end). """
+
+		for transport in self.transports:
+			transport.close()
+
+
+class WarmWorker:
+
+	""" The supervisor's side of one worker process. """
+
+	def __init__( self, process, sock ):
+		self.process = process
+		self.sock = sock # Requests are sent here; replies are read from the worker's stdout
+
+	def send( self, request, fds ):
+		data = json.dumps( request ).encode( 'utf-8' )
+		data = struct.pack( headerFormat, len(data) ) + data
+		sent = socket.send_fds( self.sock, [data], fds )
+		if sent < len( data ):
+			self.sock.sendall( data[sent:] )
+
+	async def readReply( self ):
+		line = await self.process.stdout.readline()
+		if not line:
+			raise OSError( 'The warm runner process exited unexpectedly.' )
+		return json.loads( line )
+
+	async def close( self ):
+		self.sock.close() # The worker exits once its socket closes
+		try:
+			await asyncio.wait_for( self.process.wait(), 5 )
+		except asyncio.TimeoutError:
+			self.process.kill()
+			await self.process.wait()
+
+
+class WarmPool:
+
+	""" Keeps 'size' worker processes ready, and runs Python installers in them. Workers
+		are started the first time a job is spawned. Use from within an asyncio event loop,
+		and close() once finished with the pool. """
+
+	def __init__( self, size ):
+		self.size = max( 1, size )
+		self.workers = []
+		self.idle = None # Queue of idle workers; created once running on the event loop
+
+	async def startWorker( self ):
+		supervisorSock, workerSock = socket.socketpair( socket.AF_UNIX, socket.SOCK_STREAM )
+		try:
+			process = await asyncio.create_subprocess_exec( sys.executable, os.path.abspath(__file__), '--worker', str(workerSock.fileno()),
+				stdout=PIPE, pass_fds=(workerSock.fileno(),) )
+		except OSError:
+			supervisorSock.close()
+			raise
+		finally:
+			workerSock.close()
+
+		worker = WarmWorker( process, supervisorSock )
+		self.workers.append( worker )
+		return worker
+
+	async def acquire( self ):
+
+		""" Returns an idle worker, waiting for one if they're all busy. """
+
+		if self.idle is None:
+			self.idle = asyncio.Queue()
+			for worker in await asyncio.gather( *(self.startWorker() for _ in range(self.size)) ):
+				self.idle.put_nowait( worker )
+
+		worker = await self.idle.get()
+		if worker.process.returncode is not None: # Replace a worker that has died
+			self.workers.remove( worker )
+			worker.sock.close()
+			worker = await self.startWorker()
+		return worker
+
+	async def spawn( self, scriptPath, cwd ):
+
+		""" Starts a Python installer in an idle worker, and returns a PooledProcess for
+			it. Raises OSError if the job can't be started. """
+
+		loop = asyncio.get_running_loop()
+		worker = await self.acquire()
+		stdoutRead, stdoutWrite = os.pipe()
+		stderrRead, stderrWrite = os.pipe()
+
+		try:
+			try:
+				worker.send( {'script': scriptPath, 'cwd': cwd, 'env': dict(os.environ)}, [stdoutWrite, stderrWrite] )
+			finally:
+				os.close( stdoutWrite ) # The job has its own copies now
+				os.close( stderrWrite )
+			reply = await worker.readReply()
+			if 'error' in reply:
+				raise OSError( reply['error'] )
+		except BaseException:
+			os.close( stdoutRead )
+			os.close( stderrRead )
+			self.idle.put_nowait( worker )
+			raise
+
+		# Read the job's output just as for a subprocess
+		readers = []
+		transports = []
+		for fd in ( stdoutRead, stderrRead ):
+			reader = asyncio.StreamReader()
+			transport, _ = await loop.connect_read_pipe( lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', 0) )
+			readers.append( reader )
+			transports.append( transport )
+
+		process = PooledProcess( reply['pid'], readers[0], readers[1], transports )
+		asyncio.ensure_future( self._waitForExit(worker, process) )
+		return process
+
+	async def _waitForExit( self, worker, process ):
+		try:
+			process.returncode = ( await worker.readReply() )['exitCode']
+			self.idle.put_nowait( worker )
+		except (OSError, ValueError, KeyError):
+			process.returncode = -1 # The worker died; it'll be replaced when next acquired
+			self.idle.put_nowait( worker )
+		finally:
+			process.finished.set()
+
+	async def close( self ):
+		await asyncio.gather( *(worker.close() for worker in self.workers) )
+		self.workers = []
+		self.idle = None
+
+
+# The worker process
+
+
+def _runWorker( sockFd ):
+
+	""" Runs jobs sent over the given socket, one at a time, until the socket closes. """
+
+	# Modules commonly used by Python installers, loaded once here rather than in each job
+	import io, re, json, time, runpy, shutil, traceback, subprocess
+
+	signal.signal( signal.SIGINT, signal.SIG_IGN ) # The supervisor decides when to stop
+	gc.freeze() # Keeps the garbage collector from touching (and so copying) the worker's memory in each job
+	sock = socket.socket( fileno=sockFd )
+	replyFd = os.dup( 1 )
+	sys.stdout = sys.stderr # Keep stray prints out of the reply channel
+
+	def reply( message ):
+		os.write( replyFd, (json.dumps(message) + '\n').encode('utf-8') )
+
+	while True:
+		# Receive the next request (with its output pipes attached to the first bytes)
+		header, fds, _, _ = socket.recv_fds( sock, struct.calcsize(headerFormat), 2 )
+		if not header:
+			break
+		while len( header ) < struct.calcsize( headerFormat ):
+			header += sock.recv( struct.calcsize(headerFormat) - len(header) )
+		length = struct.unpack( headerFormat, header )[0]
+		data = b''
+		while len( data ) < length:
+			chunk = sock.recv( length - len(data) )
+			if not chunk:
+				return
+			data += chunk
+		request = json.loads( data )
+
+		if not os.path.isdir( request['cwd'] ):
+			for fd in fds:
+				os.close( fd )
+			reply( {'error': 'The installer folder "{}" does not exist.'.format(request['cwd'])} )
+			continue
+
+		pid = os.fork()
+		if pid == 0:
+			_runJob( request, fds, sock, replyFd )
+		for fd in fds:
+			os.close( fd )
+
+		reply( {'pid': pid} )
+		_, status = os.waitpid( pid, 0 )
+		reply( {'exitCode': os.waitstatus_to_exitcode(status)} )
+
+
+def _runJob( request, fds, sock, replyFd ):
+
+	""" Runs a job in a forked worker process. Never returns. """
+
+	import runpy, traceback
+
+	exitCode = 1
+	try:
+		os.setsid() # Own process group, so the whole tree can be killed
+		sock.close()
+		os.close( replyFd )
+		os.dup2( fds[0], 1 )
+		os.dup2( fds[1], 2 )
+		for fd in fds:
+			os.close( fd )
+
+		os.chdir( request['cwd'] )
+		os.environ.clear()
+		os.environ.update( request['env'] )
+
+		# Run the installer as its own interpreter would
+		signal.signal( signal.SIGINT, signal.default_int_handler )
+		scriptPath = request['script']
+		sys.argv = [ scriptPath ]
+		sys.path[0] = os.path.dirname( os.path.abspath(scriptPath) )
+		sys.stdout = open( 1, 'w', closefd=False )
+		sys.stderr = open( 2, 'w', buffering=1, closefd=False )
+		try:
+			runpy.run_path( scriptPath, run_name='__main__' )
+			exitCode = 0
+		except SystemExit as exit:
+			if exit.code is None:
+				exitCode = 0
+			elif isinstance( exit.code, int ):
+				exitCode = exit.code
+			else:
+				print( exit.code, file=sys.stderr )
+				exitCode = 1
+		except BaseException as error:
+			# Report the error as the interpreter would, without this module's frames
+			tb = error.__traceback__
+			while tb and tb.tb_frame.f_code.co_filename != scriptPath:
+				tb = tb.tb_next
+			traceback.print_exception( type(error), error, tb or error.__traceback__ )
+			exitCode = 1
+	except BaseException:
+		traceback.print_exc()
+		exitCode = 1
+	finally:
+		try:
+			sys.stdout.flush()
+			sys.stderr.flush()
+		except Exception:
+			pass
+		os._exit( exitCode & 0xFF )
+
+
+if __name__ == "__main__":
+	if len( sys.argv ) == 3 and sys.argv[1] == '--worker':
+		_runWorker( int(sys.argv[2]) )
+	else:
+		print( 'This module is used by the installer to run warm worker processes; it is not run directly.' )
+		sys.exit( 1 )
@@ -0,0 +1,776 @@
+# Loading of workload definitions from a manifest file (JSON or TOML), with
+# optional auto-discovery of workload folders. The validated result is cached
+# in a compiled form, so later launches can skip parsing and checking paths.
+
+
+import os
+import glob
+import json
+
+from Probes import createProbe
+from Payloads import extractedFolderName
+from Resources import resourceClasses
+
+try:
+	import tomllib
+except ImportError: # Python < 3.11
+	tomllib = None
+
+
+cacheVersion = 4
+
+
+class ManifestError( Exception ):
+	pass
+
+
+def humanReadableTime( seconds ):
+
+	""" Converts a time interval in seconds to a human-readable string of days/hours/minutes, etc. """
+
+	result = []
+	intervals = (
+		('weeks', 604800),  # 60 * 60 * 24 * 7
+		('days', 86400),    # 60 * 60 * 24
+		('hours', 3600),    # 60 * 60
+		('minutes', 60),
+		('seconds', 1),
+		)
+
+	if seconds == 0:
+		return '0 seconds'
+
+	for name, count in intervals:
+		value = seconds // count # Floor division; rounds down to full int
+		if value:
+			seconds -= value * count
+			if value == 1:
+				name = name.rstrip('s')
+			result.append( "{} {}".format(int(value), name) )
+
+	if len( result ) == 2:
+		return '{} and {}'.format( result[0], result[1] )
+	else:
+		commaJoined = ', '.join( result )
+
+		# Replace the last comma and space with an 'and'
+		li = commaJoined.rsplit( ', ', 1 )
+		return ', and '.join( li )
+
+
+class WorkloadInfo:
+
+	""" The definition of a single workload, as loaded from the manifest.
+		Paths are absolute. 'probe' is the definition of its install probe (see
+		Probes.py), or None to just check whether the checkInstallPath exists.
+		'resources' names the resource classes it uses heavily (see Resources.py),
+		and 'memoryMB' estimates its peak memory use. 'payload' describes an archive
+		to extract before installing (see Payloads.py) as a dict of 'archive' and
+		'extractTo' paths and its expected 'sha256' hash (or None). """
+
+	__slots__ = ( 'name', 'installTime', 'installerPath', 'checkInstallPath', 'toolTip',
+				  'after', 'requires', 'mutexGroups', 'probe', 'resources', 'memoryMB', 'payload' )
+
+	def __init__( self, name, installTime, installerPath, checkInstallPath, toolTip='', after=(), requires=(), mutexGroups=(), 
+				  probe=None, resources=(), memoryMB=0, payload=None ):
+		self.name = name
+		self.installTime = installTime
+		self.installerPath = installerPath
+		self.checkInstallPath = checkInstallPath
+		self.toolTip = toolTip
+		self.after = tuple( after )
+		self.requires = tuple( requires )
+		self.mutexGroups = tuple( mutexGroups )
+		self.probe = probe
+		self.resources = tuple( resources )
+		self.memoryMB = memoryMB
+		self.payload = payload
+
+	def createProbe( self ):
+
+		""" Returns a new Probe object for checking whether this workload is installed. """
+
+		spec = self.probe or { 'type': 'path', 'path': self.checkInstallPath }
+		return createProbe( spec, os.path.dirname(self.installerPath) )
+
+	def toDict( self ):
+		return { attr: getattr(self, attr) for attr in self.__slots__ }
+
+	@classmethod
+	def fromDict( cls, values ):
+		return cls( **values )
+
+
+class Manifest:
+
+	""" The full set of workloads and suites described by a manifest file. """
+
+	def __init__( self, workloads, suites, defaultSuite ):
+		self.workloads = workloads # List of WorkloadInfo objects, in display order
+		self.suites = suites # Dict of suiteName: list of workload names
+		self.defaultSuite = defaultSuite
+
+
+def loadManifest( manifestPath, homeFolder, cacheFolder=None ):
+
+	""" Loads the given manifest file, using the compiled cache in 'cacheFolder' (if
+		given) if it's still current. Relative paths in the manifest are relative to
+		'homeFolder'. Raises ManifestError if the manifest can't be read or is invalid. """
+
+	manifestPath = os.path.join( homeFolder, manifestPath )
+	cachePath = os.path.join( cacheFolder, os.path.basename(manifestPath) + '.cache' ) if cacheFolder else None
+
+	# Check the cache. Its key covers the manifest file and the folders searched by
+	# auto-discovery (adding or removing a workload folder changes the folder's mtime)
+	try:
+		stat = os.stat( manifestPath )
+	except OSError as err:
+		raise ManifestError( 'Unable to read the workload manifest; {}'.format(err) )
+	manifestKey = [ stat.st_mtime_ns, stat.st_size, os.path.abspath(homeFolder) ]
+
+	if cachePath:
+		manifest = _loadCache( cachePath, manifestKey )
+		if manifest:
+			return manifest
+
+	# Parse and validate the manifest file
+	try:
+		if manifestPath.lower().endswith( '.toml' ):
+			if not tomllib:
+				raise ManifestError( 'TOML manifests require Python 3.11 or later.' )
+			with open( manifestPath, 'rb' ) as file:
+				data = tomllib.load( file )
+		else:
+			with open( manifestPath, 'r', encoding='utf-8' ) as file:
+				data = json.load( file )
+	except (OSError, ValueError) as err:
+		raise ManifestError( 'Unable to parse the workload manifest; {}'.format(err) )
+
+	manifest = compileManifest( data, homeFolder )
+
+	# Save the compiled form for next time
+	if cachePath:
+		_saveCache( cachePath, manifestKey, _discoveryKey(data, homeFolder), manifest )
+
+	return manifest
+
+
+def compileManifest( data, homeFolder ):
+
+	""" Validates parsed manifest data and builds a Manifest object from it. Workloads
+		whose installers can't be found are left out (with a warning). """
+
+	if not isinstance( data, dict ):
+		raise ManifestError( 'The workload manifest should contain an object/table at the top level.' )
+
+	# Collect explicitly-defined workloads
+	workloads = []
+	names = set()
+	for index, entry in enumerate( data.get('workloads', []) ):
+		wl = _buildWorkload( entry, homeFolder, 'workload #{}'.format(index+1) )
+		if wl.name in names:
+			raise ManifestError( 'Workload "{}" is defined more than once.'.format(wl.name) )
+		names.add( wl.name )
+		workloads.append( wl )
+
+	# Auto-discover workload folders not already defined above
+	for index, rule in enumerate( data.get('discover', []) ):
+		if not isinstance( rule, dict ) or not isinstance( rule.get('pattern'), str ):
+			raise ManifestError( 'Discovery rule #{} needs a "pattern" string.'.format(index+1) )
+
+		for installer in sorted( glob.glob(os.path.join(homeFolder, rule['pattern'])) ):
+			folder = os.path.relpath( os.path.dirname(installer), homeFolder )
+			name = os.path.basename( folder )
+			if name in names:
+				continue
+			entry = {
+				'name': name,
+				'installTime': rule.get( 'installTime', 0 ),
+				'installer': os.path.relpath( installer, homeFolder ),
+				'checkInstallPath': os.path.join( folder, rule.get('checkInstallPath', 'Done.txt') ),
+				'mutexGroups': rule.get( 'mutexGroups', [] ),
+				'resources': rule.get( 'resources', [] ),
+				'memoryMB': rule.get( 'memoryMB', 0 )
+			}
+			names.add( name )
+			workloads.append( _buildWorkload(entry, homeFolder, 'discovered workload "{}"'.format(name)) )
+
+	# Leave out workloads that don't have an installer
+	available = []
+	for wl in workloads:
+		if os.path.exists( wl.installerPath ):
+			available.append( wl )
+		else:
+			print( 'Warning! Unable to find installer path for "{}".'.format(wl.installerPath) )
+	availableNames = { wl.name for wl in available }
+
+	for wl in available:
+		for depName in wl.after + wl.requires:
+			if depName not in names:
+				raise ManifestError( 'Workload "{}" depends on "{}", which is not defined.'.format(wl.name, depName) )
+
+	# Validate the suites
+	suites = data.get( 'suites', {} )
+	if not isinstance( suites, dict ):
+		raise ManifestError( '"suites" should map suite names to lists of workload names.' )
+	for suiteName, members in suites.items():
+		if suiteName in ( 'Full', 'Custom' ):
+			raise ManifestError( 'The "{}" suite is built in and cannot be redefined.'.format(suiteName) )
+		elif not isinstance( members, list ):
+			raise ManifestError( 'Suite "{}" should be a list of workload names.'.format(suiteName) )
+		for name in members:
+			if name not in names:
+				raise ManifestError( 'Suite "{}" includes "{}", which is not defined.'.format(suiteName, name) )
+		suites[suiteName] = [ name for name in members if name in availableNames ]
+
+	defaultSuite = data.get( 'defaultSuite', 'Full' )
+	if defaultSuite not in suites and defaultSuite != 'Full':
+		raise ManifestError( 'The default suite "{}" is not defined.'.format(defaultSuite) )
+
+	return Manifest( available, suites, defaultSuite )
+
+
+def _buildWorkload( entry, homeFolder, description ):
+
+	""" Validates one workload entry and converts it to a WorkloadInfo object. """
+
+	if not isinstance( entry, dict ):
+		raise ManifestError( 'The {} should be an object/table.'.format(description) )
+
+	for key, valueType in ( ('name', str), ('installer', str), ('checkInstallPath', str) ):
+		if not isinstance( entry.get(key), valueType ):
+			raise ManifestError( 'The {} needs a "{}" string.'.format(description, key) )
+
+	installTime = entry.get( 'installTime', 0 )
+	if not isinstance( installTime, (int, float) ) or installTime < 0:
+		raise ManifestError( 'The "installTime" of {} should be a number of seconds.'.format(description) )
+
+	for key in ( 'after', 'requires', 'mutexGroups', 'resources' ):
+		if not isinstance( entry.get(key, []), list ):
+			raise ManifestError( 'The "{}" of {} should be a list of names.'.format(key, description) )
+
+	for resourceClass in entry.get( 'resources', [] ):
+		if resourceClass not in resourceClasses:
+			raise ManifestError( 'Unknown resource class "{}" for {}; should be one of: {}'.format(resourceClass, description, ', '.join(resourceClasses)) )
+
+	memoryMB = entry.get( 'memoryMB', 0 )
+	if not isinstance( memoryMB, (int, float) ) or memoryMB < 0:
+		raise ManifestError( 'The "memoryMB" of {} should be a number of megabytes.'.format(description) )
+
+	# Validate the install probe (file-based probes check the checkInstallPath by default)
+	probe = entry.get( 'probe' )
+	if probe is not None:
+		if not isinstance( probe, dict ):
+			raise ManifestError( 'The "probe" of {} should be an object/table.'.format(description) )
+		probe = dict( probe )
+		probe.setdefault( 'type', 'path' )
+		if probe['type'] != 'command':
+			probePath = probe.get( 'path', entry['checkInstallPath'] )
+			if not isinstance( probePath, str ):
+				raise ManifestError( 'The probe "path" of {} should be a string.'.format(description) )
+			probe['path'] = _absPath( probePath, homeFolder )
+
+	# Validate the payload archive (extracted next to the installer, by default)
+	payload = entry.get( 'payload' )
+	if payload is not None:
+		if isinstance( payload, str ):
+			payload = { 'archive': payload }
+		if not isinstance( payload, dict ) or not isinstance( payload.get('archive'), str ):
+			raise ManifestError( 'The "payload" of {} should be an archive path, or an object/table with an "archive" path.'.format(description) )
+		sha256 = payload.get( 'sha256' )
+		if sha256 is not None and not ( isinstance(sha256, str) and len(sha256) == 64 and all(char in '0123456789abcdefABCDEF' for char in sha256) ):
+			raise ManifestError( 'The payload "sha256" of {} should be a SHA-256 hash, in hex.'.format(description) )
+		archivePath = _absPath( payload['archive'], homeFolder )
+		try:
+			folderName = extractedFolderName( archivePath )
+		except ValueError as err:
+			raise ManifestError( 'Invalid payload for {}; {}'.format(description, err) )
+		if 'extractTo' in payload:
+			if not isinstance( payload['extractTo'], str ):
+				raise ManifestError( 'The payload "extractTo" of {} should be a folder path.'.format(description) )
+			extractTo = _absPath( payload['extractTo'], homeFolder )
+		else:
+			extractTo = os.path.join( os.path.dirname(_absPath(entry['installer'], homeFolder)), folderName )
+		payload = { 'archive': archivePath, 'sha256': sha256.lower() if sha256 else None, 'extractTo': extractTo }
+
+	wl = WorkloadInfo(
+		entry['name'],
+		installTime,
+		_absPath( entry['installer'], homeFolder ),
+		_absPath( entry['checkInstallPath'], homeFolder ),
+		entry.get( 'toolTip', '' ),
+		entry.get( 'after', [] ),
+		entry.get( 'requires', [] ),
+		entry.get( 'mutexGroups', [] ),
+		probe,
+		entry.get( 'resources', [] ),
+		memoryMB,
+		payload
+	)
+
+	try:
+		wl.createProbe()
+	except ValueError as err:
+		raise ManifestError( 'Invalid install probe for {}; {}'.format(description, err) )
+
+	return wl
+
+
+def _absPath( path, homeFolder ):
+
+	""" Converts a manifest path (which may use either slash) to an absolute, normalized path. """
+
+	path = path.replace( '\\', '/' ).replace( '/', os.sep )
+	return os.path.normpath( os.path.join(homeFolder, path) )
+
+
+def _discoveryKey( data, homeFolder ):
+
+	""" Returns the mtimes of the folders searched by the manifest's discovery rules. """
+
+	key = []
+	rules = data.get( 'discover', [] ) if isinstance( data, dict ) else []
+	for rule in rules:
+		pattern = os.path.join( homeFolder, rule['pattern'] )
+
+		# Find the deepest folder in the pattern that has no wildcards
+		folder = pattern
+		while any( char in folder for char in '*?[' ):
+			folder = os.path.dirname( folder )
+		try:
+			key.append( [folder, os.stat(folder).st_mtime_ns] )
+		except OSError:
+			key.append( [folder, None] )
+	return key
+
+
+def _loadCache( cachePath, manifestKey ):
+
+	""" Returns the cached Manifest if the cache exists and is still current, or None. """
+
+	try:
+		with open( cachePath, 'r', encoding='utf-8' ) as file:
+			cache = json.load( file )
+
+		if cache['version'] != cacheVersion or cache['manifestKey'] != manifestKey:
+			return None
+
+		for folder, mtime in cache['discoveryKey']:
+			try:
+				if os.stat( folder ).st_mtime_ns != mtime:
+					return None
+			except OSError:
+				if mtime is not None:
+					return None
+
+		workloads = [ WorkloadInfo.fromDict(values) for values in cache['workloads'] ]
+		return Manifest( workloads, cache['suites'], cache['defaultSuite'] )
+
+	except (OSError, ValueError, KeyError, TypeError):
+		return None
+
+
+def _saveCache( cachePath, manifestKey, discoveryKey, manifest ):
+
+	cache = {
+		'version': cacheVersion,
+		'manifestKey': manifestKey,
+		'discoveryKey': discoveryKey,
+		'workloads': [ wl.toDict() for wl in manifest.workloads ],
+		'suites': manifest.suites,
+		'defaultSuite': manifest.defaultSuite
+	}
+
+	try:
+		os.makedirs( os.path.dirname(cachePath), exist_ok=True )
+		tempPath = cachePath + '.tmp'
+		with open( tempPath, 'w', encoding='utf-8' ) as file:
+			json.dump( cache, file )
+		os.replace( tempPath, cachePath )
+	except OSError as err:
+		print( 'Unable to save the workload manifest cache; {}'.format(err) )
+
+
+class InstallStateCache:
+
+	""" Remembers the result of each workload's install probe, so that frequent checks
+		(such as those made while painting) don't re-run them. Probes should be re-checked
+		when the folder containing their path changes (e.g. via a filesystem watcher),
+		and when an installer finishes. If a ProbeResultCache is given, the results of
+		slow probes are also kept between runs. """
+
+	def __init__( self, resultCache=None ):
+		self.states = {} # Key = Probe, value = bool
+		self.probesByFolder = {} # Key = folder, value = set of probes with paths within it
+		self.probesByPath = {} # Key = probe path, value = set of probes
+		self.resultCache = resultCache
+
+	def track( self, probe ):
+
+		""" Registers a probe, so it can be found when its folder changes. """
+
+		if probe.watchPath:
+			self.probesByFolder.setdefault( os.path.dirname(probe.watchPath), set() ).add( probe )
+			self.probesByPath.setdefault( probe.watchPath, set() ).add( probe )
+
+	def untrack( self, probe ):
+
+		""" Forgets a probe (and its last result), e.g. for a workload no longer in the manifest. """
+
+		if probe.watchPath:
+			for probes, key in ( (self.probesByFolder, os.path.dirname(probe.watchPath)), (self.probesByPath, probe.watchPath) ):
+				probes.get( key, set() ).discard( probe )
+				if not probes.get( key, True ):
+					del probes[key]
+		self.states.pop( probe, None )
+
+	def folders( self ):
+
+		""" Returns the folders containing the paths of all tracked probes (i.e. those worth watching). """
+
+		return list( self.probesByFolder )
+
+	def state( self, probe ):
+
+		""" Returns the last result of the given probe, or None if it hasn't been checked. """
+
+		return self.states.get( probe )
+
+	def check( self, probe, useCache=True ):
+
+		""" Runs the given probe (unless a current result is cached) and returns the
+			result. May be called from any thread. """
+
+		key = probe.key() if self.resultCache else None
+		installed = None
+		if key is not None and useCache:
+			installed = self.resultCache.get( key )
+
+		if installed is None:
+			installed = probe.check()
+			if key is not None:
+				self.resultCache.put( key, installed )
+
+		self.states[probe] = installed
+		return installed
+
+	def probesInFolder( self, folder ):
+
+		""" Returns the tracked probes whose paths are within the given folder (or are
+			the folder itself). """
+
+		folder = os.path.normpath( folder )
+		return set( self.probesByFolder.get(folder, ()) ) | self.probesByPath.get( folder, set() )
+
+	def clear( self ):
+		self.states.clear()
+
+	def save( self ):
+		if self.resultCache:
+			self.resultCache.save()
+
+
+class WorkloadRecord( WorkloadInfo ):
+
+	""" A workload within the registry, along with its current selection and install state.
+		'checking' is True while its install probe is running (or hasn't yet run). """
+
+	__slots__ = ( 'id', 'selected', 'installed', 'checking' )
+
+	def __init__( self, recordId, info, selected, installed, checking=False ):
+		super().__init__( *(getattr(info, attr) for attr in WorkloadInfo.__slots__) )
+		self.id = recordId
+		self.selected = selected
+		self.installed = installed
+		self.checking = checking
+
+	@property
+	def pending( self ):
+
+		""" Whether this workload is selected but not yet installed. """
+
+		return self.selected and not self.installed
+
+
+class ManifestChanges:
+
+	""" The differences applied by WorkloadRegistry.reload(). 'probes' are the install
+		probes that need to be run (those of new workloads, and of workloads whose
+		install probe changed). """
+
+	def __init__( self ):
+		self.added = []
+		self.removed = []
+		self.updated = []
+		self.probes = []
+		self.reordered = False
+		self.suitesChanged = False # Whether the suites' names changed (their members may change regardless)
+
+	def __bool__( self ):
+		return bool( self.added or self.removed or self.updated or self.reordered or self.suitesChanged )
+
+
+class WorkloadRegistry:
+
+	""" Holds the workloads and suites from a manifest, along with each workload's
+		selection and install state. Aggregates over the selections (counts and the
+		total time to install what's pending) are kept up-to-date as states change,
+		so they never need to be recalculated by walking the list.
+
+		Install states start out unknown (with records marked as 'checking') unless
+		already in the InstallStateCache. Run the probes with checkInstalls, or
+		with a ProbeEngine, passing the results to setProbeResult.
+
+		Observers (callables added with addObserver) are called with each record
+		whose state changes.
+
+		A changed manifest may be applied with reload(), which only updates the
+		records of workloads whose definitions changed. """
+
+	def __init__( self, manifest, installStates, selectAll=False ):
+		self.installStates = installStates
+		self.records = [] # Indexed by record ID, in display order
+		self.probes = [] # Install probes, indexed by record ID
+		self.byName = {}
+		self.byProbe = {}
+		self.infos = {} # The manifest's definitions (records' install times may be replaced by estimates); key = workload name
+		self.observers = []
+
+		self.selectedCount = 0
+		self.pendingCount = 0
+		self.pendingSeconds = 0
+		self.checkingCount = 0
+
+		if manifest.defaultSuite == 'Full' or selectAll:
+			defaultNames = { wl.name for wl in manifest.workloads }
+		else:
+			defaultNames = set( manifest.suites[manifest.defaultSuite] )
+
+		for info in manifest.workloads:
+			probe = info.createProbe()
+			installStates.track( probe )
+			state = installStates.state( probe )
+			installed = bool( state )
+			record = WorkloadRecord( len(self.records), info, installed or info.name in defaultNames, installed, state is None )
+
+			self.records.append( record )
+			self.probes.append( probe )
+			self.byName[record.name] = record
+			self.byProbe[probe] = record
+			self.infos[record.name] = info
+			self._count( record, 1 )
+			if record.checking:
+				self.checkingCount += 1
+
+		self._buildSuites( manifest )
+
+	def _buildSuites( self, manifest ):
+
+		""" Stores the manifest's suites as sets of record IDs. """
+
+		self.suiteNames = list( manifest.suites )
+		self.suites = { name: frozenset(self.byName[wlName].id for wlName in members) for name, members in manifest.suites.items() }
+		self.suites['Full'] = frozenset( range(len(self.records)) )
+		self.defaultSuite = manifest.defaultSuite
+
+	def reload( self, manifest, selectSuite=None ):
+
+		""" Applies a changed manifest, and returns a ManifestChanges describing what was
+			different. Records of unchanged workloads are kept as they are (including
+			their selection and install state); changed ones are updated in place (keeping
+			their selection), and their install state is only re-checked if their install
+			probe changed. New workloads are selected if they're installed or in the suite
+			'selectSuite'. Record IDs are renumbered to the new display order.
+
+			Observers aren't notified of these changes; the caller should refresh its
+			view of the records, and run the returned probes. """
+
+		changes = ManifestChanges()
+		newNames = { info.name for info in manifest.workloads }
+		if selectSuite == 'Full':
+			selectNames = newNames
+		else:
+			selectNames = set( manifest.suites.get(selectSuite, ()) )
+
+		for record in self.records:
+			if record.name not in newNames:
+				self._count( record, -1 )
+				if record.checking:
+					self.checkingCount -= 1
+				self.installStates.untrack( self.probes[record.id] )
+				del self.infos[record.name]
+				changes.removed.append( record )
+
+		records = []
+		probes = []
+		for info in manifest.workloads:
+			record = self.byName.get( info.name )
+
+			if not record:
+				probe = info.createProbe()
+				self.installStates.track( probe )
+				state = self.installStates.state( probe )
+				installed = bool( state )
+				record = WorkloadRecord( len(records), info, installed or info.name in selectNames, installed, state is None )
+				self._count( record, 1 )
+				if record.checking:
+					self.checkingCount += 1
+					changes.probes.append( probe )
+				changes.added.append( record )
+
+			else:
+				probe = self.probes[record.id]
+				oldInfo = self.infos[info.name]
+				if record.id != len( records ):
+					changes.reordered = True
+				record.id = len( records )
+
+				if oldInfo.toDict() != info.toDict():
+					self._count( record, -1 )
+					for attr in WorkloadInfo.__slots__:
+						setattr( record, attr, getattr(info, attr) )
+					self._count( record, 1 )
+
+					# Re-check the install state if the probe (or the folder it's relative to) changed
+					if ( oldInfo.probe, oldInfo.checkInstallPath, os.path.dirname(oldInfo.installerPath) ) != \
+					   ( info.probe, info.checkInstallPath, os.path.dirname(info.installerPath) ):
+						self.installStates.untrack( probe )
+						probe = info.createProbe()
+						self.installStates.track( probe )
+						if not record.checking:
+							record.checking = True
+							self.checkingCount += 1
+						changes.probes.append( probe )
+					changes.updated.append( record )
+
+			records.append( record )
+			probes.append( probe )
+			self.infos[info.name] = info
+
+		self.records = records
+		self.probes = probes
+		self.byName = { record.name: record for record in records }
+		self.byProbe = { probe: record for probe, record in zip(probes, records) }
+
+		changes.suitesChanged = list( manifest.suites ) != self.suiteNames or manifest.defaultSuite != self.defaultSuite
+		self._buildSuites( manifest )
+
+		return changes
+
+	def __len__( self ):
+		return len( self.records )
+
+	def __iter__( self ):
+		return iter( self.records )
+
+	def _count( self, record, sign ):
+
+		""" Adds (sign=1) or removes (sign=-1) a record's contribution to the aggregates. """
+
+		if record.selected:
+			self.selectedCount += sign
+			if not record.installed:
+				self.pendingCount += sign
+				self.pendingSeconds += sign * record.installTime
+
+	def addObserver( self, callback ):
+		self.observers.append( callback )
+
+	def _notify( self, record ):
+		for callback in self.observers:
+			callback( record )
+
+	def setSelected( self, record, selected ):
+		if record.selected == selected:
+			return
+
+		self._count( record, -1 )
+		record.selected = selected
+		self._count( record, 1 )
+		self._notify( record )
+
+	def setInstallTime( self, record, seconds ):
+		if record.installTime == seconds:
+			return
+
+		self._count( record, -1 )
+		record.installTime = seconds
+		self._count( record, 1 )
+		self._notify( record )
+
+	def applyEstimates( self, estimator ):
+
+		""" Updates each workload's install time with the estimator's current estimate. """
+
+		for record in self.records:
+			self.setInstallTime( record, estimator.estimate(record.name, record.installTime) )
+
+	def _setInstalled( self, record, installed ):
+		if record.installed == installed:
+			return
+
+		self._count( record, -1 )
+		record.installed = installed
+		if installed:
+			record.selected = True # Installed workloads always show as selected
+		self._count( record, 1 )
+		self._notify( record )
+
+	def applySuite( self, suiteName ):
+
+		""" Selects the workloads in the given suite and deselects the rest (except those
+			already installed). Returns the records whose selection changed. """
+
+		members = self.suites[suiteName]
+		changed = []
+		for record in self.records:
+			selected = record.id in members or record.installed
+			if record.selected != selected:
+				self.setSelected( record, selected )
+				changed.append( record )
+		return changed
+
+	def uncheckedProbes( self ):
+
+		""" Returns the probes of the workloads whose install state is being checked. """
+
+		return [ self.probes[record.id] for record in self.records if record.checking ]
+
+	def setChecking( self, record ):
+
+		""" Marks a workload's install state as being re-checked, and returns its probe. """
+
+		if not record.checking:
+			record.checking = True
+			self.checkingCount += 1
+			self._notify( record )
+		return self.probes[record.id]
+
+	def setProbeResult( self, probe, installed ):
+
+		""" Updates a workload with the result of its install probe. """
+
+		record = self.byProbe.get( probe )
+		if not record:
+			return # The workload was removed or changed (see reload) while its probe ran
+		if record.checking:
+			record.checking = False
+			self.checkingCount -= 1
+			if record.installed == installed:
+				self._notify( record ) # Otherwise, notified below
+		self._setInstalled( record, installed )
+
+	def checkInstalls( self, engine ):
+
+		""" Checks the install state of all workloads not yet checked, using the given
+			ProbeEngine, and waits for the results. """
+
+		for probe, installed in engine.checkAll( self.uncheckedProbes() ):
+			self.setProbeResult( probe, installed )
+
+	def selectedRecords( self ):
+		return [ record for record in self.records if record.selected ]
+
+	@property
+	def allSelected( self ):
+		return self.selectedCount == len( self.records )